@@ -0,0 +1,57 @@
+"""Compare the durations of cold and cached builds of the model subcommands, such as :code:`create user`.
+
+.. code-block:: bash
+
+    python benchmarks/bench_commands.py --repeat 20
+"""
+
+import time
+
+import click
+from scim2_client.engines.httpx import SyncSCIMClient
+from scim2_models import EnterpriseUser
+from scim2_models import User
+
+from scim2_cli.create import create_cli
+from scim2_cli.replace import replace_cli
+from scim2_cli.utils import build_model_command
+
+COMMANDS = {"create": create_cli, "replace": replace_cli}
+
+
+def best_duration(function, repeat, clear_cache):
+    durations = []
+    for _ in range(repeat):
+        if clear_cache:
+            build_model_command.cache_clear()
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+@click.command()
+@click.option("--repeat", default=10, show_default=True)
+def main(repeat):
+    model = User[EnterpriseUser]
+    for name, command in COMMANDS.items():
+        ctx = click.Context(command)
+        ctx.obj = {
+            "client": SyncSCIMClient(None, resource_models=[model]),
+            "discovery": {"pending": set()},
+        }
+
+        def build(command=command, ctx=ctx):
+            return command.get_command(ctx, "user")
+
+        cold = best_duration(build, repeat, clear_cache=True)
+        build()
+        cached = best_duration(build, repeat, clear_cache=False)
+        click.echo(
+            f"{name + ' user':<16}cold {cold * 1000:>8.2f} ms"
+            f"   cached {cached * 1000:>8.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compare the throughput of the HTTP transport settings against a SCIM server.
+
+HTTP/2 is only negotiated over TLS, so the server should be reached with an
+:code:`https` URL. The :code:`h2` package is needed, for instance with
+:code:`uv sync --group dev`.
+
+.. code-block:: bash
+
+    python benchmarks/bench_http.py https://scim.example -H "Authorization: Bearer token"
+"""
+
+import time
+
+import click
+from httpx import Client
+from httpx import HTTPTransport
+from httpx import Limits
+
+from scim2_cli.utils import DEFAULT_KEEPALIVE_EXPIRY
+from scim2_cli.utils import HeaderType
+from scim2_cli.utils import map_concurrently
+from scim2_cli.utils import split_headers
+
+SETTINGS = {
+    "HTTP/1.1 without keep-alive": {"http2": False, "keepalive": False},
+    "HTTP/1.1": {"http2": False, "keepalive": True},
+    "HTTP/2": {"http2": True, "keepalive": True},
+}
+
+
+def run(url, headers, path, requests_count, concurrency, http2, keepalive):
+    """Send requests with a transport setting, and return the throughput and the negotiated HTTP versions."""
+    transport = HTTPTransport(
+        http2=http2,
+        limits=Limits(
+            max_connections=concurrency,
+            max_keepalive_connections=concurrency if keepalive else 0,
+            keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY,
+        ),
+    )
+    with Client(base_url=url, headers=headers, transport=transport) as client:
+
+        def request(_):
+            response = client.get(path)
+            response.raise_for_status()
+            return response.http_version
+
+        start = time.perf_counter()
+        versions = set(
+            map_concurrently(request, range(requests_count), concurrency, False)
+        )
+        elapsed = time.perf_counter() - start
+    return requests_count / elapsed, versions
+
+
+@click.command()
+@click.argument("url")
+@click.option("-h", "--header", multiple=True, type=HeaderType())
+@click.option("--path", default="/ServiceProviderConfig", show_default=True)
+@click.option("--requests", "requests_count", default=500, show_default=True)
+@click.option("--concurrency", default=8, show_default=True)
+def main(url, header, path, requests_count, concurrency):
+    headers = split_headers(header)
+    for name, settings in SETTINGS.items():
+        throughput, versions = run(
+            url, headers, path, requests_count, concurrency, **settings
+        )
+        click.echo(
+            f"{name:<28}{throughput:>8.0f} req/s  ({', '.join(sorted(versions))})"
+        )
+
+
+if __name__ == "__main__":
+    main()
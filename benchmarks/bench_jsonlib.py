@@ -0,0 +1,62 @@
+"""Compare the encoding and decoding durations of the available JSON backends on large list responses.
+
+.. code-block:: bash
+
+    python benchmarks/bench_jsonlib.py --resources 50000
+"""
+
+import time
+
+import click
+
+from scim2_cli import jsonlib
+
+
+def list_response(count):
+    return {
+        "schemas": ["urn:ietf:params:scim:api:messages:2.0:ListResponse"],
+        "totalResults": count,
+        "startIndex": 1,
+        "itemsPerPage": count,
+        "Resources": [
+            {
+                "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User"],
+                "id": f"user-{index}",
+                "userName": f"user-{index}@example.com",
+                "displayName": f"Jöhn Dœ {index}",
+                "active": index % 2 == 0,
+                "emails": [{"value": f"user-{index}@example.com", "primary": True}],
+                "meta": {"resourceType": "User", "version": f'W/"{index}"'},
+            }
+            for index in range(count)
+        ],
+    }
+
+
+def best_duration(function, argument, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(argument)
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+@click.command()
+@click.option("--resources", default=5000, show_default=True)
+@click.option("--repeat", default=5, show_default=True)
+def main(resources, repeat):
+    payload = list_response(resources)
+    for name in jsonlib.available_backends():
+        jsonlib.use_backend(name)
+        encoded = jsonlib.dumps(payload)
+        encoding = best_duration(jsonlib.dumps, payload, repeat)
+        decoding = best_duration(jsonlib.loads, encoded, repeat)
+        click.echo(
+            f"{name:<10}encoding {encoding * 1000:>8.1f} ms"
+            f"   decoding {decoding * 1000:>8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
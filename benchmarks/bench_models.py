@@ -0,0 +1,89 @@
+"""Compare the durations of cold and cached builds of the resource models discovered on a server.
+
+The server schemas are simulated by the standard schemas, and by generated
+resource types with many attributes.
+
+.. code-block:: bash
+
+    python benchmarks/bench_models.py --resource-types 50 --attributes 100
+"""
+
+import time
+
+import click
+from scim2_client.engines.httpx import SyncSCIMClient
+from scim2_models import EnterpriseUser
+from scim2_models import Group
+from scim2_models import ResourceType
+from scim2_models import Schema
+from scim2_models import User
+
+from scim2_cli import discovery
+
+
+def generated_schemas(resource_types_count, attributes_count):
+    """Return the standard resource types and schemas, and generated ones."""
+    resource_types = [
+        ResourceType.from_resource(User[EnterpriseUser]),
+        ResourceType.from_resource(Group),
+    ]
+    schemas = [User.to_schema(), EnterpriseUser.to_schema(), Group.to_schema()]
+    for index in range(resource_types_count):
+        schema_id = f"urn:example:params:scim:schemas:core:2.0:Resource{index}"
+        schemas.append(
+            Schema.model_validate(
+                {
+                    "id": schema_id,
+                    "name": f"Resource{index}",
+                    "attributes": [
+                        {"name": f"attribute{attribute}", "type": "string"}
+                        for attribute in range(attributes_count)
+                    ],
+                }
+            )
+        )
+        resource_types.append(
+            ResourceType.model_validate(
+                {
+                    "id": f"Resource{index}",
+                    "name": f"Resource{index}",
+                    "endpoint": f"/Resource{index}",
+                    "schema": schema_id,
+                }
+            )
+        )
+    return resource_types, schemas
+
+
+def best_duration(function, repeat, clear_cache):
+    durations = []
+    for _ in range(repeat):
+        if clear_cache:
+            discovery.RESOURCE_MODELS_CACHE.clear()
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+@click.command()
+@click.option("--resource-types", "resource_types_count", default=20, show_default=True)
+@click.option("--attributes", "attributes_count", default=50, show_default=True)
+@click.option("--repeat", default=5, show_default=True)
+def main(resource_types_count, attributes_count, repeat):
+    client = SyncSCIMClient(None)
+    resource_types, schemas = generated_schemas(resource_types_count, attributes_count)
+
+    def build():
+        return discovery.build_resource_models(client, resource_types, schemas)
+
+    cold = best_duration(build, repeat, clear_cache=True)
+    build()
+    cached = best_duration(build, repeat, clear_cache=False)
+    click.echo(f"{len(schemas)} schemas, {len(resource_types)} resource types")
+    click.echo(f"{'cold':<10}{cold * 1000:>10.1f} ms")
+    click.echo(f"{'cached':<10}{cached * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
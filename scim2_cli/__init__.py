@@ -1,93 +1,68 @@
-import json
-import re
-from typing import Any
-from typing import TypeGuard
-
 import click
-from httpx import Client
-from pydantic import BaseModel
-from scim2_client import SCIMClientError
-from scim2_client.engines.httpx import SyncSCIMClient
-from scim2_models import Group
-from scim2_models import ListResponse
-from scim2_models import Resource
-from scim2_models import ResourceType
-from scim2_models import Schema
-from scim2_models import ServiceProviderConfig
-from scim2_models import User
-from sphinx_click.rst_to_ansi_formatter import make_rst_to_ansi_formatter
-
-from scim2_cli.create import create_cli
-from scim2_cli.delete import delete_cli
-from scim2_cli.query import query_cli
-from scim2_cli.replace import replace_cli
-from scim2_cli.search import search_cli
-from scim2_cli.test import test_cli
-from scim2_cli.utils import DOC_URL
+
+from scim2_cli import timings
+from scim2_cli.utils import DEFAULT_CACHE_TTL
+from scim2_cli.utils import DEFAULT_KEEPALIVE_EXPIRY
+from scim2_cli.utils import DEFAULT_MAX_CONNECTIONS
+from scim2_cli.utils import DEFAULT_MAX_KEEPALIVE_CONNECTIONS
+from scim2_cli.utils import DEFAULT_RESPONSE_CACHE_SIZE
+from scim2_cli.utils import DEFAULT_TIMEOUT
 from scim2_cli.utils import HeaderType
-from scim2_cli.utils import exception_to_click_error
+from scim2_cli.utils import RSTGroup
+from scim2_cli.utils import default_cache_dir
 from scim2_cli.utils import split_headers
 
 
-# monkeypatching pydanclick until this patch is released
-# https://github.com/felix-martel/pydanclick/pull/25
-def patch_pydanclick():
-    def _is_pydantic_model(model: Any) -> TypeGuard[type[BaseModel]]:
-        """Return True if `model` is a Pydantic `BaseModel` class."""
-        try:
-            return issubclass(model, BaseModel)
-        except TypeError:
-            return False
-
-    import pydanclick.model.field_collection
-
-    pydanclick.model.field_collection._is_pydantic_model = _is_pydantic_model
-
-
-patch_pydanclick()
-
-
-def load_config_files(
-    schemas_fd, resource_types_fd, service_provider_config_fd
-) -> tuple[
-    list[type[Resource]], list[ResourceType] | None, ServiceProviderConfig | None
-]:
-    if schemas_fd:
-        schemas_payload = json.load(schemas_fd)
-        if isinstance(schemas_payload, dict):
-            schemas_obj = ListResponse[Schema].model_validate(schemas_payload).resources
-        else:
-            schemas_obj = [Schema.model_validate(schema) for schema in schemas_payload]
-        resource_models = [Resource.from_schema(schema) for schema in schemas_obj]
-
-    else:
-        resource_models = [User, Group]
-
-    if resource_types_fd:
-        resource_types_payload = json.load(resource_types_fd)
-        if isinstance(schemas_payload, dict):
-            resource_types = (
-                ListResponse[ResourceType]
-                .model_validate(resource_types_payload)
-                .resources
-            )
-        else:
-            resource_types = [
-                ResourceType.model_validate(item) for item in resource_types_payload
-            ]
-    else:
-        resource_types = None
-
-    if service_provider_config_fd:
-        spc_payload = json.load(service_provider_config_fd)
-        service_provider_config = ServiceProviderConfig.model_validate(spc_payload)
-    else:
-        service_provider_config = None
-
-    return resource_models, resource_types, service_provider_config
-
-
-@click.group(cls=make_rst_to_ansi_formatter(DOC_URL, group=True))
+class LazyGroup(RSTGroup):
+    """Group that only imports its subcommands modules when they are invoked.
+
+    :param lazy_subcommands: A dict mapping subcommand names to their :code:`module:attribute` import paths.
+    """
+
+    def __init__(self, *args, lazy_subcommands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx):
+        base = super().list_commands(ctx)
+        return base + sorted(self.lazy_subcommands)
+
+    def invoke(self, ctx):
+        # started before the subcommand is resolved, so its module import is measured
+        start_timings(ctx)
+        return super().invoke(ctx)
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.lazy_subcommands:
+            return super().get_command(ctx, cmd_name)
+
+        import importlib
+
+        module_name, attribute = self.lazy_subcommands[cmd_name].split(":")
+        with timings.phase("imports"):
+            module = importlib.import_module(module_name)
+        return getattr(module, attribute)
+
+
+@click.group(
+    cls=LazyGroup,
+    lazy_subcommands={
+        "bench": "scim2_cli.bench:bench_cli",
+        "bulk": "scim2_cli.bulk:bulk_cli",
+        "create": "scim2_cli.create:create_cli",
+        "daemon": "scim2_cli.daemon:daemon_cli",
+        "delete": "scim2_cli.delete:delete_cli",
+        "export": "scim2_cli.export:export_cli",
+        "import": "scim2_cli.import_:import_cli",
+        "patch": "scim2_cli.patch:patch_cli",
+        "query": "scim2_cli.query:query_cli",
+        "replace": "scim2_cli.replace:replace_cli",
+        "search": "scim2_cli.search:search_cli",
+        "shell": "scim2_cli.shell:shell_cli",
+        "sync": "scim2_cli.sync:sync_cli",
+        "test": "scim2_cli.test:test_cli",
+    },
+)
 @click.option("-u", "--url", help="The SCIM server endpoint.", envvar="SCIM_CLI_URL")
 @click.option(
     "-h",
@@ -118,18 +93,261 @@ def load_config_files(
     help="Path to a JSON file containing the ServiceProviderConfig content of the server. Will be downloaded otherwise.",
     envvar="SCIM_CLI_SERVICE_PROVIDER_CONFIG",
 )
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    help="Store the discovered server configuration objects on disk and reuse them in the next runs.",
+    envvar="SCIM_CLI_CACHE",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    default=default_cache_dir,
+    help="Path to the directory where the discovery cache is stored.",
+    envvar="SCIM_CLI_CACHE_DIR",
+)
+@click.option(
+    "--cache-ttl",
+    type=int,
+    default=DEFAULT_CACHE_TTL,
+    show_default=True,
+    help="Number of seconds during which the discovery cache is used without contacting the server. Stale entries are revalidated with the server when possible.",
+    envvar="SCIM_CLI_CACHE_TTL",
+)
+@click.option(
+    "--refresh-discovery",
+    is_flag=True,
+    help="Ignore the discovery cache freshness and revalidate it with the server.",
+)
+@click.option(
+    "--response-cache/--no-response-cache",
+    default=False,
+    help="Store the fetched resources on disk, and revalidate them with the server with If-None-Match instead of downloading them again.",
+    envvar="SCIM_CLI_RESPONSE_CACHE",
+)
+@click.option(
+    "--response-cache-size",
+    type=click.IntRange(min=1),
+    default=DEFAULT_RESPONSE_CACHE_SIZE,
+    show_default=True,
+    help="Maximum size in megabytes of the response cache. The least recently used resources are removed first.",
+    envvar="SCIM_CLI_RESPONSE_CACHE_SIZE",
+)
+@click.option(
+    "--async",
+    "async_runtime",
+    is_flag=True,
+    help="Run batch and pagination workloads on an event loop with an asynchronous HTTP client, instead of threads.",
+    envvar="SCIM_CLI_ASYNC",
+)
+@click.option(
+    "--http2/--no-http2",
+    default=False,
+    help="Negotiate HTTP/2 with the server, so concurrent requests are multiplexed on a few connections. Needs the http2 extra.",
+    envvar="SCIM_CLI_HTTP2",
+)
+@click.option(
+    "--max-connections",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_CONNECTIONS,
+    show_default=True,
+    help="Maximum number of simultaneous connections to the server.",
+    envvar="SCIM_CLI_MAX_CONNECTIONS",
+)
+@click.option(
+    "--max-keepalive-connections",
+    type=click.IntRange(min=0),
+    default=DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+    show_default=True,
+    help="Maximum number of idle connections kept open to be reused by the next requests.",
+    envvar="SCIM_CLI_MAX_KEEPALIVE_CONNECTIONS",
+)
+@click.option(
+    "--keepalive-expiry",
+    type=float,
+    default=DEFAULT_KEEPALIVE_EXPIRY,
+    show_default=True,
+    help="Number of seconds after which idle connections are closed.",
+    envvar="SCIM_CLI_KEEPALIVE_EXPIRY",
+)
+@click.option(
+    "--connect-timeout",
+    type=float,
+    default=DEFAULT_TIMEOUT,
+    show_default=True,
+    help="Number of seconds to wait for a connection to the server to be established.",
+    envvar="SCIM_CLI_CONNECT_TIMEOUT",
+)
+@click.option(
+    "--read-timeout",
+    type=float,
+    default=DEFAULT_TIMEOUT,
+    show_default=True,
+    help="Number of seconds to wait for the server to send data.",
+    envvar="SCIM_CLI_READ_TIMEOUT",
+)
+@click.option(
+    "--pool-timeout",
+    type=float,
+    default=DEFAULT_TIMEOUT,
+    show_default=True,
+    help="Number of seconds to wait for a connection to be available in the pool.",
+    envvar="SCIM_CLI_POOL_TIMEOUT",
+)
+@click.option(
+    "--unix-socket",
+    type=click.Path(dir_okay=False),
+    help="Path to a Unix socket to connect to the server through, instead of TCP.",
+    envvar="SCIM_CLI_UNIX_SOCKET",
+)
+@click.option(
+    "--output",
+    type=click.File("w"),
+    help="Path to a file where to write the command output, instead of stdout.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["json", "ndjson"]),
+    help="Write single responses as JSON, and collections of resources as a JSON array with 'json', or one resource per line with 'ndjson'. By default, single responses are written as JSON and collections as newline delimited JSON.",
+    envvar="SCIM_CLI_FORMAT",
+)
+@click.option(
+    "--timings",
+    "timings_enabled",
+    is_flag=True,
+    help="Measure the time spent in each phase of the command, such as imports, discovery, HTTP requests, validation and output, and print it on stderr.",
+    envvar="SCIM_CLI_TIMINGS",
+)
+@click.option(
+    "--timings-format",
+    type=click.Choice([timings.TEXT, timings.JSON]),
+    default=timings.TEXT,
+    show_default=True,
+    help="Print the timings as a table, or as JSON.",
+)
+@click.option(
+    "--trace-file",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Path to a file where to write a span for each phase and each HTTP request, in the Chrome trace event format.",
+    envvar="SCIM_CLI_TRACE_FILE",
+)
 @click.pass_context
 def cli(
-    ctx, url: str, header: list[str], schemas, resource_types, service_provider_config
+    ctx,
+    url: str,
+    header: list[str],
+    schemas,
+    resource_types,
+    service_provider_config,
+    cache: bool,
+    cache_dir: str,
+    cache_ttl: int,
+    refresh_discovery: bool,
+    response_cache: bool,
+    response_cache_size: int,
+    async_runtime: bool,
+    http2: bool,
+    max_connections: int,
+    max_keepalive_connections: int,
+    keepalive_expiry: float,
+    connect_timeout: float,
+    read_timeout: float,
+    pool_timeout: float,
+    unix_socket: str | None,
+    output,
+    output_format: str | None,
+    timings_enabled: bool,
+    timings_format: str,
+    trace_file: str | None,
 ):
     """SCIM application development CLI."""
     ctx.ensure_object(dict)
+    with timings.phase("imports"):
+        from httpx import Client
+        from httpx import HTTPTransport
+        from httpx import Limits
+        from httpx import Timeout
+        from scim2_client.engines.httpx import SyncSCIMClient
+
+        from scim2_cli.discovery import DiscoveryCache
+        from scim2_cli.discovery import load_config_files
+
+    if ctx.invoked_subcommand == "daemon":
+        # the daemon builds the clients of the commands it runs
+        return
 
     if not url:
         raise click.ClickException("No SCIM server URL defined.")
 
     headers_dict = split_headers(header)
-    client = Client(base_url=url, headers=headers_dict)
+    transport_options = {
+        "http2": http2,
+        "limits": Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        "uds": unix_socket,
+    }
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError as exc:
+            raise click.ClickException(
+                "HTTP/2 support needs the 'h2' package. Install it with: pip install scim2-cli[http2]"
+            ) from exc
+
+    ctx.obj["async"] = async_runtime
+    ctx.obj["transport"] = transport_options
+    ctx.obj["output"] = output
+    ctx.obj["format"] = output_format
+
+    pending_discovery = {
+        name
+        for name, fd in (
+            ("schemas", schemas),
+            ("resource_types", resource_types),
+            ("service_provider_config", service_provider_config),
+        )
+        if not fd
+    }
+
+    # the daemon passes the client and the discovery state of the previous invocations
+    if "client" in ctx.obj:
+        if refresh_discovery:
+            ctx.obj["discovery"] = {
+                **ctx.obj["discovery"],
+                "refresh": True,
+                "pending": pending_discovery,
+            }
+        return
+
+    transport = HTTPTransport(**transport_options)
+    if response_cache:
+        from scim2_cli.cache import CachingTransport
+        from scim2_cli.cache import ResponseCache
+
+        transport = CachingTransport(
+            transport,
+            ResponseCache(cache_dir, url, headers_dict, response_cache_size * 2**20),
+        )
+    if timings.recorder is not None:
+        from scim2_cli.transport import TimedTransport
+
+        transport = TimedTransport(transport)
+
+    client = Client(
+        base_url=url,
+        headers=headers_dict,
+        timeout=Timeout(
+            DEFAULT_TIMEOUT,
+            connect=connect_timeout,
+            read=read_timeout,
+            pool=pool_timeout,
+        ),
+        transport=transport,
+    )
 
     resource_models, resource_types_obj, spc_obj = load_config_files(
         schemas, resource_types, service_provider_config
@@ -141,36 +359,71 @@ def cli(
         resource_types=resource_types_obj,
         service_provider_config=spc_obj,
     )
-    try:
-        scim_client.discover(
-            schemas=not bool(schemas),
-            resource_types=not bool(resource_types),
-            service_provider_config=not bool(service_provider_config),
+    if timings.recorder is not None:
+        scim_client.check_response = timings.timed(
+            "validation", scim_client.check_response
         )
-    except SCIMClientError as exc:
-        raise exception_to_click_error(exc) from exc
-
     ctx.obj["client"] = scim_client
-    ctx.obj["resource_models"] = {
-        re.sub(r"\[.*\]", "", resource_model.__name__.lower()): resource_model
-        for resource_model in ctx.obj["client"].resource_models
+    ctx.obj["discovery"] = {
+        "cache": DiscoveryCache(cache_dir, url, headers_dict, cache_ttl)
+        if cache
+        else None,
+        "refresh": refresh_discovery,
+        "pending": pending_discovery,
     }
 
-    if not click.get_text_stream("stdin").isatty():  # pragma: no cover
-        if stdin := click.get_text_stream("stdin").read().strip():
-            try:
-                ctx.obj["stdin"] = json.loads(stdin)
-            except json.JSONDecodeError as exc:
-                message = f"Invalid JSON input.\n{exc}"
-                raise click.ClickException(message) from exc
 
+def start_timings(ctx) -> None:
+    """Start recording the timings if --timings or --trace-file is passed.
 
-cli.add_command(create_cli)
-cli.add_command(query_cli)
-cli.add_command(replace_cli)
-cli.add_command(delete_cli)
-cli.add_command(search_cli)
-cli.add_command(test_cli)
+    The daemon command is not measured, but the commands it runs are, from the
+    moment the daemon received them.
+    """
+    timings_enabled = ctx.params.get("timings_enabled")
+    trace_file = ctx.params.get("trace_file")
+    if not (timings_enabled or trace_file) or ctx.protected_args[:1] == ["daemon"]:
+        return
+
+    origin = ctx.meta.get(timings.INVOKED_AT, timings.IMPORTED_AT)
+    tracer = None
+    if trace_file:
+        from scim2_cli.trace import Tracer
+
+        tracer = Tracer(trace_file, origin)
+    timings.start(tracer, origin)
+    timings_format = ctx.params["timings_format"] if timings_enabled else None
+    ctx.call_on_close(lambda: report_timings(timings_format))
+
+
+def report_timings(format: str | None) -> None:
+    """Stop recording the timings, and print them unless only a trace file was requested."""
+    report = timings.stop()
+    if report is None or format is None:
+        return
+
+    from scim2_cli import jsonlib
+
+    text = (
+        jsonlib.dumps(report)
+        if format == timings.JSON
+        else timings.format_report(report)
+    )
+    click.echo(text, err=True)
+
+
+def main():
+    """Entry point of the :code:`scim` command, that forwards it to the daemon when it is running."""
+    import os
+    import sys
+
+    from scim2_cli.daemon import forward
+
+    status = forward(sys.argv[1:], prog_name=os.path.basename(sys.argv[0]))
+    if status is not None:
+        sys.exit(status)
 
-if __name__ == "__main__":  # pragma: no cover
     cli()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,211 @@
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator
+from collections.abc import Awaitable
+from collections.abc import Callable
+
+from httpx import AsyncClient
+from httpx import AsyncHTTPTransport
+from scim2_client import SCIMClientError
+from scim2_client.engines.httpx import AsyncSCIMClient
+from scim2_models import SearchRequest
+
+from . import timings
+from .output import get_output
+from .pagination import DEFAULT_PREFETCH
+from .pagination import search_request_range
+from .transport import AsyncTimedTransport
+from .utils import dump_response
+from .utils import exception_to_click_error
+from .utils import record_context
+
+
+def run_async(ctx, function: Callable[[AsyncSCIMClient], Awaitable]):
+    """Run a coroutine function on an event loop, with an asynchronous SCIM client.
+
+    The asynchronous client reuses the URL, the headers, the transport settings and the
+    discovered objects of the synchronous client. Its connection pool is shared by all
+    the coroutines.
+    """
+    sync_client = ctx.obj["client"]
+    transport = AsyncHTTPTransport(**ctx.obj["transport"])
+    if timings.recorder is not None:
+        transport = AsyncTimedTransport(transport)
+
+    async def main():
+        async with AsyncClient(
+            base_url=sync_client.client.base_url,
+            headers=sync_client.client.headers,
+            timeout=sync_client.client.timeout,
+            transport=transport,
+        ) as client:
+            scim_client = AsyncSCIMClient(
+                client,
+                resource_models=sync_client.resource_models,
+                resource_types=sync_client.resource_types,
+                service_provider_config=sync_client.service_provider_config,
+            )
+            if timings.recorder is not None:
+                scim_client.check_response = timings.timed(
+                    "validation", scim_client.check_response
+                )
+            return await function(scim_client)
+
+    return asyncio.run(main())
+
+
+async def amap_concurrently(
+    function: Callable[..., Awaitable],
+    items,
+    concurrency: int = 1,
+    ordered: bool = True,
+) -> AsyncIterator:
+    """Asynchronous version of :func:`~scim2_cli.utils.map_concurrently`.
+
+    No more than :code:`concurrency` coroutines are run simultaneously, and no more than
+    twice :code:`concurrency` items are read ahead of the results.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    window = 2 * concurrency
+    pending = deque() if ordered else set()
+
+    async def bounded(item):
+        async with semaphore:
+            return await function(item)
+
+    async def drain(limit):
+        results = []
+        while len(pending) > limit:
+            if ordered:
+                results.append(await pending.popleft())
+                continue
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.remove(task)
+                results.append(task.result())
+        return results
+
+    try:
+        for item in items:
+            task = asyncio.ensure_future(bounded(item))
+            if ordered:
+                pending.append(task)
+            else:
+                pending.add(task)
+
+            for result in await drain(window - 1):
+                yield result
+
+        for result in await drain(0):
+            yield result
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def call(coroutine: Awaitable, callback: Callable | None = None):
+    """Await a SCIM client coroutine, and convert its errors for click."""
+    try:
+        response = await coroutine
+        return callback(response) if callback else response
+    except SCIMClientError as scim_exc:
+        raise exception_to_click_error(scim_exc) from scim_exc
+
+
+def echo_ndjson_results_async(
+    ctx,
+    operation: Callable[[AsyncSCIMClient, object], Awaitable],
+    records,
+    concurrency: int = 1,
+    ordered: bool = True,
+    indexed: bool = False,
+) -> None:
+    """Asynchronous version of :func:`~scim2_cli.utils.echo_ndjson_results`.
+
+    :param operation: A function taking an asynchronous SCIM client and a record,
+        and returning a coroutine.
+    """
+
+    async def main(client):
+        async def apply(indexed_record):
+            index, record = indexed_record
+            with record_context(index):
+                return await call(operation(client, record))
+
+        output = get_output(ctx, indent=False)
+        indexed_records = records if indexed else enumerate(records, start=1)
+        responses = amap_concurrently(apply, indexed_records, concurrency, ordered)
+        async for response in responses:
+            output.write_item(response)
+        output.close()
+
+    run_async(ctx, main)
+
+
+async def aiter_all_resources(
+    fetch: Callable[[int, int | None], Awaitable[dict]],
+    start_index: int | None = None,
+    count: int | None = None,
+    prefetch: int = DEFAULT_PREFETCH,
+) -> AsyncIterator[dict]:
+    """Asynchronous version of :func:`~scim2_cli.pagination.iter_all_resources`."""
+    start_index = start_index or 1
+    page = await fetch(start_index, count)
+    resources = page.get("Resources") or []
+    for resource in resources:
+        yield resource
+
+    total_results = page.get("totalResults") or 0
+    page_size = len(resources)
+    if not page_size:
+        return
+
+    starts = range(start_index + page_size, total_results + 1, page_size)
+    pages = amap_concurrently(
+        lambda start: fetch(start, page_size), starts, concurrency=prefetch
+    )
+    page_index = 0
+    async for page in pages:
+        start = starts[page_index]
+        page_index += 1
+        resources = page.get("Resources") or []
+        for resource in resources:
+            yield resource
+
+        stop = min(start + page_size, total_results + 1)
+        start += len(resources)
+        while resources and start < stop:
+            resources = (await fetch(start, stop - start)).get("Resources") or []
+            for resource in resources:
+                yield resource
+            start += len(resources)
+
+
+def echo_all_resources_async(
+    ctx,
+    fetch: Callable[[AsyncSCIMClient, int, int | None], Awaitable[dict]],
+    search_request: SearchRequest | dict,
+    prefetch: int = DEFAULT_PREFETCH,
+    output=None,
+) -> None:
+    """Asynchronous version of :func:`~scim2_cli.pagination.echo_all_resources`.
+
+    :param fetch: A function taking an asynchronous SCIM client, a start index and a count,
+        and returning a coroutine.
+    """
+    start_index, count = search_request_range(search_request)
+
+    async def main(client):
+        resources = aiter_all_resources(
+            lambda start, count: call(fetch(client, start, count), dump_response),
+            start_index,
+            count,
+            prefetch,
+        )
+        writer = output or get_output(ctx, indent=False)
+        async for resource in resources:
+            writer.write_item(resource)
+        writer.close()
+
+    run_async(ctx, main)
@@ -0,0 +1,361 @@
+import math
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from click import ClickException
+from scim2_models import Error
+from scim2_models import Required
+from scim2_models import Resource
+from scim2_models import SearchRequest
+
+from scim2_cli.discovery import get_resource_models
+from scim2_cli.output import get_output
+from scim2_cli.utils import RSTCommand
+from scim2_cli.utils import map_concurrently
+
+OPERATIONS = ("create", "query", "search", "replace", "delete")
+DEFAULT_MIX = "create=2,query=4,search=2,replace=1,delete=1"
+DEFAULT_DURATION = 10.0
+DEFAULT_BENCH_CONCURRENCY = 4
+NAME_PREFIX = "scim-bench-"
+# attributes used to name the created resources, by order of preference
+NAME_ATTRIBUTES = ("user_name", "display_name")
+PERCENTILES = (50, 90, 99)
+
+
+class MixType(click.ParamType):
+    """Parse operation weights such as :code:`create=1,query=4`."""
+
+    name = "mix"
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, dict):
+            return value
+
+        mix = {}
+        for item in value.split(","):
+            name, _, weight = item.partition("=")
+            name = name.strip()
+            if name not in OPERATIONS:
+                self.fail(
+                    f"Unknown operation '{name}'. Available values are: {', '.join(OPERATIONS)}",
+                    param,
+                    ctx,
+                )
+            try:
+                mix[name] = float(weight) if weight else 1.0
+            except ValueError:
+                self.fail(f"Invalid weight '{weight}' for '{name}'.", param, ctx)
+
+        if not any(mix.values()):
+            self.fail("At least one operation must have a positive weight.", param, ctx)
+        return mix
+
+
+def name_attribute(model: type[Resource]) -> str:
+    """Return the attribute naming the resources of a model."""
+    for name in NAME_ATTRIBUTES:
+        if name in model.model_fields:
+            return name
+
+    for name, field in model.model_fields.items():
+        if model.get_field_annotation(
+            name, Required
+        ) == Required.true and field.annotation in (str, str | None):
+            return name
+
+    raise ClickException(
+        f"Cannot find an attribute to name {model.__name__} resources."
+    )
+
+
+def percentile(latencies: list[float], rank: float) -> float:
+    """Return the nearest-rank percentile of sorted latencies."""
+    index = max(0, math.ceil(rank * len(latencies) / 100) - 1)
+    return latencies[index]
+
+
+class Benchmark:
+    """Perform a mix of operations on a resource type, and record their latencies.
+
+    The ids of the created resources are kept so they can be read, replaced
+    and deleted by the next operations, and cleaned up at the end.
+    """
+
+    def __init__(self, client, model: type[Resource], mix: dict[str, float], seed):
+        self.client = client
+        self.model = model
+        self.names = [name for name, weight in mix.items() if weight > 0]
+        self.weights = [mix[name] for name in self.names]
+        self.random = random.Random(seed)
+        self.attribute = name_attribute(model)
+        self.created: dict[str, str] = {}
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def take(self) -> tuple[str, str] | None:
+        """Take a created resource, so no other operation uses it meanwhile."""
+        with self.lock:
+            if not self.created:
+                return None
+            id = self.random.choice(list(self.created))
+            return id, self.created.pop(id)
+
+    def create(self):
+        name = f"{NAME_PREFIX}{uuid.uuid4().hex}"
+        response = self.client.create(
+            self.model(**{self.attribute: name}), raise_scim_errors=False
+        )
+        if not isinstance(response, Error):
+            with self.lock:
+                self.created[response.id] = name
+        return response
+
+    def query(self, id, name):
+        return self.client.query(self.model, id, raise_scim_errors=False)
+
+    def search(self):
+        alias = self.model.model_fields[self.attribute].serialization_alias
+        search_request = SearchRequest(
+            filter=f'{alias or self.attribute} sw "{NAME_PREFIX}"', count=10
+        )
+        return self.client.query(
+            self.model, search_request=search_request, raise_scim_errors=False
+        )
+
+    def replace(self, id, name):
+        return self.client.replace(
+            self.model(id=id, **{self.attribute: name}), raise_scim_errors=False
+        )
+
+    def delete(self, id, name=None):
+        return self.client.delete(self.model, id, raise_scim_errors=False)
+
+    def perform(self, name: str):
+        """Perform an operation, and return the name of the actually performed operation with its response.
+
+        Operations needing an existing resource create one when there is none.
+        The resource is given back afterwards, unless it was successfully deleted.
+        """
+        if name in ("create", "search"):
+            return name, getattr(self, name)()
+
+        resource = self.take()
+        if resource is None:
+            return "create", self.create()
+
+        failed = True
+        try:
+            response = getattr(self, name)(*resource)
+            failed = isinstance(response, Error)
+            return name, response
+        finally:
+            if name != "delete" or failed:
+                with self.lock:
+                    self.created.setdefault(*resource)
+
+    def step(self, scheduled: float | None = None) -> None:
+        """Perform a random operation of the mix and record its latency.
+
+        With a fixed rate, latencies are measured from the scheduled start,
+        so the time spent waiting for a worker is included.
+        """
+        with self.lock:
+            name = self.random.choices(self.names, self.weights)[0]
+        start = scheduled if scheduled is not None else time.perf_counter()
+        try:
+            name, response = self.perform(name)
+            failed = isinstance(response, Error)
+        except Exception:
+            failed = True
+        latency = time.perf_counter() - start
+
+        with self.lock:
+            self.latencies[name].append(latency)
+            if failed:
+                self.errors[name] += 1
+
+    def run_concurrency(self, duration: float, concurrency: int) -> None:
+        deadline = time.perf_counter() + duration
+
+        def worker():
+            while time.perf_counter() < deadline:
+                self.step()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run_rate(self, duration: float, rate: float, concurrency: int) -> None:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for index in range(int(duration * rate)):
+                scheduled = start + index / rate
+                time.sleep(max(0.0, scheduled - time.perf_counter()))
+                executor.submit(self.step, scheduled)
+
+    def cleanup(self, concurrency: int) -> int:
+        """Delete the remaining created resources, and return their number."""
+        ids = list(self.created)
+        self.created.clear()
+        for _ in map_concurrently(self.delete, ids, concurrency, ordered=False):
+            pass
+        return len(ids)
+
+    def report(self, elapsed: float) -> dict:
+        def stats(latencies, errors):
+            latencies = sorted(latencies)
+            result = {
+                "count": len(latencies),
+                "errors": errors,
+                "errorRate": errors / len(latencies) if latencies else 0.0,
+                "throughput": len(latencies) / elapsed if elapsed else 0.0,
+            }
+            if latencies:
+                result["latency"] = {
+                    **{
+                        f"p{rank}": percentile(latencies, rank) * 1000
+                        for rank in PERCENTILES
+                    },
+                    "max": latencies[-1] * 1000,
+                }
+            return result
+
+        operations = {
+            name: stats(self.latencies[name], self.errors[name])
+            for name in OPERATIONS
+            if self.latencies[name]
+        }
+        total = stats(
+            [latency for values in self.latencies.values() for latency in values],
+            sum(self.errors.values()),
+        )
+        return {"duration": elapsed, "operations": operations, "total": total}
+
+
+def format_report(report: dict) -> str:
+    columns = ["operation", "count", "errors", "req/s"] + [
+        f"{name} ms" for name in (*(f"p{rank}" for rank in PERCENTILES), "max")
+    ]
+    rows = []
+    for name, stats in (*report["operations"].items(), ("total", report["total"])):
+        latency = stats.get("latency", {})
+        rows.append(
+            [
+                name,
+                str(stats["count"]),
+                f"{stats['errors']} ({stats['errorRate']:.1%})",
+                f"{stats['throughput']:.1f}",
+                *(f"{value:.1f}" for value in latency.values()),
+            ]
+        )
+
+    widths = [
+        max(len(row[index]) for row in (columns, *rows) if index < len(row))
+        for index in range(len(columns))
+    ]
+    lines = [
+        "  ".join(
+            cell.ljust(width) if index == 0 else cell.rjust(width)
+            for index, (cell, width) in enumerate(zip(row, widths, strict=False))
+        )
+        for row in (columns, *rows)
+    ]
+    return "\n".join(lines)
+
+
+@click.command(cls=RSTCommand, name="bench")
+@click.argument("resource_type", default="user")
+@click.option(
+    "--mix",
+    type=MixType(),
+    default=DEFAULT_MIX,
+    show_default=True,
+    help="The relative weights of the create, query, search, replace and delete operations.",
+)
+@click.option(
+    "--duration",
+    type=click.FloatRange(min=0, min_open=True),
+    default=DEFAULT_DURATION,
+    show_default=True,
+    help="Number of seconds during which operations are performed.",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=DEFAULT_BENCH_CONCURRENCY,
+    show_default=True,
+    help="The number of operations performed simultaneously.",
+)
+@click.option(
+    "--rate",
+    type=click.FloatRange(min=0, min_open=True),
+    help="Start a fixed number of operations per second, instead of starting a new operation as soon as one ends.",
+)
+@click.option(
+    "--seed",
+    type=int,
+    help="Seed of the random choice of operations, to reproduce a run.",
+)
+@click.option(
+    "--json",
+    "as_json",
+    is_flag=True,
+    help="Print the report as JSON instead of a table.",
+)
+@click.option(
+    "--cleanup/--no-cleanup",
+    default=True,
+    help="Delete the created resources at the end of the run.",
+)
+@click.pass_context
+def bench_cli(
+    ctx, resource_type, mix, duration, concurrency, rate, seed, as_json, cleanup
+):
+    """Measure the capacity of the server with a mix of operations on a resource type.
+
+    By default, :code:`--concurrency` operations are performed simultaneously during :code:`--duration` seconds.
+    With :code:`--rate`, operations are started at a fixed rate instead:
+
+    .. code-block:: bash
+
+        bench user --mix create=1,query=8,delete=1 --rate 50 --duration 60
+
+    The created resources are named with a :code:`scim-bench-` prefix, and deleted at the end of the run.
+    The report gives the throughput, the errors and the latency percentiles of each operation.
+    """
+    resource_models = get_resource_models(ctx)
+    try:
+        model = resource_models[resource_type]
+    except KeyError as exc:
+        ok_values = ", ".join(resource_models)
+        raise ClickException(
+            f"Unknown resource type '{resource_type}'. Available values are: {ok_values}"
+        ) from exc
+
+    benchmark = Benchmark(ctx.obj["client"], model, mix, seed)
+    start = time.perf_counter()
+    try:
+        if rate:
+            benchmark.run_rate(duration, rate, concurrency)
+        else:
+            benchmark.run_concurrency(duration, concurrency)
+        elapsed = time.perf_counter() - start
+    finally:
+        if cleanup:
+            count = benchmark.cleanup(concurrency)
+            click.echo(f"{count} created resources were deleted.", err=True)
+
+    report = benchmark.report(elapsed)
+    if as_json:
+        get_output(ctx).write(report)
+    else:
+        click.echo(format_report(report))
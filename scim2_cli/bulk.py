@@ -0,0 +1,160 @@
+from collections.abc import Iterable
+from collections.abc import Iterator
+
+import click
+from click import ClickException
+from pydantic import ValidationError
+from scim2_client import SCIMClientError
+from scim2_client.engines.httpx import handle_request_error
+from scim2_client.engines.httpx import handle_response_error
+from scim2_models import BulkOperation
+from scim2_models import BulkRequest
+
+from scim2_cli import jsonlib
+from scim2_cli.discovery import require_discovery
+from scim2_cli.output import get_output
+from scim2_cli.utils import exception_to_click_error
+
+from .utils import RSTCommand
+from .utils import iter_ndjson
+
+BULK_REQUEST_SCHEMA = BulkRequest.model_fields["schemas"].default[0]
+
+
+def bulk_request_body(operations: list[bytes], fail_on_errors: int | None) -> bytes:
+    """Build a serialized :class:`~scim2_models.BulkRequest` from already serialized operations."""
+    envelope = {"schemas": [BULK_REQUEST_SCHEMA]}
+    if fail_on_errors is not None:
+        envelope["failOnErrors"] = fail_on_errors
+    head = jsonlib.dumps(envelope)[:-1]
+    return f'{head},"Operations":['.encode() + b",".join(operations) + b"]}"
+
+
+def iter_bulk_chunks(
+    operations: Iterable[dict],
+    max_operations: int | None,
+    max_payload_size: int | None,
+    fail_on_errors: int | None = None,
+) -> Iterator[list[bytes]]:
+    """Pack operations in chunks respecting the server bulk limits.
+
+    Operations are serialized once, and chunks are yielded as soon as they are full,
+    so at most one chunk is kept in memory.
+    """
+    overhead = len(bulk_request_body([], fail_on_errors))
+    chunk: list[bytes] = []
+    size = overhead
+    for index, operation in enumerate(operations, start=1):
+        try:
+            BulkOperation.model_validate(operation)
+        except ValidationError as exc:
+            raise ClickException(
+                f"Record {index}: Invalid bulk operation.\n{exc}"
+            ) from exc
+
+        serialized = jsonlib.dumps(operation).encode()
+        if max_payload_size and overhead + len(serialized) > max_payload_size:
+            raise ClickException(
+                f"Record {index}: The operation exceeds the server maximum payload size of {max_payload_size} bytes."
+            )
+
+        separator_size = 1 if chunk else 0
+        if chunk and (
+            (max_operations and len(chunk) >= max_operations)
+            or (
+                max_payload_size
+                and size + separator_size + len(serialized) > max_payload_size
+            )
+        ):
+            yield chunk
+            chunk, size, separator_size = [], overhead, 0
+
+        chunk.append(serialized)
+        size += separator_size + len(serialized)
+
+    if chunk:
+        yield chunk
+
+
+def send_bulk_request(client, operations: list[bytes], fail_on_errors: int | None):
+    """Send a bulk request and return the response operations payloads."""
+    with handle_request_error():
+        response = client.client.post(
+            "/Bulk",
+            content=bulk_request_body(operations, fail_on_errors),
+            headers={"Content-Type": "application/scim+json"},
+        )
+
+    with handle_response_error(response):
+        payload = response.json() if response.text else None
+        client.check_response(
+            payload=payload,
+            status_code=response.status_code,
+            headers=response.headers,
+            expected_status_codes=[200],
+        )
+
+    return (payload or {}).get("Operations", [])
+
+
+def iter_bulk_results(
+    client, operations: Iterable[dict], fail_on_errors: int | None = None
+) -> Iterator[dict]:
+    """Perform operations with as few bulk requests as possible, and yield the operations results.
+
+    The :code:`failOnErrors` value of each request is decreased by the number of errors
+    of the previous requests, and no more requests are sent once it is reached.
+    """
+    bulk = client.service_provider_config.bulk
+    errors = 0
+    chunks = iter_bulk_chunks(
+        operations, bulk.max_operations, bulk.max_payload_size, fail_on_errors
+    )
+    for chunk in chunks:
+        remaining_errors = None if fail_on_errors is None else fail_on_errors - errors
+        if remaining_errors is not None and remaining_errors <= 0:
+            return
+
+        for result in send_bulk_request(client, chunk, remaining_errors):
+            if int(result.get("status") or 0) >= 400:
+                errors += 1
+            yield result
+
+
+def is_bulk_supported(client) -> bool:
+    config = client.service_provider_config
+    return bool(config and config.bulk and config.bulk.supported)
+
+
+@click.command(cls=RSTCommand, name="bulk")
+@click.option(
+    "--fail-on-errors",
+    type=click.IntRange(min=1),
+    help="The number of errors that the server accepts before it stops processing the operations.",
+)
+@click.pass_context
+def bulk_cli(ctx, fail_on_errors):
+    """Perform `SCIM Bulk <https://www.rfc-editor.org/rfc/rfc7644#section-3.7>`_ requests.
+
+    Operations are read from stdin as newline delimited JSON,
+    and packed in as few requests as allowed by the server
+    :code:`maxOperations` and :code:`maxPayloadSize` limits.
+    The operations results are printed as newline delimited JSON as soon as each request is done.
+
+    .. code-block:: bash
+
+        echo '{"method": "POST", "path": "/Users", "bulkId": "qwerty", "data": {"schemas": ["urn:ietf:params:scim:schemas:core:2.0:User"], "userName": "bjensen"}}' | bulk
+
+    Operations referencing the :code:`bulkId` of other operations should fit in a same request.
+    """
+    require_discovery(ctx, "service_provider_config")
+    client = ctx.obj["client"]
+    if not is_bulk_supported(client):
+        raise ClickException("The server does not support bulk operations.")
+
+    try:
+        get_output(ctx, indent=False).write_all(
+            iter_bulk_results(client, iter_ndjson(), fail_on_errors)
+        )
+    except SCIMClientError as scim_exc:
+        raise exception_to_click_error(scim_exc) from scim_exc
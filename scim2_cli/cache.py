@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from httpx import BaseTransport
+from httpx import Request
+from httpx import Response
+
+
+class ResponseCache:
+    """Store resource responses on disk, with the validator sent by the server.
+
+    Entries are keyed by a hash of the server URL, the request headers and the
+    resource URL, so authentication tokens are never written in clear on the disk.
+    The least recently used entries are removed when the cache exceeds its size.
+    """
+
+    def __init__(self, directory, url: str, headers: dict[str, str], max_size: int):
+        key = hashlib.sha256(
+            json.dumps([str(url), sorted(headers.items())]).encode()
+        ).hexdigest()
+        self.directory = Path(directory) / "responses" / key
+        self.max_size = max_size
+        self.lock = threading.Lock()
+
+    def path(self, url: str) -> Path:
+        return self.directory / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def get(self, url: str) -> dict | None:
+        path = self.path(url)
+        try:
+            with open(path) as fd:
+                entry = json.load(fd)
+            # the modification time is the last access time of the entry
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def set(self, url: str, entry: dict) -> None:
+        """Atomically write an entry, so concurrent invocations never read partial files."""
+        with self.lock:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+                with os.fdopen(fd, "w") as tmp:
+                    json.dump(entry, tmp)
+                os.replace(tmp_path, self.path(url))
+                self.evict()
+            except OSError:  # pragma: no cover
+                pass
+
+    def delete(self, url: str) -> None:
+        with self.lock:
+            self.path(url).unlink(missing_ok=True)
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits in its size."""
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                entries.append((path.stat(), path))
+            except OSError:  # pragma: no cover
+                continue
+
+        size = sum(stat.st_size for stat, _ in entries)
+        for stat, path in sorted(entries, key=lambda entry: entry[0].st_mtime):
+            if size <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            size -= stat.st_size
+
+
+def response_validator(response: Response) -> str | None:
+    """Return the :code:`ETag` header of a response, or the :code:`meta.version` of the returned resource."""
+    if etag := response.headers.get("etag"):
+        return etag
+
+    try:
+        payload = response.json()
+    except ValueError:
+        return None
+    meta = payload.get("meta") if isinstance(payload, dict) else None
+    return meta.get("version") if isinstance(meta, dict) else None
+
+
+class CachingTransport(BaseTransport):
+    """Revalidate the cached resources with :code:`If-None-Match` instead of downloading them again.
+
+    Responses to :code:`GET` requests are stored with their :code:`ETag` or :code:`meta.version`.
+    The next requests on the same URL send the validator, and the cached body is reused
+    when the server answers :code:`304 Not Modified`. Requests that already are conditional,
+    such as the discovery requests, are passed through.
+    """
+
+    def __init__(self, transport: BaseTransport, cache: ResponseCache):
+        self.transport = transport
+        self.cache = cache
+
+    def handle_request(self, request: Request) -> Response:
+        url = str(request.url)
+        if request.method != "GET":
+            response = self.transport.handle_request(request)
+            if request.method in ("PUT", "PATCH", "DELETE"):
+                self.cache.delete(url)
+            return response
+
+        conditional = (
+            "if-none-match" in request.headers or "if-modified-since" in request.headers
+        )
+        entry = None if conditional else self.cache.get(url)
+        if entry:
+            request.headers["If-None-Match"] = entry["etag"]
+
+        response = self.transport.handle_request(request)
+        if entry and response.status_code == 304:
+            response.close()
+            return Response(
+                200,
+                headers=entry["headers"],
+                content=entry["body"].encode(),
+                request=request,
+            )
+
+        if conditional or response.status_code != 200:
+            return response
+
+        response.read()
+        if etag := response_validator(response):
+            headers = {
+                name: value
+                for name, value in response.headers.items()
+                if name in ("content-type", "etag", "last-modified")
+            }
+            self.cache.set(
+                url, {"etag": etag, "headers": headers, "body": response.text}
+            )
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
@@ -3,24 +3,33 @@ from click import ClickException
 from pydanclick import from_pydantic
 from scim2_client import SCIMClientError
 from scim2_models import Context
-from sphinx_click.rst_to_ansi_formatter import make_rst_to_ansi_formatter
 
-from scim2_cli.utils import DOC_URL
+from scim2_cli.discovery import require_discovery
+from scim2_cli.output import get_output
 from scim2_cli.utils import ModelCommand
+from scim2_cli.utils import RSTCommand
+from scim2_cli.utils import concurrency_options
+from scim2_cli.utils import echo_ndjson_results
 from scim2_cli.utils import exception_to_click_error
-from scim2_cli.utils import formatted_payload
+from scim2_cli.utils import iter_ndjson
+from scim2_cli.utils import patch_pydanclick
+from scim2_cli.utils import read_stdin
 from scim2_cli.utils import unacceptable_fields
 
+patch_pydanclick()
 
-def create_payload(client, payload, indent):
+
+def create_resource(client, payload):
     try:
-        response = client.create(payload, raise_scim_errors=False)
+        return client.create(payload, raise_scim_errors=False)
 
     except SCIMClientError as scim_exc:
         raise exception_to_click_error(scim_exc) from scim_exc
 
-    payload = formatted_payload(response.model_dump(), indent)
-    click.echo(payload)
+
+def create_payload(client, payload, output):
+    response = create_resource(client, payload)
+    output.write(response)
 
 
 def create_factory(model):
@@ -30,7 +39,7 @@ def create_factory(model):
     exclude = unacceptable_fields(Context.RESOURCE_CREATION_REQUEST, model)
 
     @click.command(
-        cls=make_rst_to_ansi_formatter(DOC_URL),
+        cls=RSTCommand,
         name=model.__name__.lower(),
     )
     @click.option(
@@ -68,12 +77,12 @@ def create_factory(model):
         if obj == model():
             obj = None
 
-        payload = ctx.obj.get("stdin") or obj
+        payload = read_stdin(ctx) or obj
         if not payload:
             click.echo(ctx.get_help())
             ctx.exit(1)
 
-        create_payload(ctx.obj["client"], payload, indent)
+        create_payload(ctx.obj["client"], payload, get_output(ctx, indent))
 
     return create_command
 
@@ -91,7 +100,13 @@ def create_factory(model):
     default=True,
     help="Indent JSON response payloads.",
 )
-def create_cli(ctx, indent):
+@click.option(
+    "--ndjson",
+    is_flag=True,
+    help="Read newline delimited JSON payloads from stdin, create one resource per line, and print the responses as newline delimited JSON.",
+)
+@concurrency_options
+def create_cli(ctx, indent, ndjson, concurrency, unordered):
     """Perform a `SCIM POST <https://www.rfc-editor.org/rfc/rfc7644#section-3.3>`_ request on resources endpoint.
 
     There are subcommands for all the available models, with dynamic attributes.
@@ -107,13 +122,37 @@ def create_cli(ctx, indent):
 
         echo '{"userName": "bjensen@example.com", "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User"]}' |  create
 
+    With :code:`--ndjson`, stdin is read line by line and each line is created independently:
+
+    .. code-block:: bash
+
+        cat users.ndjson | create --ndjson
+
+    Use :code:`--concurrency` to perform several requests simultaneously:
+
+    .. code-block:: bash
+
+        cat users.ndjson | create --ndjson --concurrency 8
+
     """
     if ctx.invoked_subcommand is not None:
         return
 
-    payload = ctx.obj.get("stdin")
+    if ndjson:
+        require_discovery(ctx, "schemas", "resource_types")
+        echo_ndjson_results(
+            ctx,
+            lambda client, payload: client.create(payload, raise_scim_errors=False),
+            iter_ndjson(),
+            concurrency=concurrency,
+            ordered=not unordered,
+        )
+        return
+
+    payload = read_stdin(ctx)
     if not payload:
         click.echo(ctx.get_help())
         ctx.exit(1)
 
-    create_payload(ctx.obj["client"], payload, indent)
+    require_discovery(ctx, "schemas", "resource_types")
+    create_payload(ctx.obj["client"], payload, get_output(ctx, indent))
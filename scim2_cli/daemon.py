@@ -0,0 +1,441 @@
+import functools
+import io
+import os
+import shutil
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from pathlib import Path
+
+import click
+
+from scim2_cli import jsonlib
+from scim2_cli import timings
+from scim2_cli.utils import RSTCommand
+from scim2_cli.utils import RSTGroup
+from scim2_cli.utils import default_cache_dir
+
+DEFAULT_IDLE_TIMEOUT = 900
+ENV_PREFIX = "SCIM_CLI_"
+# interactive and daemon management commands are always run by the calling process
+LOCAL_COMMANDS = ("daemon", "shell")
+# the options that change for every invocation, and are not part of the profile
+INVOCATION_PARAMS = ("output", "output_format", "async_runtime", "refresh_discovery")
+# the objects built by the main command that are kept between invocations
+WARM_STATE = ("client", "discovery")
+STDOUT = b"o"
+STDERR = b"e"
+EXIT = b"x"
+FRAME_HEADER = struct.Struct("!cI")
+CHUNK_SIZE = 64 * 1024
+
+
+def default_socket_path() -> Path:
+    return Path(
+        os.environ.get("SCIM_CLI_DAEMON_SOCKET") or default_cache_dir() / "daemon.sock"
+    )
+
+
+def send_frame(stream, channel: bytes, data: bytes) -> None:
+    stream.write(FRAME_HEADER.pack(channel, len(data)) + data)
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes | None:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def connect(path) -> socket.socket | None:
+    """Connect to a running daemon, or return :data:`None` if there is none."""
+    if not os.path.exists(path):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(os.fspath(path))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def forward(
+    argv: list[str],
+    path=None,
+    stdin=None,
+    stdout=None,
+    stderr=None,
+    prog_name: str = "scim",
+):
+    """Run a command with a daemon, if one is running.
+
+    The arguments, the :code:`SCIM_CLI_*` environment variables, the working directory
+    and the standard input are sent to the daemon, and its outputs are written back
+    as soon as they are received.
+
+    :return: The exit code of the command, or :data:`None` if no daemon could run it.
+    """
+    if any(arg in LOCAL_COMMANDS for arg in argv):
+        return None
+
+    sock = connect(path or default_socket_path())
+    if sock is None:
+        return None
+
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout.buffer
+    stderr = stderr or sys.stderr.buffer
+    is_terminal = stdin.isatty()
+    header = {
+        "argv": argv,
+        "prog_name": prog_name,
+        "env": {
+            key: value
+            for key, value in os.environ.items()
+            if key.startswith(ENV_PREFIX)
+        },
+        "cwd": os.getcwd(),
+        "terminal": is_terminal,
+        "columns": shutil.get_terminal_size().columns,
+    }
+
+    with sock:
+        sock.sendall(jsonlib.dumps(header).encode() + b"\n")
+        if is_terminal:
+            sock.shutdown(socket.SHUT_WR)
+        else:
+            threading.Thread(
+                target=send_stdin,
+                args=(sock, getattr(stdin, "buffer", stdin)),
+                daemon=True,
+            ).start()
+
+        try:
+            while frame := recv_exactly(sock, FRAME_HEADER.size):
+                channel, size = FRAME_HEADER.unpack(frame)
+                data = recv_exactly(sock, size) if size else b""
+                if channel == EXIT:
+                    return int(data)
+
+                stream = stdout if channel == STDOUT else stderr
+                stream.write(data)
+                stream.flush()
+        except OSError:  # pragma: no cover
+            pass
+
+    click.echo("Error: The daemon connection was closed.", err=True)
+    return 1
+
+
+def send_stdin(sock: socket.socket, stream) -> None:
+    # reading the file descriptor directly does not hold the stream lock,
+    # that would prevent the interpreter to exit while waiting for inputs
+    try:
+        fd = stream.fileno()
+    except (AttributeError, OSError):
+        read = stream.read
+    else:  # pragma: no cover
+        read = functools.partial(os.read, fd)
+
+    try:
+        while chunk := read(CHUNK_SIZE):
+            sock.sendall(chunk)
+        sock.shutdown(socket.SHUT_WR)
+    except OSError:
+        # the command ended without reading all its input
+        pass
+
+
+class FrameWriter(io.RawIOBase):
+    """Binary stream sending its writes to a daemon client, on a given channel."""
+
+    def __init__(self, stream, channel: bytes):
+        self.stream = stream
+        self.channel = channel
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        if data:
+            send_frame(self.stream, self.channel, data)
+        return len(data)
+
+
+class TerminalInput(io.StringIO):
+    """Empty standard input, standing for the terminal of a daemon client."""
+
+    def isatty(self) -> bool:
+        return True
+
+
+@contextmanager
+def invocation_environment(env: dict[str, str], cwd: str, stdin, stdout, stderr):
+    """Temporarily give the process the environment, the working directory and the streams of a client."""
+    streams = sys.stdin, sys.stdout, sys.stderr
+    environ = {
+        key: value for key, value in os.environ.items() if key.startswith(ENV_PREFIX)
+    }
+    previous_cwd = os.getcwd()
+
+    for key in environ:
+        del os.environ[key]
+    os.environ.update(env)
+    sys.stdin, sys.stdout, sys.stderr = stdin, stdout, stderr
+    try:
+        os.chdir(cwd)
+        yield
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = streams
+        os.chdir(previous_cwd)
+        for key in env:
+            del os.environ[key]
+        os.environ.update(environ)
+
+
+def profile_key(ctx: click.Context, cwd: str) -> tuple:
+    """Identify the main command parameters that the warmed state depends on."""
+
+    def freeze(value):
+        if isinstance(value, list | tuple):
+            return tuple(freeze(item) for item in value)
+        if isinstance(value, io.IOBase):
+            return value.name
+        return value
+
+    return (cwd,) + tuple(
+        (name, freeze(value))
+        for name, value in sorted(ctx.params.items())
+        if name not in INVOCATION_PARAMS
+    )
+
+
+def expire_profile(profiles: dict, key: tuple) -> None:
+    """Forget a warmed profile, and close its connections."""
+    profile = profiles.pop(key)
+    profile["client"].client.close()
+
+
+def invoke(
+    profiles: dict, argv: list[str], cwd: str, prog_name: str, columns: int
+) -> int:
+    """Run a command in the daemon process, and return its exit code.
+
+    The client and the discovery state of the previous invocations with the same
+    main command parameters are reused, until they are older than the discovery
+    cache TTL, or until :code:`--refresh-discovery` is passed.
+    """
+    from scim2_cli import cli
+
+    invoked_at = time.perf_counter()
+    try:
+        with cli.make_context(prog_name, list(argv), terminal_width=columns) as ctx:
+            ctx.meta[timings.INVOKED_AT] = invoked_at
+            if ctx.protected_args and ctx.protected_args[0] in LOCAL_COMMANDS:
+                raise click.UsageError(
+                    f"The '{ctx.protected_args[0]}' command cannot be run by the daemon."
+                )
+
+            key = profile_key(ctx, cwd)
+            profile = profiles.get(key)
+            if profile and time.monotonic() - profile["warmed_at"] > ctx.params.get(
+                "cache_ttl", 0
+            ):
+                expire_profile(profiles, key)
+                profile = None
+
+            ctx.obj = {name: profile[name] for name in WARM_STATE} if profile else {}
+            try:
+                cli.invoke(ctx)
+            finally:
+                if "client" in ctx.obj:
+                    discovered = profile is None or ctx.params.get("refresh_discovery")
+                    profiles[key] = {
+                        **{name: ctx.obj[name] for name in WARM_STATE},
+                        "warmed_at": time.monotonic()
+                        if discovered
+                        else profile["warmed_at"],
+                    }
+
+    except click.ClickException as exc:
+        exc.show()
+        return exc.exit_code
+    except click.exceptions.Exit as exc:
+        return exc.exit_code
+    except SystemExit as exc:
+        # commands such as 'test' exit with sys.exit, which must not stop the daemon
+        if exc.code is None or isinstance(exc.code, int):
+            return exc.code or 0
+        click.echo(exc.code, err=True)
+        return 1
+    except click.Abort:
+        click.echo("Aborted!", err=True)
+        return 1
+    except Exception:
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            # connections only checking whether the daemon is running
+            return
+
+        header = jsonlib.loads(line)
+        if header.get("stop"):
+            self.server.running = False
+            send_frame(self.wfile, EXIT, b"0")
+            return
+
+        stdin = (
+            TerminalInput()
+            if header["terminal"]
+            else io.TextIOWrapper(self.rfile, encoding="utf-8")
+        )
+        stdout, stderr = (
+            io.TextIOWrapper(
+                FrameWriter(self.wfile, channel), encoding="utf-8", write_through=True
+            )
+            for channel in (STDOUT, STDERR)
+        )
+        with invocation_environment(
+            header["env"], header["cwd"], stdin, stdout, stderr
+        ):
+            status = invoke(
+                self.server.profiles,
+                header["argv"],
+                header["cwd"],
+                header["prog_name"],
+                header["columns"],
+            )
+
+        send_frame(self.wfile, EXIT, str(status).encode())
+
+
+class DaemonServer(socketserver.UnixStreamServer):
+    """Unix socket server running the forwarded commands one at a time.
+
+    :param path: The path of the socket.
+    :param idle_timeout: Number of seconds without any command after which the server stops.
+    """
+
+    def __init__(self, path, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self.path.unlink()
+
+        super().__init__(os.fspath(self.path), DaemonHandler)
+        self.path.chmod(0o600)
+        self.timeout = idle_timeout
+        self.profiles = {}
+        self.running = True
+
+    def handle_timeout(self):
+        self.running = False
+
+    def serve(self) -> None:
+        """Handle the commands until the server is stopped or idle."""
+        try:
+            while self.running:
+                self.handle_request()
+        finally:
+            self.server_close()
+            self.path.unlink(missing_ok=True)
+
+
+@click.group(cls=RSTGroup, name="daemon")
+def daemon_cli():
+    """Run the commands in a background process, that keeps the clients and the connections.
+
+    Once the daemon is started, the next :code:`scim` commands are sent to it through a
+    Unix socket, and skip the startup, the server discovery and the connection establishment.
+
+    .. code-block:: console
+
+        $ scim daemon start
+        $ scim --url https://scim.example query user
+
+    The daemon keeps a client for each set of main command options.
+    :code:`SCIM_CLI_*` environment variables are passed along with each command.
+    """
+
+
+socket_option = click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False),
+    default=default_socket_path,
+    help="Path of the daemon Unix socket.",
+    envvar="SCIM_CLI_DAEMON_SOCKET",
+)
+
+
+@daemon_cli.command(cls=RSTCommand, name="start")
+@socket_option
+@click.option(
+    "--idle-timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=DEFAULT_IDLE_TIMEOUT,
+    show_default=True,
+    help="Number of seconds without any command after which the daemon stops.",
+)
+@click.option(
+    "--foreground",
+    is_flag=True,
+    help="Run the daemon in the current process instead of in background.",
+)
+def start_cli(socket_path, idle_timeout, foreground):
+    """Start the daemon."""
+    sock = connect(socket_path)
+    if sock is not None:
+        sock.close()
+        raise click.ClickException(f"A daemon is already running on {socket_path}.")
+
+    server = DaemonServer(socket_path, idle_timeout)
+    click.echo(f"Daemon listening on {socket_path}", err=True)
+    if foreground:
+        server.serve()
+    else:
+        detach(server)
+
+
+def detach(server: DaemonServer) -> None:  # pragma: no cover
+    """Serve in a child process, detached from the terminal."""
+    if os.fork():
+        server.socket.close()
+        return
+
+    os.setsid()
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in range(3):
+        os.dup2(devnull, fd)
+    server.serve()
+    os._exit(0)
+
+
+@daemon_cli.command(cls=RSTCommand, name="stop")
+@socket_option
+def stop_cli(socket_path):
+    """Stop the daemon."""
+    sock = connect(socket_path)
+    if sock is None:
+        raise click.ClickException(f"No daemon is running on {socket_path}.")
+
+    with sock:
+        sock.sendall(jsonlib.dumps({"stop": True}).encode() + b"\n")
+        recv_exactly(sock, FRAME_HEADER.size + 1)
@@ -1,52 +1,257 @@
+import itertools
+from collections.abc import Iterable
+from collections.abc import Iterator
+
 import click
 from click import ClickException
 from scim2_client import SCIMClientError
-from scim2_models import Message
-from scim2_models import Resource
-from sphinx_click.rst_to_ansi_formatter import make_rst_to_ansi_formatter
 
+from scim2_cli.discovery import available_resource_types
+from scim2_cli.discovery import get_resource_endpoint_model
+from scim2_cli.discovery import require_discovery
+from scim2_cli.output import get_output
 from scim2_cli.utils import exception_to_click_error
 
-from .utils import DOC_URL
-from .utils import formatted_payload
+from .bulk import is_bulk_supported
+from .bulk import iter_bulk_results
+from .pagination import iter_all_resources
+from .pagination import paginated_search_request
+from .utils import RSTCommand
+from .utils import concurrency_options
+from .utils import echo_ndjson_results
+from .utils import iter_ndjson
+from .utils import record_context
+
+
+def delete_resource(client, resource_model, id):
+    try:
+        return client.delete(resource_model, id, raise_scim_errors=False)
+
+    except SCIMClientError as scim_exc:
+        raise exception_to_click_error(scim_exc) from scim_exc
+
+
+def record_id(record) -> str:
+    """Extract a resource id from a newline delimited JSON record.
+
+    Records can either be JSON strings, or objects with an :code:`id` attribute.
+    """
+    if isinstance(record, dict):
+        try:
+            return record["id"]
+        except KeyError as exc:
+            raise ClickException("Missing 'id' attribute") from exc
+    return str(record)
+
+
+def filter_fetcher(client, resource_model, filter: str):
+    """Return a function fetching a page of the ids of the resources matching a filter."""
+    search_request = {"filter": filter, "attributes": ["id"]}
+
+    def fetch(start_index, count):
+        return client.query(
+            resource_model,
+            search_request=paginated_search_request(search_request, start_index, count),
+            check_request_payload=False,
+            check_response_payload=False,
+        )
+
+    return fetch
+
+
+def check_max(count: int, max: int | None) -> None:
+    if max is not None and count > max:
+        raise ClickException(
+            f"More than {max} resources would be deleted. Raise --max to delete them."
+        )
+
+
+def count_filtered(client, resource_model, filter: str) -> int:
+    """Return the number of resources matching a filter, from the first result page."""
+    fetch = filter_fetcher(client, resource_model, filter)
+    try:
+        return fetch(1, 1).get("totalResults") or 0
+    except SCIMClientError as scim_exc:
+        raise exception_to_click_error(scim_exc) from scim_exc
+
+
+def iter_filtered_ids(
+    client, resource_model, filter: str, max: int | None = None
+) -> Iterator[tuple[int, str]]:
+    """Walk through all the result pages of a filter, and yield the ids of the matching resources, numbered from 1.
+
+    The :code:`totalResults` of the first page is checked against :code:`max`
+    before the next pages are requested.
+    """
+    fetch = filter_fetcher(client, resource_model, filter)
+    first_page = True
 
+    def checked_fetch(start_index, count):
+        nonlocal first_page
+        page = fetch(start_index, count)
+        if first_page:
+            first_page = False
+            check_max(page.get("totalResults") or 0, max)
+        return page
 
-@click.command(cls=make_rst_to_ansi_formatter(DOC_URL), name="delete")
+    try:
+        # deletions shift the result pages, so all the ids are fetched beforehand
+        resources = list(iter_all_resources(checked_fetch))
+    except SCIMClientError as scim_exc:
+        raise exception_to_click_error(scim_exc) from scim_exc
+
+    return enumerate((resource["id"] for resource in resources), start=1)
+
+
+def limit_records(records: Iterable[tuple], max: int) -> list[tuple]:
+    """Read at most :code:`max` records, and fail if there are more."""
+    limited = list(itertools.islice(records, max + 1))
+    check_max(len(limited), max)
+    return limited
+
+
+@click.command(cls=RSTCommand, name="delete")
 @click.argument("resource-type", required=True)
-@click.argument("id", required=True)
+@click.argument("id", required=False)
 @click.option(
     "--indent/--no-indent",
     is_flag=True,
     default=True,
     help="Indent JSON response payloads.",
 )
+@click.option(
+    "--ndjson",
+    is_flag=True,
+    help="Read newline delimited resource ids or resources from stdin, and delete one resource per line.",
+)
+@click.option(
+    "--filter",
+    help="Delete all the resources matching a filter.",
+)
+@click.option(
+    "--max",
+    "max_count",
+    type=click.IntRange(min=0),
+    help="With --ndjson or --filter, fail without deleting anything if more resources would be deleted.",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    help="With --ndjson or --filter, print the number of resources that would be deleted instead of deleting them.",
+)
+@click.option(
+    "--bulk/--no-bulk",
+    default=None,
+    help="With --ndjson or --filter, delete the resources with bulk requests. By default, bulk requests are used with --filter when the server supports them.",
+)
+@concurrency_options
 @click.pass_context
-def delete_cli(ctx, resource_type, id, indent):
+def delete_cli(
+    ctx,
+    resource_type,
+    id,
+    indent,
+    ndjson,
+    filter,
+    max_count,
+    dry_run,
+    bulk,
+    concurrency,
+    unordered,
+):
     """Perform a `SCIM DELETE query <https://www.rfc-editor.org/rfc/rfc7644#section-3.6>`_ request.
 
     .. code-block:: bash
 
          delete user 1234
+
+    With :code:`--ndjson`, ids are read line by line from stdin.
+    Lines can be JSON strings or resources with an :code:`id` attribute:
+
+    .. code-block:: bash
+
+         scim query user --filter 'userName sw "test"' | jq -c '.Resources[]' | delete user --ndjson --concurrency 8
+
+    With :code:`--filter`, all the matching resources are deleted.
+    :code:`--max` prevents deleting more resources than expected, and :code:`--dry-run` only counts them:
+
+    .. code-block:: bash
+
+         delete user --filter 'userName sw "test"' --max 500 --concurrency 8
+
+    With :code:`--filter`, resources are deleted with bulk requests when the server supports them.
     """
-    try:
-        resource_model = ctx.obj["resource_models"][resource_type]
-    except KeyError as exc:
-        ok_values = ", ".join(ctx.obj["resource_models"])
+    if ndjson and filter:
+        raise click.UsageError("--ndjson and --filter cannot be used together.")
+
+    if not id and not ndjson and not filter:
+        raise click.UsageError("Missing argument 'ID'.")
+
+    if id and (ndjson or filter):
+        raise click.UsageError("--ndjson and --filter cannot be used with an ID.")
+
+    resource_model = get_resource_endpoint_model(ctx, resource_type)
+    if not resource_model:
+        ok_values = ", ".join(available_resource_types(ctx))
         raise ClickException(
             f"Unknown resource type '{resource_type}'. Available values are: {ok_values}'"
-        ) from exc
+        )
 
-    try:
-        response = ctx.obj["client"].delete(resource_model, id, raise_scim_errors=False)
+    client = ctx.obj["client"]
+    if id:
+        response = delete_resource(client, resource_model, id)
+        if response:
+            get_output(ctx, indent).write(response)
+        return
 
-    except SCIMClientError as scim_exc:
-        raise exception_to_click_error(scim_exc) from scim_exc
+    # streamed stdin deletions only use bulk requests on demand
+    if bulk or (bulk is None and filter and not dry_run):
+        require_discovery(ctx, "service_provider_config")
+        if bulk and not is_bulk_supported(client):
+            raise ClickException("The server does not support bulk operations.")
+        bulk = is_bulk_supported(client)
 
-    if response:
-        payload = (
-            response.model_dump()
-            if isinstance(response, Resource | Message)
-            else response
+    if filter and dry_run:
+        count = count_filtered(client, resource_model, filter)
+        check_max(count, max_count)
+        click.echo(f"{count} resources would be deleted.")
+        return
+
+    records = (
+        iter_filtered_ids(client, resource_model, filter, max_count)
+        if filter
+        else enumerate(iter_ndjson(), start=1)
+    )
+    if max_count is not None:
+        records = limit_records(records, max_count)
+
+    if dry_run:
+        count = sum(1 for _ in records)
+        click.echo(f"{count} resources would be deleted.")
+        return
+
+    if not bulk:
+        echo_ndjson_results(
+            ctx,
+            lambda client, record: client.delete(
+                resource_model, record_id(record), raise_scim_errors=False
+            ),
+            records,
+            concurrency=concurrency,
+            ordered=not unordered,
+            indexed=True,
         )
-        payload = formatted_payload(payload, indent)
-        click.echo(payload)
+        return
+
+    endpoint = client.resource_endpoint(resource_model)
+
+    def operations():
+        for index, record in records:
+            with record_context(index):
+                id = record_id(record)
+            yield {"method": "DELETE", "path": f"{endpoint}/{id}", "bulkId": str(index)}
+
+    try:
+        get_output(ctx, indent=False).write_all(iter_bulk_results(client, operations()))
+    except SCIMClientError as scim_exc:
+        raise exception_to_click_error(scim_exc) from scim_exc
@@ -0,0 +1,354 @@
+import contextvars
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import click
+from scim2_client import SCIMClientError
+from scim2_client.engines.httpx import handle_request_error
+from scim2_client.engines.httpx import handle_response_error
+from scim2_models import Context
+from scim2_models import Group
+from scim2_models import ListResponse
+from scim2_models import Resource
+from scim2_models import ResourceType
+from scim2_models import Schema
+from scim2_models import ServiceProviderConfig
+from scim2_models import User
+
+from scim2_cli.timings import phase
+from scim2_cli.utils import exception_to_click_error
+
+RESOURCE_MODELS_CACHE: dict[str, tuple[type[Resource], ...]] = {}
+SCHEMA_MODELS_CACHE: dict[str, type[Resource]] = {}
+DISCOVERY_ENDPOINTS = {
+    ListResponse[ResourceType]: "/ResourceTypes",
+    ListResponse[Schema]: "/Schemas",
+    ServiceProviderConfig: "/ServiceProviderConfig",
+}
+
+
+def payload_hash(*payloads) -> str:
+    return hashlib.sha256(
+        json.dumps(payloads, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def build_resource_models(
+    scim_client, resource_types: list[ResourceType], schemas: list[Schema]
+) -> tuple[type[Resource], ...]:
+    """Build the resource models, reusing the models built for identical schemas.
+
+    Dynamic models cannot be pickled, so they are only kept for the lifetime of the process.
+    """
+    key = payload_hash(
+        [resource_type.model_dump() for resource_type in resource_types or []],
+        [schema.model_dump() for schema in schemas],
+    )
+    if key not in RESOURCE_MODELS_CACHE:
+        with phase("from_schema"):
+            RESOURCE_MODELS_CACHE[key] = scim_client.build_resource_models(
+                resource_types, schemas
+            )
+    return RESOURCE_MODELS_CACHE[key]
+
+
+def model_from_schema(schema: Schema) -> type[Resource]:
+    """Build a model from a schema, reusing the model built for an identical schema."""
+    key = payload_hash(schema.model_dump())
+    if key not in SCHEMA_MODELS_CACHE:
+        with phase("from_schema"):
+            SCHEMA_MODELS_CACHE[key] = Resource.from_schema(schema)
+    return SCHEMA_MODELS_CACHE[key]
+
+
+def load_config_files(
+    schemas_fd, resource_types_fd, service_provider_config_fd
+) -> tuple[
+    list[type[Resource]], list[ResourceType] | None, ServiceProviderConfig | None
+]:
+    if schemas_fd:
+        schemas_payload = json.load(schemas_fd)
+        if isinstance(schemas_payload, dict):
+            schemas_obj = ListResponse[Schema].model_validate(schemas_payload).resources
+        else:
+            schemas_obj = [Schema.model_validate(schema) for schema in schemas_payload]
+        resource_models = [model_from_schema(schema) for schema in schemas_obj]
+
+    else:
+        resource_models = [User, Group]
+
+    if resource_types_fd:
+        resource_types_payload = json.load(resource_types_fd)
+        if isinstance(schemas_payload, dict):
+            resource_types = (
+                ListResponse[ResourceType]
+                .model_validate(resource_types_payload)
+                .resources
+            )
+        else:
+            resource_types = [
+                ResourceType.model_validate(item) for item in resource_types_payload
+            ]
+    else:
+        resource_types = None
+
+    if service_provider_config_fd:
+        spc_payload = json.load(service_provider_config_fd)
+        service_provider_config = ServiceProviderConfig.model_validate(spc_payload)
+    else:
+        service_provider_config = None
+
+    return resource_models, resource_types, service_provider_config
+
+
+class DiscoveryCache:
+    """Store the server discovery payloads on disk.
+
+    Entries are keyed by a hash of the server URL and the request headers,
+    so authentication tokens are never written in clear on the disk.
+    """
+
+    def __init__(self, directory, url: str, headers: dict[str, str], ttl: int):
+        key = hashlib.sha256(
+            json.dumps([str(url), sorted(headers.items())]).encode()
+        ).hexdigest()
+        self.path = Path(directory) / "discovery" / f"{key}.json"
+        self.ttl = ttl
+        self.entries = self.load()
+        self.lock = threading.Lock()
+
+    def load(self) -> dict:
+        try:
+            with open(self.path) as fd:
+                return json.load(fd)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        """Atomically write the entries, so concurrent invocations never read partial files."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent)
+            with os.fdopen(fd, "w") as tmp:
+                json.dump(self.entries, tmp)
+            os.replace(tmp_path, self.path)
+        except OSError:  # pragma: no cover
+            pass
+
+    def get(self, endpoint: str) -> dict | None:
+        return self.entries.get(endpoint)
+
+    def set(self, endpoint: str, entry: dict) -> None:
+        with self.lock:
+            self.entries[endpoint] = entry
+            self.save()
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry.get("fetched_at", 0) < self.ttl
+
+
+def fetch_discovery_payload(
+    scim_client, endpoint: str, cache: DiscoveryCache | None, refresh: bool = False
+) -> dict:
+    """Fetch a discovery endpoint payload, reusing the cache when possible.
+
+    Fresh cache entries are used without any network request.
+    Stale entries are revalidated with :code:`If-None-Match` or :code:`If-Modified-Since`
+    when the server previously sent an :code:`ETag` or a :code:`Last-Modified` header.
+    """
+    entry = cache.get(endpoint) if cache else None
+    if entry and not refresh and cache.is_fresh(entry):
+        return entry["payload"]
+
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    with handle_request_error():
+        response = scim_client.client.get(endpoint, headers=headers)
+
+    if entry and response.status_code == 304:
+        entry["fetched_at"] = time.time()
+        cache.set(endpoint, entry)
+        return entry["payload"]
+
+    with handle_response_error(response):
+        payload = response.json() if response.text else None
+        scim_client.check_response(
+            payload=payload,
+            status_code=response.status_code,
+            headers=response.headers,
+            expected_status_codes=scim_client.QUERY_RESPONSE_STATUS_CODES,
+        )
+
+    if cache:
+        cache.set(
+            endpoint,
+            {
+                "payload": payload,
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "fetched_at": time.time(),
+            },
+        )
+
+    return payload
+
+
+def fetch_discovery_object(
+    scim_client, expected_type, cache: DiscoveryCache | None, refresh: bool = False
+):
+    endpoint = DISCOVERY_ENDPOINTS[expected_type]
+    try:
+        payload = fetch_discovery_payload(scim_client, endpoint, cache, refresh)
+        return scim_client.check_response(
+            payload=payload,
+            status_code=200,
+            headers={"content-type": "application/scim+json"},
+            expected_types=[expected_type],
+            scim_ctx=Context.RESOURCE_QUERY_RESPONSE,
+        )
+    except SCIMClientError as exc:
+        exc.message = f"Error while fetching {endpoint}: {exc.message}"
+        raise
+
+
+def discover(
+    scim_client,
+    cache: DiscoveryCache | None = None,
+    refresh: bool = False,
+    schemas: bool = True,
+    resource_types: bool = True,
+    service_provider_config: bool = True,
+) -> None:
+    """Dynamically discover the server configuration objects.
+
+    This behaves like :meth:`~scim2_client.BaseSyncSCIMClient.discover` but
+    goes through the :class:`DiscoveryCache` when one is passed, and the
+    endpoints are fetched concurrently.
+    """
+    expected_types = [
+        expected_type
+        for expected_type, needed in (
+            (ListResponse[ResourceType], resource_types),
+            (ListResponse[Schema], schemas),
+            (ServiceProviderConfig, service_provider_config),
+        )
+        if needed
+    ]
+    if not expected_types:
+        return
+
+    with ThreadPoolExecutor(max_workers=len(expected_types)) as executor:
+        futures = {
+            # the context is copied so the requests are measured as nested phases
+            expected_type: executor.submit(
+                contextvars.copy_context().run,
+                fetch_discovery_object,
+                scim_client,
+                expected_type,
+                cache,
+                refresh,
+            )
+            for expected_type in expected_types
+        }
+
+    if resource_types:
+        scim_client.resource_types = (
+            futures[ListResponse[ResourceType]].result().resources
+        )
+
+    if schemas:
+        scim_client.resource_models = build_resource_models(
+            scim_client,
+            scim_client.resource_types,
+            futures[ListResponse[Schema]].result().resources,
+        )
+
+    if service_provider_config:
+        scim_client.service_provider_config = futures[ServiceProviderConfig].result()
+
+
+def require_discovery(ctx: click.Context, *endpoints: str) -> None:
+    """Discover the server configuration objects needed by a command, if they have not been loaded yet.
+
+    :param endpoints: Any of :code:`schemas`, :code:`resource_types` and :code:`service_provider_config`.
+    """
+    discovery = ctx.obj["discovery"]
+    needed = set(endpoints)
+    # resource models are built from both the schemas and the resource types
+    if "schemas" in needed:
+        needed.add("resource_types")
+    needed &= discovery["pending"]
+    if not needed:
+        return
+
+    try:
+        with phase("discover"):
+            discover(
+                ctx.obj["client"],
+                cache=discovery["cache"],
+                refresh=discovery["refresh"],
+                schemas="schemas" in needed,
+                resource_types="resource_types" in needed,
+                service_provider_config="service_provider_config" in needed,
+            )
+    except SCIMClientError as exc:
+        raise exception_to_click_error(exc) from exc
+
+    discovery["pending"] -= needed
+    ctx.obj.pop("resource_models", None)
+
+
+def get_resource_models(ctx: click.Context) -> dict[str, type[Resource]]:
+    """Return the server resource models indexed by their lowercase names, discovering them if needed."""
+    require_discovery(ctx, "schemas", "resource_types")
+    if "resource_models" not in ctx.obj:
+        ctx.obj["resource_models"] = {
+            re.sub(r"\[.*\]", "", resource_model.__name__.lower()): resource_model
+            for resource_model in ctx.obj["client"].resource_models
+        }
+    return ctx.obj["resource_models"]
+
+
+def get_resource_endpoint_model(ctx: click.Context, name: str) -> type[Resource] | None:
+    """Return a model usable to reach the endpoint of a resource type.
+
+    If the schemas have not been discovered, only the resource types are fetched,
+    and a naive model without attributes is built from the matching resource type.
+    """
+    if "schemas" not in ctx.obj["discovery"]["pending"]:
+        return get_resource_models(ctx).get(name)
+
+    require_discovery(ctx, "resource_types")
+    client = ctx.obj["client"]
+    for resource_type in client.resource_types or []:
+        if resource_type.name.lower() != name:
+            continue
+
+        schema = Schema(id=resource_type.schema_, name=resource_type.name)
+        model = model_from_schema(schema)
+        client.resource_models = (*client.resource_models, model)
+        return model
+
+    return None
+
+
+def available_resource_types(ctx: click.Context) -> list[str]:
+    """Return the lowercase names of the resource types already known."""
+    if "schemas" not in ctx.obj["discovery"]["pending"]:
+        return list(get_resource_models(ctx))
+
+    return [
+        resource_type.name.lower()
+        for resource_type in ctx.obj["client"].resource_types or []
+    ]
@@ -0,0 +1,224 @@
+import datetime
+import gzip
+import hashlib
+from collections.abc import Iterable
+from pathlib import Path
+
+import click
+from scim2_models import SearchRequest
+
+from scim2_cli import jsonlib
+from scim2_cli.discovery import get_resource_models
+from scim2_cli.output import get_output
+from scim2_cli.pagination import echo_all_resources
+from scim2_cli.pagination import paginated_search_request
+from scim2_cli.utils import INDENTATION_SIZE
+from scim2_cli.utils import RSTCommand
+
+DEFAULT_EXPORT_CONCURRENCY = 4
+MANIFEST_FILE = "manifest.json"
+NDJSON_SUFFIX = ".ndjson"
+GZIP_SUFFIX = ".gz"
+PARTIAL_SUFFIX = ".part"
+
+
+class ChecksumWriter:
+    """Binary stream wrapper computing the checksum and the size of the written data."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.hash.update(data)
+        self.size += len(data)
+        return self.stream.write(data)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+class ExportFile:
+    """Write resources to a newline delimited JSON file, optionally compressed with gzip.
+
+    The file is written under a temporary name, and only gets its final name
+    when all the resources have been written.
+    The checksum is computed on the written bytes, so the file is never read again.
+    """
+
+    def __init__(self, path: Path, compress: bool = False):
+        self.path = path
+        self.partial_path = path.with_name(path.name + PARTIAL_SUFFIX)
+        self.file = open(self.partial_path, "wb")
+        self.checksum = ChecksumWriter(self.file)
+        # a fixed modification time makes identical exports byte-identical
+        self.stream = (
+            gzip.GzipFile(fileobj=self.checksum, mode="wb", mtime=0)
+            if compress
+            else self.checksum
+        )
+        self.count = 0
+
+    def write_item(self, item: dict) -> None:
+        self.stream.write((jsonlib.dumps(item) + "\n").encode())
+        self.count += 1
+
+    def close(self) -> None:
+        if self.stream is not self.checksum:
+            self.stream.close()
+        self.file.close()
+        self.partial_path.replace(self.path)
+
+    def write_all(self, items: Iterable[dict]) -> None:
+        for item in items:
+            self.write_item(item)
+        self.close()
+
+    def abort(self) -> None:
+        """Close and remove an incomplete file."""
+        if self.stream is not self.checksum:
+            self.stream.close()
+        self.file.close()
+        self.partial_path.unlink(missing_ok=True)
+
+    def manifest_entry(self, resource_type: str) -> dict:
+        return {
+            "resourceType": resource_type,
+            "file": self.path.name,
+            "count": self.count,
+            "size": self.checksum.size,
+            "sha256": self.checksum.hash.hexdigest(),
+        }
+
+
+def export_file_name(resource_type: str, compress: bool) -> str:
+    return resource_type + NDJSON_SUFFIX + (GZIP_SUFFIX if compress else "")
+
+
+def export_resources(
+    ctx,
+    model,
+    search_request: SearchRequest,
+    path: Path,
+    compress: bool,
+    concurrency: int,
+) -> ExportFile:
+    """Write all the resources of a resource type in a file.
+
+    The first page gives the total number of results, and the following pages are
+    requested in parallel. Only a few pages are kept in memory at once.
+    """
+
+    def fetch(client, start_index, count):
+        return client.query(
+            model,
+            search_request=paginated_search_request(search_request, start_index, count),
+        )
+
+    export_file = ExportFile(path, compress)
+    try:
+        echo_all_resources(ctx, fetch, search_request, concurrency, export_file)
+    except BaseException:
+        export_file.abort()
+        raise
+    return export_file
+
+
+@click.command(cls=RSTCommand, name="export")
+@click.argument(
+    "directory", type=click.Path(file_okay=False, writable=True, path_type=Path)
+)
+@click.option(
+    "--resource-type",
+    "resource_types",
+    multiple=True,
+    help="The resource types to export. Can be passed multiple times. Defaults to all the resource types of the server.",
+)
+@click.option(
+    "--attribute",
+    multiple=True,
+    help="The names of the resource attributes to export, instead of the attributes returned by default.",
+)
+@click.option(
+    "--excluded-attribute",
+    multiple=True,
+    help="The names of the resource attributes not to export.",
+)
+@click.option(
+    "--count",
+    type=click.IntRange(min=1),
+    help="The number of resources requested per page.",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=DEFAULT_EXPORT_CONCURRENCY,
+    show_default=True,
+    help="The number of pages requested simultaneously.",
+)
+@click.option(
+    "--gzip",
+    "compress",
+    is_flag=True,
+    help="Compress the files with gzip.",
+)
+@click.pass_context
+def export_cli(
+    ctx,
+    directory: Path,
+    resource_types: list[str],
+    attribute: list[str],
+    excluded_attribute: list[str],
+    count: int | None,
+    concurrency: int,
+    compress: bool,
+):
+    """Export all the resources of the server in a directory.
+
+    Each resource type is written in a newline delimited JSON file, such as :code:`user.ndjson`.
+    A :code:`manifest.json` file lists the files with their number of resources and their
+    SHA-256 checksums. The manifest is also printed when the export is done.
+
+    .. code-block:: bash
+
+        export backup/ --resource-type user --attribute userName --gzip
+
+    The result pages are requested in parallel, and written as they are received,
+    so memory usage does not grow with the number of resources.
+    """
+    resource_models = get_resource_models(ctx)
+    for resource_type in resource_types:
+        if resource_type not in resource_models:
+            ok_values = ", ".join(resource_models)
+            raise click.ClickException(
+                f"Unknown resource type '{resource_type}'. Available values are: {ok_values}"
+            )
+
+    search_request = SearchRequest(
+        attributes=attribute,
+        excluded_attributes=excluded_attribute,
+        count=count,
+    )
+    directory.mkdir(parents=True, exist_ok=True)
+    entries = []
+    for resource_type in resource_types or resource_models:
+        export_file = export_resources(
+            ctx,
+            resource_models[resource_type],
+            search_request,
+            directory / export_file_name(resource_type, compress),
+            compress,
+            concurrency,
+        )
+        entries.append(export_file.manifest_entry(resource_type))
+
+    manifest = {
+        "url": str(ctx.obj["client"].client.base_url),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "resources": entries,
+    }
+    (directory / MANIFEST_FILE).write_text(
+        jsonlib.dumps(manifest, indent=INDENTATION_SIZE) + "\n"
+    )
+    get_output(ctx).write(manifest)
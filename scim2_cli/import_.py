@@ -0,0 +1,319 @@
+import gzip
+import inspect
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import click
+from scim2_client import SCIMClientError
+from scim2_models import Error
+
+from scim2_cli import jsonlib
+from scim2_cli.bulk import is_bulk_supported
+from scim2_cli.bulk import iter_bulk_results
+from scim2_cli.discovery import require_discovery
+from scim2_cli.export import GZIP_SUFFIX
+from scim2_cli.export import MANIFEST_FILE
+from scim2_cli.export import NDJSON_SUFFIX
+from scim2_cli.output import get_output
+from scim2_cli.utils import RSTCommand
+from scim2_cli.utils import echo_ndjson_results
+from scim2_cli.utils import exception_to_click_error
+from scim2_cli.utils import iter_ndjson
+from scim2_cli.utils import record_context
+
+JOURNAL_FILE = "import-journal.sqlite3"
+ENTERPRISE_USER_SCHEMA = "urn:ietf:params:scim:schemas:extension:enterprise:2.0:User"
+# resources referencing other resources are imported last
+REFERENCING_RESOURCE_TYPES = ("group",)
+
+
+class ImportJournal:
+    """Record the imported resources, with their ids on the source and on the target servers.
+
+    The journal is a SQLite database, so resuming an import of millions of resources
+    does not need to load them in memory.
+    """
+
+    def __init__(self, path: Path):
+        self.directory = path.resolve().parent
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS imported"
+            " (file TEXT, line INTEGER, old_id TEXT, new_id TEXT,"
+            " PRIMARY KEY (file, line))"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS imported_old_id ON imported (old_id)"
+        )
+        self.connection.commit()
+        self.lock = threading.Lock()
+
+    def file_key(self, path: Path) -> str:
+        """Identify a source file by its path relative to the journal.
+
+        Files with the same name in different directories are distinct, and the
+        journal remains valid when it is moved along with the sources.
+        """
+        return os.path.relpath(path.resolve(), self.directory)
+
+    def is_imported(self, file: str, line: int) -> bool:
+        with self.lock:
+            cursor = self.connection.execute(
+                "SELECT 1 FROM imported WHERE file = ? AND line = ?", (file, line)
+            )
+            return cursor.fetchone() is not None
+
+    def new_id(self, old_id: str | None) -> str | None:
+        if old_id is None:
+            return None
+
+        with self.lock:
+            cursor = self.connection.execute(
+                "SELECT new_id FROM imported WHERE old_id = ?", (old_id,)
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def record(
+        self, file: str, line: int, old_id: str | None, new_id: str | None
+    ) -> None:
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO imported VALUES (?, ?, ?, ?)",
+                (file, line, old_id, new_id),
+            )
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def source_files(sources: list[Path]) -> list[Path]:
+    """List the files to import.
+
+    Directories are expected to be :ref:`export` directories. Their files are listed in
+    their manifest, and resources referencing other resources, such as groups, come last.
+    """
+    files = []
+    for source in sources:
+        if not source.is_dir():
+            files.append(source)
+            continue
+
+        manifest_path = source / MANIFEST_FILE
+        if manifest_path.exists():
+            manifest = jsonlib.loads(manifest_path.read_text())
+            paths = [source / entry["file"] for entry in manifest["resources"]]
+        else:
+            paths = sorted(
+                path
+                for path in source.iterdir()
+                if path.name.endswith((NDJSON_SUFFIX, NDJSON_SUFFIX + GZIP_SUFFIX))
+            )
+        files.extend(
+            sorted(
+                paths,
+                key=lambda path: path.name.split(".")[0] in REFERENCING_RESOURCE_TYPES,
+            )
+        )
+    return files
+
+
+def open_source(path: Path):
+    if path.name.endswith(GZIP_SUFFIX):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def remap_references(record: dict, journal: ImportJournal) -> None:
+    """Replace the ids of already imported resources in the references of a record."""
+    references = list(record.get("members") or [])
+    if manager := (record.get(ENTERPRISE_USER_SCHEMA) or {}).get("manager"):
+        references.append(manager)
+
+    for reference in references:
+        if new_id := journal.new_id(reference.get("value")):
+            reference["value"] = new_id
+            # the reference URL is computed by the target server
+            reference.pop("$ref", None)
+
+
+def created_id(result: dict) -> str | None:
+    """Return the id of a resource created by a bulk operation."""
+    if (response := result.get("response")) and response.get("id"):
+        return response["id"]
+    if location := result.get("location"):
+        return location.rstrip("/").rsplit("/", 1)[-1]
+    return None
+
+
+def then(response, callback):
+    """Apply a callback on a response, or on the result of an awaitable response."""
+    if inspect.isawaitable(response):
+
+        async def wait():
+            return callback(await response)
+
+        return wait()
+
+    return callback(response)
+
+
+def import_file(
+    ctx,
+    path: Path,
+    journal: ImportJournal,
+    bulk: bool,
+    concurrency: int,
+) -> int:
+    """Create the resources of a file that are not in the journal yet.
+
+    :return: The number of skipped resources.
+    """
+    skipped = 0
+    file = journal.file_key(path)
+
+    def pending_records(stream):
+        nonlocal skipped
+        for line, record in iter_ndjson(stream, numbered=True):
+            if journal.is_imported(file, line):
+                skipped += 1
+                continue
+
+            remap_references(record, journal)
+            yield line, record
+
+    def create(client, item):
+        line, record = item
+
+        def save(response):
+            if not isinstance(response, Error):
+                journal.record(file, line, record.get("id"), response.id)
+            return response
+
+        return then(client.create(record, raise_scim_errors=False), save)
+
+    with open_source(path) as stream:
+        records = pending_records(stream)
+        if not bulk:
+            echo_ndjson_results(
+                ctx,
+                create,
+                ((line, (line, record)) for line, record in records),
+                concurrency=concurrency,
+                ordered=False,
+                indexed=True,
+            )
+            return skipped
+
+        client = ctx.obj["client"]
+        old_ids = {}
+
+        def operations():
+            for line, record in records:
+                with record_context(line):
+                    try:
+                        request = client.prepare_create_request(record)
+                    except SCIMClientError as scim_exc:
+                        raise exception_to_click_error(scim_exc) from scim_exc
+
+                old_ids[str(line)] = record.get("id")
+                yield {
+                    "method": "POST",
+                    "path": request.url,
+                    "bulkId": str(line),
+                    "data": request.payload,
+                }
+
+        def results():
+            for result in iter_bulk_results(client, operations()):
+                bulk_id = result.get("bulkId")
+                old_id = old_ids.pop(bulk_id, None)
+                if int(result.get("status") or 0) < 400 and bulk_id:
+                    journal.record(file, int(bulk_id), old_id, created_id(result))
+                yield result
+
+        try:
+            get_output(ctx, indent=False).write_all(results())
+        except SCIMClientError as scim_exc:
+            raise exception_to_click_error(scim_exc) from scim_exc
+
+    return skipped
+
+
+@click.command(cls=RSTCommand, name="import")
+@click.argument(
+    "sources",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, path_type=Path),
+)
+@click.option(
+    "--journal",
+    "journal_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help=f"Path of the file recording the imported resources. Defaults to {JOURNAL_FILE} next to the first source.",
+)
+@click.option(
+    "--bulk/--no-bulk",
+    default=None,
+    help="Create the resources with bulk requests. By default, bulk requests are used when the server supports them.",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Without bulk requests, the number of requests performed simultaneously.",
+)
+@click.pass_context
+def import_cli(
+    ctx,
+    sources: list[Path],
+    journal_path: Path | None,
+    bulk: bool | None,
+    concurrency: int,
+):
+    """Create resources read from newline delimited JSON files, optionally compressed with gzip.
+
+    Sources can be files, or directories written by :ref:`export`:
+
+    .. code-block:: bash
+
+        import backup/ --concurrency 10
+
+    The created resources are recorded in a journal, so an interrupted import can be
+    run again and resumes where it stopped. The ids of the created resources replace
+    the original ids in the group members and the enterprise user managers.
+    The responses are printed as newline delimited JSON as soon as they are available.
+    """
+    require_discovery(ctx, "schemas", "resource_types", "service_provider_config")
+    client = ctx.obj["client"]
+    if bulk is None:
+        bulk = is_bulk_supported(client)
+    elif bulk and not is_bulk_supported(client):
+        raise click.ClickException("The server does not support bulk operations.")
+
+    if journal_path is None:
+        first = sources[0]
+        journal_path = (first if first.is_dir() else first.parent) / JOURNAL_FILE
+
+    journal = ImportJournal(journal_path)
+    try:
+        for path in source_files(sources):
+            try:
+                skipped = import_file(ctx, path, journal, bulk, concurrency)
+            except click.ClickException as exc:
+                exc.message = f"{path.name}: {exc.message}"
+                raise
+
+            if skipped:
+                click.echo(
+                    f"{path.name}: {skipped} resources were already imported.",
+                    err=True,
+                )
+    finally:
+        journal.close()
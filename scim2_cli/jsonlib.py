@@ -0,0 +1,140 @@
+import json
+import os
+import re
+from collections.abc import Callable
+
+STDLIB = "stdlib"
+ORJSON = "orjson"
+MSGSPEC = "msgspec"
+# numbers of 19 digits or more may not fit in 64 bits
+LARGE_INTEGER = re.compile(r"\d{19}")
+LARGE_INTEGER_BYTES = re.compile(rb"\d{19}")
+
+
+def stdlib_backend() -> tuple[Callable, Callable]:
+    def dumps(obj) -> str:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+    return json.loads, dumps
+
+
+def exact_integers(loads: Callable) -> Callable:
+    """Decode the documents that may hold integers larger than 64 bits with the standard library.
+
+    The faster backends decode such integers as floats, and lose their precision.
+    """
+
+    def wrapper(data):
+        pattern = LARGE_INTEGER_BYTES if isinstance(data, bytes) else LARGE_INTEGER
+        if pattern.search(data):
+            return json.loads(data)
+        return loads(data)
+
+    return wrapper
+
+
+def orjson_backend() -> tuple[Callable, Callable]:
+    import orjson
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    return exact_integers(orjson.loads), dumps
+
+
+def msgspec_backend() -> tuple[Callable, Callable]:
+    import msgspec
+
+    def loads(data):
+        try:
+            return msgspec.json.decode(data)
+        except msgspec.DecodeError as exc:
+            raise ValueError(str(exc)) from exc
+
+    def dumps(obj) -> str:
+        return msgspec.json.encode(obj).decode()
+
+    return exact_integers(loads), dumps
+
+
+BACKENDS = {
+    ORJSON: orjson_backend,
+    MSGSPEC: msgspec_backend,
+    STDLIB: stdlib_backend,
+}
+
+
+def available_backends() -> list[str]:
+    """List the backends that can be imported, by order of preference."""
+    names = []
+    for name, backend in BACKENDS.items():
+        try:
+            backend()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def use_backend(name: str | None = None) -> str:
+    """Select the backend used by :func:`loads` and :func:`dumps`.
+
+    `orjson <https://github.com/ijl/orjson>`_ or `msgspec <https://jcristharif.com/msgspec/>`_
+    are used when they are installed, and the standard library otherwise.
+    Decoded documents are the same whatever the backend, but compact outputs may
+    differ in their floats: the faster backends write :code:`1e16` and :code:`1e-7`
+    where the standard library writes :code:`1e+16` and :code:`1e-07`, and they write
+    :code:`NaN` and infinite values as :code:`null`, as they are not valid JSON.
+
+    :param name: The backend name. If :data:`None`, the :code:`SCIM_CLI_JSON_BACKEND`
+        environment variable is used, or the first available backend.
+    """
+    global BACKEND, _loads, _dumps
+
+    name = name or os.environ.get("SCIM_CLI_JSON_BACKEND")
+    names = [name] if name else list(BACKENDS)
+    for candidate in names:
+        try:
+            _loads, _dumps = BACKENDS[candidate]()
+        except (KeyError, ImportError):
+            continue
+        BACKEND = candidate
+        return BACKEND
+
+    raise ValueError(f"The JSON backend '{name}' is not available.")
+
+
+def loads(data: str | bytes):
+    """Decode a JSON document.
+
+    Integers larger than 64 bits are decoded exactly, by falling back to the standard library.
+
+    :raises ValueError: If the document is not valid JSON.
+    """
+    return _loads(data)
+
+
+def dumps(obj, indent: int | None = None) -> str:
+    """Encode an object in JSON.
+
+    Compact outputs use the selected backend, and fall back to the standard library
+    for objects the backend cannot encode, such as integers larger than 64 bits.
+    Floats may be written differently by each backend, see :func:`use_backend`.
+    Indented outputs always use the standard library, as the faster backends
+    do not support custom indentation sizes.
+    """
+    if indent is not None:
+        return json.dumps(obj, indent=indent)
+
+    try:
+        return _dumps(obj)
+    except (TypeError, OverflowError):
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+BACKEND = STDLIB
+_loads, _dumps = stdlib_backend()
+try:
+    use_backend()
+except ValueError:
+    pass
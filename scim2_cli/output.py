@@ -0,0 +1,167 @@
+from collections.abc import Iterable
+
+import click
+
+from scim2_cli import jsonlib
+from scim2_cli.timings import phase
+from scim2_cli.utils import INDENTATION_SIZE
+from scim2_cli.utils import dump_response
+
+JSON = "json"
+NDJSON = "ndjson"
+RESOURCES_KEY = "Resources"
+
+
+def reindent(text: str, prefix: str) -> str:
+    return text.replace("\n", "\n" + prefix)
+
+
+class OutputWriter:
+    """Write JSON documents and resources incrementally to a stream.
+
+    Resources are serialized and written one at a time, so the first results
+    are available to the readers of the stream as soon as they are received,
+    and no serialized copy of a whole response is kept in memory.
+
+    :param stream: The text stream to write in.
+    :param format: Either :data:`JSON` or :data:`NDJSON`. If :data:`None`,
+        documents are written as JSON and collections as NDJSON.
+    :param indent: Whether to indent JSON outputs.
+    """
+
+    def __init__(self, stream, format: str | None = None, indent: bool = True):
+        self.stream = stream
+        self.format = format
+        self.indent = INDENTATION_SIZE if indent else None
+        self.count = 0
+
+    def dumps(self, obj, level: int = 0) -> str:
+        payload = jsonlib.dumps(obj, indent=self.indent)
+        if self.indent and level:
+            payload = reindent(payload, " " * self.indent * level)
+        return payload
+
+    def emit(self, text: str) -> None:
+        self.stream.write(text)
+        self.stream.flush()
+
+    def write(self, response) -> None:
+        """Write a single response.
+
+        The resources of list responses are serialized one by one.
+        With the :data:`NDJSON` format, only those resources are written, one per line.
+        """
+        if self.format == NDJSON:
+            self.write_all(
+                iter_resources(response) if is_list(response) else [response]
+            )
+            return
+
+        with phase("output"):
+            self.write_document(response)
+
+    def write_document(self, response) -> None:
+        if not is_list(response):
+            self.emit(self.dumps(dump_response(response)) + "\n")
+            return
+
+        payload = list_response_envelope(response)
+        separator = ",\n" if self.indent else ","
+        padding = " " * (self.indent or 0)
+        key_separator = ": " if self.indent else ":"
+        self.emit("{\n" if self.indent else "{")
+        for position, (key, value) in enumerate(payload.items()):
+            self.emit((separator if position else "") + padding)
+            self.emit(self.dumps(key) + key_separator)
+            if key == RESOURCES_KEY:
+                self.write_array(value, level=1)
+            else:
+                self.emit(self.dumps(value, level=1))
+        self.emit("\n}\n" if self.indent else "}\n")
+
+    def write_array(self, items: Iterable, level: int = 0) -> None:
+        count = 0
+        for item in items:
+            self.write_array_item(item, count, level)
+            count += 1
+        self.end_array(count, level)
+
+    def write_array_item(self, item, position: int, level: int = 0) -> None:
+        padding = " " * (self.indent or 0) * (level + 1)
+        if not position:
+            self.emit("[\n" + padding if self.indent else "[")
+        else:
+            self.emit(",\n" + padding if self.indent else ",")
+        self.emit(self.dumps(item, level + 1))
+
+    def end_array(self, count: int, level: int = 0) -> None:
+        if not count:
+            self.emit("[]")
+        elif self.indent:
+            self.emit("\n" + " " * self.indent * level + "]")
+        else:
+            self.emit("]")
+
+    def write_item(self, item) -> None:
+        """Write a response of a collection, as soon as it is produced.
+
+        Responses are written one per line, or as a JSON array with the :data:`JSON` format.
+        :meth:`close` must be called after the last response.
+        """
+        if item is None:
+            return
+
+        with phase("output"):
+            item = dump_response(item)
+            if self.format == JSON:
+                self.write_array_item(item, self.count)
+            else:
+                self.emit(jsonlib.dumps(item) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        if self.format == JSON:
+            self.end_array(self.count)
+            self.emit("\n")
+
+    def write_all(self, items: Iterable) -> None:
+        """Write a collection of responses with :meth:`write_item`."""
+        for item in items:
+            self.write_item(item)
+        self.close()
+
+
+def is_list(response) -> bool:
+    if isinstance(response, dict):
+        return isinstance(response.get(RESOURCES_KEY), list)
+    return hasattr(response, "resources")
+
+
+def iter_resources(response):
+    if isinstance(response, dict):
+        yield from response.get(RESOURCES_KEY) or []
+        return
+
+    for resource in response.resources or []:
+        yield resource.model_dump()
+
+
+def list_response_envelope(response) -> dict:
+    """Return a list response payload where the resources are lazily serialized."""
+    if isinstance(response, dict):
+        return {
+            key: iter(value) if key == RESOURCES_KEY else value
+            for key, value in response.items()
+        }
+
+    payload = response.model_dump(exclude={"resources"})
+    if response.resources is not None:
+        payload[RESOURCES_KEY] = iter_resources(response)
+    return payload
+
+
+def get_output(ctx: click.Context, indent: bool = True) -> OutputWriter:
+    """Build a writer for the :code:`--output` and :code:`--format` options of the command."""
+    obj = ctx.find_root().obj or {}
+    stream = obj.get("output") or click.get_text_stream("stdout")
+    return OutputWriter(stream, obj.get("format"), indent)
@@ -0,0 +1,139 @@
+from collections import deque
+from collections.abc import Callable
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+from scim2_client import SCIMClientError
+from scim2_models import SearchRequest
+
+from .output import get_output
+from .utils import dump_response
+from .utils import exception_to_click_error
+
+DEFAULT_PREFETCH = 1
+
+
+def iter_prefetched(function: Callable, items, prefetch: int) -> Iterator:
+    """Apply a function on items in background threads, and yield the results in order.
+
+    Up to :code:`prefetch` results are computed ahead of the one being consumed.
+    """
+    executor = ThreadPoolExecutor(max_workers=prefetch)
+    pending = deque()
+    items = iter(items)
+    try:
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) > prefetch:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_all_resources(
+    fetch: Callable[[int, int | None], dict],
+    start_index: int | None = None,
+    count: int | None = None,
+    prefetch: int = DEFAULT_PREFETCH,
+) -> Iterator[dict]:
+    """Walk through all the pages of a :class:`~scim2_models.ListResponse` and yield the resources.
+
+    The first page is used to find out the :code:`totalResults` and the actual page size,
+    that servers may cap below the requested :code:`count`.
+    The following pages are then fetched in background while the resources are consumed.
+
+    :param fetch: A function taking a start index and a count, and returning a :class:`~scim2_models.ListResponse` payload.
+    """
+    start_index = start_index or 1
+    page = fetch(start_index, count)
+    resources = page.get("Resources") or []
+    yield from resources
+
+    total_results = page.get("totalResults") or 0
+    page_size = len(resources)
+    if not page_size:
+        return
+
+    def fetch_range(start, stop):
+        """Fetch the resources between two indexes, even if the server returns shorter pages."""
+        while start < stop:
+            resources = fetch(start, stop - start).get("Resources") or []
+            if not resources:
+                return
+            yield from resources
+            start += len(resources)
+
+    starts = range(start_index + page_size, total_results + 1, page_size)
+    pages = iter_prefetched(lambda start: fetch(start, page_size), starts, prefetch)
+    for start, page in zip(starts, pages, strict=True):
+        resources = page.get("Resources") or []
+        yield from resources
+
+        # A page shorter than expected means that the server capped it further,
+        # or that resources were deleted meanwhile. The missing range is fetched
+        # again so no resource is skipped.
+        stop = min(start + page_size, total_results + 1)
+        if resources and start + len(resources) < stop:
+            yield from fetch_range(start + len(resources), stop)
+
+
+def paginated_search_request(
+    search_request: SearchRequest | dict, start_index: int, count: int | None
+) -> SearchRequest | dict:
+    """Return a copy of a search request for another page."""
+    if isinstance(search_request, SearchRequest):
+        return search_request.model_copy(
+            update={"start_index": start_index, "count": count}
+        )
+
+    search_request = {**search_request, "startIndex": start_index}
+    if count is not None:
+        search_request["count"] = count
+    return search_request
+
+
+def search_request_range(search_request: SearchRequest | dict):
+    """Return the start index and the count of a search request."""
+    if isinstance(search_request, SearchRequest):
+        return search_request.start_index, search_request.count
+
+    return search_request.get("startIndex"), search_request.get("count")
+
+
+def echo_all_resources(
+    ctx,
+    fetch: Callable,
+    search_request: SearchRequest | dict,
+    prefetch: int = DEFAULT_PREFETCH,
+    output=None,
+) -> None:
+    """Print all the resources of a paginated search as newline delimited JSON.
+
+    :param fetch: A function taking a SCIM client, a start index and a count,
+        and performing a search request.
+        With :code:`--async`, the client is asynchronous and the function returns a coroutine.
+    :param output: The writer of the resources. Defaults to the command output.
+    """
+    output = output or get_output(ctx, indent=False)
+    if ctx.obj.get("async"):
+        from scim2_cli.aio import echo_all_resources_async
+
+        echo_all_resources_async(ctx, fetch, search_request, prefetch, output)
+        return
+
+    client = ctx.obj["client"]
+    start_index, count = search_request_range(search_request)
+    resources = iter_all_resources(
+        lambda start, count: dump_response(fetch(client, start, count)),
+        start_index,
+        count,
+        prefetch,
+    )
+    try:
+        output.write_all(resources)
+
+    except SCIMClientError as scim_exc:
+        raise exception_to_click_error(scim_exc) from scim_exc
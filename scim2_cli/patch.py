@@ -0,0 +1,289 @@
+import click
+from click import ClickException
+from httpx import AsyncClient
+from scim2_client import SCIMClientError
+from scim2_client.engines.httpx import handle_request_error
+from scim2_client.engines.httpx import handle_response_error
+from scim2_models import Context
+from scim2_models import Mutability
+from scim2_models import PatchOp
+from scim2_models import Resource
+
+from scim2_cli import jsonlib
+from scim2_cli.discovery import get_resource_models
+from scim2_cli.discovery import require_discovery
+from scim2_cli.output import get_output
+from scim2_cli.utils import RSTCommand
+from scim2_cli.utils import dump_response
+from scim2_cli.utils import exception_to_click_error
+from scim2_cli.utils import read_stdin
+
+PATCH_OP_SCHEMA = PatchOp.model_fields["schemas"].default[0]
+PATCH_RESPONSE_STATUS_CODES = [200, 204]
+# attributes that are not compared, as they cannot be modified by a patch
+IGNORED_ATTRIBUTES = ("schemas",)
+
+
+def is_patch_supported(client) -> bool:
+    config = client.service_provider_config
+    return bool(config and config.patch and config.patch.supported)
+
+
+def write_only_attributes(model: type[Resource]) -> set[str]:
+    return {
+        field.serialization_alias or name
+        for name, field in model.model_fields.items()
+        if model.get_field_annotation(name, Mutability) == Mutability.write_only
+    }
+
+
+def comparable_payload(model: type[Resource], payload: dict) -> dict:
+    """Return the attributes of a resource that a client can modify.
+
+    Read-only attributes are removed, and write-only attributes too,
+    as servers never return them and they cannot be compared.
+    """
+    payload = model.model_validate(payload).model_dump(
+        scim_ctx=Context.RESOURCE_REPLACEMENT_REQUEST
+    )
+    ignored = write_only_attributes(model).union(IGNORED_ATTRIBUTES)
+    return {key: value for key, value in payload.items() if key not in ignored}
+
+
+def same_values(current, desired) -> bool:
+    """Compare attribute values, ignoring the order of multi-valued attributes."""
+    if isinstance(current, list) and isinstance(desired, list):
+        return sorted(map(jsonlib.dumps, current)) == sorted(
+            map(jsonlib.dumps, desired)
+        )
+    return current == desired
+
+
+def value_filter(path: str, value) -> str:
+    """Build a path selecting the values of a multi-valued attribute by their :code:`value` sub-attribute."""
+    return f"{path}[value eq {jsonlib.dumps(value)}]"
+
+
+def multi_valued_operations(path: str, current: list, desired: list) -> list[dict]:
+    """Compute the patch operations turning the current values of a multi-valued attribute into the desired ones.
+
+    Only the removed and the added values are sent, so a group member change does not
+    need to send all the group members. Removed values are selected with a filter on
+    their :code:`value` sub-attribute, and if some of them have no such sub-attribute,
+    the attribute is replaced as a whole.
+    """
+    current_items = {jsonlib.dumps(item): item for item in current}
+    desired_items = {jsonlib.dumps(item): item for item in desired}
+    removed = [item for key, item in current_items.items() if key not in desired_items]
+    added = [item for key, item in desired_items.items() if key not in current_items]
+
+    if any(not isinstance(item, dict) or "value" not in item for item in removed):
+        return [{"op": "replace", "path": path, "value": desired}]
+
+    # a filter removes all the items having the value, including the ones to keep
+    removed_values = {jsonlib.dumps(item["value"]): item["value"] for item in removed}
+    added.extend(
+        item
+        for key, item in desired_items.items()
+        if key in current_items and jsonlib.dumps(item.get("value")) in removed_values
+    )
+
+    operations = [
+        {"op": "remove", "path": value_filter(path, value)}
+        for value in removed_values.values()
+    ]
+    if added:
+        operations.append({"op": "add", "path": path, "value": added})
+    return operations
+
+
+def diff_operations(current: dict, desired: dict, prefix: str = "") -> list[dict]:
+    """Compute the patch operations turning the current attributes into the desired ones.
+
+    Complex attributes and extensions are compared attribute by attribute,
+    and multi-valued attributes value by value.
+    """
+    operations = []
+    for key, value in desired.items():
+        path = prefix + key
+        current_value = current.get(key)
+        if same_values(current_value, value):
+            continue
+
+        if isinstance(value, dict) and isinstance(current_value, dict):
+            # extension attributes are prefixed by the extension schema
+            separator = ":" if key.startswith("urn:") and not prefix else "."
+            operations.extend(diff_operations(current_value, value, path + separator))
+        elif isinstance(value, list) and isinstance(current_value, list):
+            operations.extend(multi_valued_operations(path, current_value, value))
+        else:
+            operations.append({"op": "replace", "path": path, "value": value})
+
+    for key in current:
+        if key not in desired:
+            operations.append({"op": "remove", "path": prefix + key})
+
+    return operations
+
+
+def patch_operations(model: type[Resource], current: dict, desired: dict) -> list[dict]:
+    """Compute the patch operations turning a current resource into a desired one."""
+    return diff_operations(
+        comparable_payload(model, current), comparable_payload(model, desired)
+    )
+
+
+def send_patch_request(
+    client, url: str, operations: list[dict], raise_scim_errors: bool | None = None
+):
+    """Send a :class:`~scim2_models.PatchOp` request, and return the response payload.
+
+    With an asynchronous SCIM client, a coroutine is returned.
+    """
+    content = jsonlib.dumps({"schemas": [PATCH_OP_SCHEMA], "Operations": operations})
+    headers = {"Content-Type": "application/scim+json"}
+
+    def check(response):
+        with handle_response_error(response):
+            return client.check_response(
+                payload=response.json() if response.text else None,
+                status_code=response.status_code,
+                headers=response.headers,
+                expected_status_codes=PATCH_RESPONSE_STATUS_CODES,
+                raise_scim_errors=raise_scim_errors,
+            )
+
+    if isinstance(client.client, AsyncClient):
+
+        async def send():
+            with handle_request_error():
+                response = await client.client.patch(
+                    url, content=content, headers=headers
+                )
+            return check(response)
+
+        return send()
+
+    with handle_request_error():
+        response = client.client.patch(url, content=content, headers=headers)
+    return check(response)
+
+
+def parse_value(value: str):
+    """Parse a JSON operation value, or keep it as a string if it is not valid JSON."""
+    try:
+        return jsonlib.loads(value)
+    except ValueError:
+        return value
+
+
+@click.command(cls=RSTCommand, name="patch")
+@click.argument("resource_type")
+@click.argument("id")
+@click.option(
+    "--add",
+    nargs=2,
+    multiple=True,
+    metavar="PATH VALUE",
+    help="Add a value to an attribute. Values are parsed as JSON when possible.",
+)
+@click.option(
+    "--replace",
+    nargs=2,
+    multiple=True,
+    metavar="PATH VALUE",
+    help="Replace the value of an attribute. Values are parsed as JSON when possible.",
+)
+@click.option(
+    "--remove",
+    multiple=True,
+    metavar="PATH",
+    help="Remove the values of an attribute.",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    help="Print the PatchOp payload instead of sending it.",
+)
+@click.option(
+    "--indent/--no-indent",
+    is_flag=True,
+    default=True,
+    help="Indent JSON response payloads.",
+)
+@click.pass_context
+def patch_cli(ctx, resource_type, id, add, replace, remove, dry_run, indent):
+    r"""Perform a `SCIM PATCH <https://www.rfc-editor.org/rfc/rfc7644#section-3.5.2>`_ request on a resource.
+
+    Operations can be passed with :code:`--add`, :code:`--replace` and :code:`--remove`,
+    and are performed in that order:
+
+    .. code-block:: bash
+
+        patch group 1234 --add members '[{"value": "5678"}]' --remove 'members[value eq "9012"]'
+
+    A :class:`~scim2_models.PatchOp` payload can also be passed through stdin.
+    If stdin contains a resource instead, the current resource is fetched, and the
+    smallest set of operations turning it into the passed resource is sent.
+    Multi-valued attributes such as group members are modified value by value:
+
+    .. code-block:: bash
+
+        cat group.json | patch group 1234 --dry-run
+
+    The server must support patch operations.
+    """
+    require_discovery(ctx, "schemas", "resource_types", "service_provider_config")
+    client = ctx.obj["client"]
+    if not is_patch_supported(client):
+        raise ClickException("The server does not support patch operations.")
+
+    resource_models = get_resource_models(ctx)
+    try:
+        model = resource_models[resource_type]
+    except KeyError as exc:
+        ok_values = ", ".join(resource_models)
+        raise ClickException(
+            f"Unknown resource type '{resource_type}'. Available values are: {ok_values}"
+        ) from exc
+
+    operations = [
+        *(
+            {"op": "add", "path": path, "value": parse_value(value)}
+            for path, value in add
+        ),
+        *(
+            {"op": "replace", "path": path, "value": parse_value(value)}
+            for path, value in replace
+        ),
+        *({"op": "remove", "path": path} for path in remove),
+    ]
+
+    payload = read_stdin(ctx)
+    if not payload and not operations:
+        click.echo(ctx.get_help())
+        ctx.exit(1)
+
+    current = None
+    try:
+        if payload and "Operations" in payload:
+            operations.extend(payload["Operations"])
+        elif payload:
+            current = dump_response(client.query(model, id))
+            operations.extend(patch_operations(model, current, payload))
+
+        if dry_run:
+            response = {"schemas": [PATCH_OP_SCHEMA], "Operations": operations}
+        elif not operations:
+            response = current
+        else:
+            url = f"{client.resource_endpoint(model)}/{id}"
+            response = send_patch_request(
+                client, url, operations, raise_scim_errors=False
+            )
+
+    except SCIMClientError as scim_exc:
+        raise exception_to_click_error(scim_exc) from scim_exc
+
+    if response:
+        get_output(ctx, indent).write(response)
@@ -5,15 +5,19 @@ from scim2_models import ResourceType
 from scim2_models import Schema
 from scim2_models import SearchRequest
 from scim2_models import ServiceProviderConfig
-from sphinx_click.rst_to_ansi_formatter import make_rst_to_ansi_formatter
 
+from scim2_cli.discovery import get_resource_models
 from scim2_cli.utils import exception_to_click_error
 
-from .utils import DOC_URL
-from .utils import formatted_payload
+from .output import get_output
+from .pagination import DEFAULT_PREFETCH
+from .pagination import echo_all_resources
+from .pagination import paginated_search_request
+from .utils import RSTCommand
+from .utils import read_stdin
 
 
-@click.command(cls=make_rst_to_ansi_formatter(DOC_URL), name="query")
+@click.command(cls=RSTCommand, name="query")
 @click.pass_context
 @click.argument("resource_type", required=False)
 @click.argument("id", required=False)
@@ -54,6 +58,19 @@ from .utils import formatted_payload
     default=True,
     help="Indent JSON response payloads.",
 )
+@click.option(
+    "--all",
+    "all_pages",
+    is_flag=True,
+    help="Walk through all the result pages, and print the resources as newline delimited JSON.",
+)
+@click.option(
+    "--prefetch",
+    type=click.IntRange(min=1),
+    default=DEFAULT_PREFETCH,
+    show_default=True,
+    help="With --all, the number of pages fetched in background while the current page is printed.",
+)
 def query_cli(
     ctx,
     resource_type: str | None,
@@ -66,6 +83,8 @@ def query_cli(
     sort_by: str,
     sort_order: str,
     indent: bool,
+    all_pages: bool,
+    prefetch: int,
 ):
     """Perform a `SCIM GET <https://www.rfc-editor.org/rfc/rfc7644#section-3.4.1>`_ request on the :code:`RESOURCE_TYPE` endpoint.
 
@@ -79,22 +98,37 @@ def query_cli(
 
         echo '{"startIndex": 50, "count": 10}' |  query user
 
+    With :code:`--all`, all the result pages are requested, and the resources are printed as newline delimited JSON:
+
+    .. code-block:: bash
+
+        query user --all --count 100
+
     """
-    for model in (Schema, ResourceType, ServiceProviderConfig):
-        ctx.obj["resource_models"][model.__name__.lower()] = model
+    if all_pages and id:
+        raise click.UsageError("--all cannot be used with an ID.")
+
+    config_models = {
+        model.__name__.lower(): model
+        for model in (Schema, ResourceType, ServiceProviderConfig)
+    }
 
-    if resource_type:
+    if resource_type in config_models:
+        resource_type = config_models[resource_type]
+
+    elif resource_type:
+        resource_models = {**get_resource_models(ctx), **config_models}
         try:
-            resource_type = ctx.obj["resource_models"][resource_type]
+            resource_type = resource_models[resource_type]
         except KeyError as exc:
-            ok_values = ", ".join(ctx.obj["resource_models"])
+            ok_values = ", ".join(resource_models)
             raise ClickException(
                 f"Unknown resource type '{resource_type}. Available values are: {ok_values}'"
             ) from exc
 
-    if ctx.obj.get("stdin"):
+    if stdin := read_stdin(ctx):
         check_request_payload = False
-        payload = ctx.obj.get("stdin")
+        payload = stdin
 
     else:
         check_request_payload = True
@@ -108,17 +142,34 @@ def query_cli(
             sort_order=sort_order,
         )
 
+    # Querying the server root does not need the resource models to be discovered,
+    # the response is returned as it was sent by the server.
+    check_response_payload = resource_type is not None
+
+    if all_pages:
+
+        def fetch(client, start_index, count):
+            return client.query(
+                resource_type,
+                search_request=paginated_search_request(payload, start_index, count),
+                check_request_payload=check_request_payload,
+                check_response_payload=check_response_payload,
+            )
+
+        echo_all_resources(ctx, fetch, payload, prefetch)
+        return
+
     try:
         response = ctx.obj["client"].query(
             resource_type,
             id,
             search_request=payload,
             check_request_payload=check_request_payload,
+            check_response_payload=check_response_payload,
             raise_scim_errors=False,
         )
 
     except SCIMClientError as scim_exc:
         raise exception_to_click_error(scim_exc) from scim_exc
 
-    payload = formatted_payload(response.model_dump(), indent)
-    click.echo(payload)
+    get_output(ctx, indent).write(response)
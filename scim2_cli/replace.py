@@ -3,36 +3,50 @@ from click import ClickException
 from pydanclick import from_pydantic
 from scim2_client import SCIMClientError
 from scim2_models import Context
-from sphinx_click.rst_to_ansi_formatter import make_rst_to_ansi_formatter
 
+from scim2_cli.discovery import require_discovery
+from scim2_cli.output import get_output
 from scim2_cli.utils import exception_to_click_error
 
-from .utils import DOC_URL
 from .utils import ModelCommand
-from .utils import formatted_payload
+from .utils import RSTCommand
+from .utils import concurrency_options
+from .utils import echo_ndjson_results
+from .utils import iter_ndjson
+from .utils import patch_pydanclick
+from .utils import read_stdin
 from .utils import unacceptable_fields
 
+patch_pydanclick()
 
-def replace_payload(client, payload, indent):
+
+def replace_resource(client, payload):
     try:
-        response = client.replace(payload, raise_scim_errors=False)
+        return client.replace(payload, raise_scim_errors=False)
 
     except SCIMClientError as scim_exc:
         raise exception_to_click_error(scim_exc) from scim_exc
 
-    payload = formatted_payload(response.model_dump(), indent)
-    click.echo(payload)
+
+def replace_payload(client, payload, output):
+    response = replace_resource(client, payload)
+    output.write(response)
 
 
 def replace_factory(model):
     if not model:
         raise ClickException("Invalid model")
 
-    exclude = unacceptable_fields(Context.RESOURCE_REPLACEMENT_REQUEST, model)
-    exclude.remove("id")
+    exclude = [
+        field_name
+        for field_name in unacceptable_fields(
+            Context.RESOURCE_REPLACEMENT_REQUEST, model
+        )
+        if field_name != "id"
+    ]
 
     @click.command(
-        cls=make_rst_to_ansi_formatter(DOC_URL),
+        cls=RSTCommand,
         name=model.__name__.lower(),
     )
     @click.option(
@@ -71,7 +85,7 @@ def replace_factory(model):
         if obj == model():
             obj = None
 
-        payload = ctx.obj.get("stdin") or obj
+        payload = read_stdin(ctx) or obj
         if not payload:
             click.echo(ctx.get_help())
             ctx.exit(1)
@@ -79,7 +93,7 @@ def replace_factory(model):
         replace_payload(
             ctx.obj["client"],
             payload,
-            indent,
+            get_output(ctx, indent),
         )
 
     return replace_command
@@ -98,7 +112,13 @@ def replace_factory(model):
     default=True,
     help="Indent JSON response payloads.",
 )
-def replace_cli(ctx, indent):
+@click.option(
+    "--ndjson",
+    is_flag=True,
+    help="Read newline delimited JSON payloads from stdin, replace one resource per line, and print the responses as newline delimited JSON.",
+)
+@concurrency_options
+def replace_cli(ctx, indent, ndjson, concurrency, unordered):
     """Perform a `SCIM PUT <https://www.rfc-editor.org/rfc/rfc7644#section-3.5.1>`_ request on the resources endpoint.
 
     There are subcommands for all the available models, with dynamic attributes.
@@ -114,17 +134,41 @@ def replace_cli(ctx, indent):
 
         echo '{"userName": "bjensen@example.com", "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User"], "id": "1234"}' |  replace user
 
+    With :code:`--ndjson`, stdin is read line by line and each line is replaced independently:
+
+    .. code-block:: bash
+
+        cat users.ndjson | replace --ndjson
+
+    Use :code:`--concurrency` to perform several requests simultaneously:
+
+    .. code-block:: bash
+
+        cat users.ndjson | replace --ndjson --concurrency 8
+
     """
     if ctx.invoked_subcommand is not None:
         return
 
-    payload = ctx.obj.get("stdin")
+    if ndjson:
+        require_discovery(ctx, "schemas", "resource_types")
+        echo_ndjson_results(
+            ctx,
+            lambda client, payload: client.replace(payload, raise_scim_errors=False),
+            iter_ndjson(),
+            concurrency=concurrency,
+            ordered=not unordered,
+        )
+        return
+
+    payload = read_stdin(ctx)
     if not payload:
         click.echo(ctx.get_help())
         ctx.exit(1)
 
+    require_discovery(ctx, "schemas", "resource_types")
     replace_payload(
         ctx.obj["client"],
         payload,
-        indent,
+        get_output(ctx, indent),
     )
@@ -1,15 +1,19 @@
 import click
 from scim2_client import SCIMClientError
 from scim2_models import SearchRequest
-from sphinx_click.rst_to_ansi_formatter import make_rst_to_ansi_formatter
 
+from scim2_cli.discovery import require_discovery
 from scim2_cli.utils import exception_to_click_error
 
-from .utils import DOC_URL
-from .utils import formatted_payload
+from .output import get_output
+from .pagination import DEFAULT_PREFETCH
+from .pagination import echo_all_resources
+from .pagination import paginated_search_request
+from .utils import RSTCommand
+from .utils import read_stdin
 
 
-@click.command(cls=make_rst_to_ansi_formatter(DOC_URL), name="search")
+@click.command(cls=RSTCommand, name="search")
 @click.pass_context
 @click.option(
     "--attribute",
@@ -48,6 +52,19 @@ from .utils import formatted_payload
     default=True,
     help="Indent JSON response payloads.",
 )
+@click.option(
+    "--all",
+    "all_pages",
+    is_flag=True,
+    help="Walk through all the result pages, and print the resources as newline delimited JSON.",
+)
+@click.option(
+    "--prefetch",
+    type=click.IntRange(min=1),
+    default=DEFAULT_PREFETCH,
+    show_default=True,
+    help="With --all, the number of pages fetched in background while the current page is printed.",
+)
 def search_cli(
     ctx,
     attribute: list[str],
@@ -58,6 +75,8 @@ def search_cli(
     sort_by: str,
     sort_order: str,
     indent: bool,
+    all_pages: bool,
+    prefetch: int,
 ):
     """Perform a `SCIM GET <https://www.rfc-editor.org/rfc/rfc7644#section-3.4.1>`_ request on the :code:`/.search` endpoint.
 
@@ -67,10 +86,18 @@ def search_cli(
 
         echo '{"startIndex": 50, "count": 10}' |  search user
 
+    With :code:`--all`, all the result pages are requested, and the resources are printed as newline delimited JSON:
+
+    .. code-block:: bash
+
+        search --all --count 100
+
     """
-    if ctx.obj.get("stdin"):
+    require_discovery(ctx, "schemas", "resource_types")
+
+    if stdin := read_stdin(ctx):
         check_request_payload = False
-        payload = ctx.obj.get("stdin")
+        payload = stdin
 
     else:
         check_request_payload = True
@@ -84,6 +111,17 @@ def search_cli(
             sort_order=sort_order,
         )
 
+    if all_pages:
+
+        def fetch(client, start_index, count):
+            return client.search(
+                search_request=paginated_search_request(payload, start_index, count),
+                check_request_payload=check_request_payload,
+            )
+
+        echo_all_resources(ctx, fetch, payload, prefetch)
+        return
+
     try:
         response = ctx.obj["client"].search(
             search_request=payload,
@@ -94,5 +132,4 @@ def search_cli(
     except SCIMClientError as scim_exc:
         raise exception_to_click_error(scim_exc) from scim_exc
 
-    payload = formatted_payload(response.model_dump(), indent)
-    click.echo(payload)
+    get_output(ctx, indent).write(response)
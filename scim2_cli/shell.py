@@ -0,0 +1,150 @@
+import shlex
+import time
+
+import click
+
+from scim2_cli.discovery import available_resource_types
+from scim2_cli.utils import ModelCommand
+from scim2_cli.utils import RSTCommand
+
+PROMPT = "scim> "
+EXIT_COMMANDS = ("exit", "quit")
+RESOURCE_TYPE_ARGUMENTS = ("resource_type",)
+
+
+def command_options(command: click.Command) -> list[str]:
+    return [
+        opt
+        for param in command.params
+        if isinstance(param, click.Option)
+        for opt in (*param.opts, *param.secondary_opts)
+    ]
+
+
+def completions(ctx: click.Context, words: list[str], text: str) -> list[str]:
+    """Return the candidates to complete a shell line.
+
+    Resource types are proposed from the models that have already been discovered.
+
+    :param words: The words of the line before the one being completed.
+    :param text: The beginning of the word being completed.
+    """
+    group = ctx.parent.command
+    command = group
+    positionals = []
+    for word in words:
+        if word.startswith("-"):
+            continue
+        if isinstance(command, click.Group):
+            command = command.get_command(ctx, word) or command
+        else:
+            positionals.append(word)
+
+    if command is group:
+        candidates = [
+            name for name in group.list_commands(ctx) if name != ctx.info_name
+        ] + list(EXIT_COMMANDS)
+    elif text.startswith("-"):
+        candidates = command_options(command)
+    elif isinstance(command, ModelCommand):
+        candidates = available_resource_types(ctx)
+    elif not positionals and any(
+        param.name in RESOURCE_TYPE_ARGUMENTS for param in command.params
+    ):
+        candidates = available_resource_types(ctx)
+    else:
+        candidates = []
+
+    return sorted(candidate for candidate in candidates if candidate.startswith(text))
+
+
+def setup_readline(ctx: click.Context) -> None:
+    try:
+        import readline
+    except ImportError:  # pragma: no cover
+        return
+
+    def complete(text, state):
+        buffer = readline.get_line_buffer()
+        try:
+            words = shlex.split(buffer[: readline.get_begidx()])
+        except ValueError:
+            return None
+        matches = completions(ctx, words, text)
+        return matches[state] if state < len(matches) else None
+
+    readline.set_completer(complete)
+    readline.set_completer_delims(" \t\n")
+    readline.parse_and_bind("tab: complete")
+
+
+def run_command(ctx: click.Context, args: list[str]) -> None:
+    """Invoke a subcommand of the main group, sharing the state of the shell."""
+    group = ctx.parent.command
+    # stdin is the shell input, and cannot be used as a command input
+    ctx.obj["stdin"] = None
+    try:
+        cmd_name, command, args = group.resolve_command(ctx.parent, args)
+        if cmd_name == ctx.info_name:
+            raise click.UsageError("The shell is already running.")
+
+        with command.make_context(cmd_name, args, parent=ctx.parent) as sub_ctx:
+            command.invoke(sub_ctx)
+
+    except click.ClickException as exc:
+        exc.show()
+    except (click.exceptions.Exit, click.Abort, SystemExit):
+        pass
+
+
+@click.command(cls=RSTCommand, name="shell")
+@click.option(
+    "--latency/--no-latency",
+    default=True,
+    help="Display the duration of each command.",
+)
+@click.pass_context
+def shell_cli(ctx, latency):
+    """Run commands interactively, reusing the client, the discovered models and the connections.
+
+    Commands have the same syntax than the CLI subcommands:
+
+    .. code-block:: console
+
+        $ scim shell
+        scim> query user 2819c223-7f76-453a-919d-413861904646
+        scim> delete user 2819c223-7f76-453a-919d-413861904646
+
+    Use :code:`exit` or :kbd:`Control-D` to quit.
+    """
+    setup_readline(ctx)
+    while True:
+        try:
+            line = input(PROMPT)
+        except EOFError:
+            click.echo()
+            return
+        except KeyboardInterrupt:
+            click.echo()
+            continue
+
+        try:
+            args = shlex.split(line)
+        except ValueError as exc:
+            click.echo(f"Error: {exc}", err=True)
+            continue
+
+        if not args:
+            continue
+
+        if args[0] in EXIT_COMMANDS:
+            return
+
+        start = time.perf_counter()
+        try:
+            run_command(ctx, args)
+        except KeyboardInterrupt:
+            click.echo("Aborted!", err=True)
+        if latency:
+            duration = (time.perf_counter() - start) * 1000
+            click.echo(f"({duration:.0f} ms)", err=True)
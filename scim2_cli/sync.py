@@ -0,0 +1,273 @@
+from collections.abc import Iterator
+from pathlib import Path
+
+import click
+from scim2_client import SCIMClientError
+from scim2_models import Resource
+from scim2_models import SearchRequest
+
+from scim2_cli import jsonlib
+from scim2_cli.discovery import get_resource_models
+from scim2_cli.discovery import require_discovery
+from scim2_cli.import_ import open_source
+from scim2_cli.output import get_output
+from scim2_cli.pagination import iter_all_resources
+from scim2_cli.patch import is_patch_supported
+from scim2_cli.patch import patch_operations
+from scim2_cli.patch import send_patch_request
+from scim2_cli.utils import RSTCommand
+from scim2_cli.utils import dump_response
+from scim2_cli.utils import echo_ndjson_results
+from scim2_cli.utils import exception_to_click_error
+from scim2_cli.utils import iter_ndjson
+
+DESIRED_STATE_SUFFIXES = (".json", ".ndjson", ".ndjson.gz")
+# attributes identifying a resource on both sides, by order of preference
+KEY_ATTRIBUTES = ("externalId", "userName", "displayName")
+CASE_INSENSITIVE_KEY_ATTRIBUTES = ("userName",)
+CREATE = "create"
+PATCH = "patch"
+REPLACE = "replace"
+DELETE = "delete"
+
+
+def key_value(attribute: str, value: str) -> str:
+    if attribute in CASE_INSENSITIVE_KEY_ATTRIBUTES:
+        value = value.lower()
+    return f"{attribute}={value}"
+
+
+def resource_keys(payload: dict) -> list[str]:
+    return [
+        key_value(attribute, payload[attribute])
+        for attribute in KEY_ATTRIBUTES
+        if payload.get(attribute)
+    ]
+
+
+def iter_desired_payloads(source: Path) -> Iterator[tuple[str, dict]]:
+    """Read the desired resources, with a label locating them in error messages.
+
+    Sources are JSON files containing a resource or a list of resources,
+    newline delimited JSON files, or directories containing such files.
+    In directories, other files and hidden directories such as :code:`.git` are ignored.
+    """
+    paths = (
+        sorted(
+            path
+            for path in source.rglob("*")
+            if path.name.endswith(DESIRED_STATE_SUFFIXES)
+            and path.is_file()
+            and not any(part.startswith(".") for part in path.relative_to(source).parts)
+        )
+        if source.is_dir()
+        else [source]
+    )
+    for path in paths:
+        if path.name.endswith(".json"):
+            try:
+                payload = jsonlib.loads(path.read_bytes())
+            except ValueError as exc:
+                raise click.ClickException(
+                    f"{path}: Invalid JSON input.\n{exc}"
+                ) from exc
+            payloads = payload if isinstance(payload, list) else [payload]
+            for payload in payloads:
+                yield str(path), payload
+
+        else:
+            with open_source(path) as stream:
+                for line, payload in iter_ndjson(stream, numbered=True):
+                    yield f"{path}:{line}", payload
+
+
+def load_desired_state(
+    resource_models: list[type[Resource]], source: Path
+) -> dict[type[Resource], dict[str, dict]]:
+    """Index the desired resources by resource model and by their preferred key."""
+    desired = {}
+    seen_keys = {}
+    for label, payload in iter_desired_payloads(source):
+        model = Resource.get_by_payload(resource_models, payload)
+        if model is None:
+            raise click.ClickException(
+                f"{label}: Cannot guess resource type from the payload."
+            )
+
+        keys = resource_keys(payload)
+        if not keys:
+            attributes = ", ".join(KEY_ATTRIBUTES)
+            raise click.ClickException(
+                f"{label}: The resource has none of the {attributes} attributes."
+            )
+
+        model_keys = seen_keys.setdefault(model, set())
+        for key in keys:
+            if key in model_keys:
+                raise click.ClickException(f"{label}: Duplicate resource {key}.")
+        model_keys.update(keys)
+        desired.setdefault(model, {})[keys[0]] = payload
+    return desired
+
+
+def plan_actions(
+    model: type[Resource],
+    resource_type: str,
+    desired: dict[str, dict],
+    current: list[dict],
+    delete: bool,
+    patch: bool,
+) -> Iterator[dict]:
+    """Compute the actions turning the current resources into the desired ones.
+
+    Both sides are indexed by key, so no resource is compared more than once.
+    Desired resources are matched by each of their keys, by order of preference,
+    and matching resources are only modified if they differ.
+
+    :param patch: Whether to modify resources with patch requests, or with replacements.
+    """
+    index = {}
+    for resource in current:
+        for key in resource_keys(resource):
+            index.setdefault(key, resource)
+
+    # every desired resource is matched before any action is yielded
+    matches = []
+    matched_ids = set()
+    for key, payload in desired.items():
+        resource = next(
+            (index[other] for other in resource_keys(payload) if other in index), None
+        )
+        if resource is not None:
+            if resource["id"] in matched_ids:
+                raise click.ClickException(
+                    f"Several desired resources match the {resource_type} resource {resource['id']}."
+                )
+            matched_ids.add(resource["id"])
+        matches.append((key, payload, resource))
+
+    for key, payload, resource in matches:
+        action = {"resourceType": resource_type, "key": key}
+        if resource is None:
+            yield {"action": CREATE, **action, "resource": payload}
+            continue
+
+        operations = patch_operations(model, resource, payload)
+        if not operations:
+            continue
+
+        action["id"] = resource["id"]
+        if patch:
+            yield {"action": PATCH, **action, "Operations": operations}
+        else:
+            yield {"action": REPLACE, **action, "resource": payload}
+
+    if not delete:
+        return
+
+    for resource in current:
+        if resource["id"] not in matched_ids:
+            keys = resource_keys(resource)
+            yield {
+                "action": DELETE,
+                "resourceType": resource_type,
+                "key": keys[0] if keys else None,
+                "id": resource["id"],
+            }
+
+
+@click.command(cls=RSTCommand, name="sync")
+@click.argument("source", type=click.Path(exists=True, path_type=Path))
+@click.option(
+    "--delete",
+    is_flag=True,
+    help="Delete the resources of the server that are not in the desired state.",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    help="Print the actions as newline delimited JSON instead of performing them.",
+)
+@click.option(
+    "--count",
+    type=click.IntRange(min=1),
+    help="The number of current resources requested per page.",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="The number of requests performed simultaneously.",
+)
+@click.pass_context
+def sync_cli(ctx, source: Path, delete: bool, dry_run: bool, count, concurrency: int):
+    """Make the server resources match a desired state.
+
+    The desired state is a JSON or newline delimited JSON file, or a directory of such files.
+    Resources are matched with the server resources by :code:`externalId`, :code:`userName`
+    or :code:`displayName`. Only the needed creations, modifications and deletions are performed:
+
+    .. code-block:: bash
+
+        sync identities/ --delete --dry-run
+
+    Resources are modified with patch requests when the server supports them,
+    and replaced otherwise. Write-only attributes such as passwords are only sent
+    when resources are created.
+    """
+    require_discovery(ctx, "schemas", "resource_types", "service_provider_config")
+    client = ctx.obj["client"]
+    resource_models = get_resource_models(ctx)
+    names = {model: name for name, model in resource_models.items()}
+    desired_state = load_desired_state(list(resource_models.values()), source)
+    patch = is_patch_supported(client)
+
+    def current_resources(model):
+        def fetch(start_index, count):
+            search_request = SearchRequest(start_index=start_index, count=count)
+            return dump_response(client.query(model, search_request=search_request))
+
+        return list(iter_all_resources(fetch, count=count, prefetch=concurrency))
+
+    # the actions of every resource type are planned before the first one is performed,
+    # so an ambiguous desired state is reported before the server is modified
+    actions = []
+    for model, desired in desired_state.items():
+        try:
+            current = current_resources(model)
+        except SCIMClientError as scim_exc:
+            raise exception_to_click_error(scim_exc) from scim_exc
+        actions.extend(
+            plan_actions(model, names[model], desired, current, delete, patch)
+        )
+
+    if dry_run:
+        get_output(ctx, indent=False).write_all(actions)
+        return
+
+    def perform(client, action):
+        model = resource_models[action["resourceType"]]
+        if action["action"] == CREATE:
+            return client.create(action["resource"], raise_scim_errors=False)
+
+        if action["action"] == PATCH:
+            url = f"{client.resource_endpoint(model)}/{action['id']}"
+            return send_patch_request(
+                client, url, action["Operations"], raise_scim_errors=False
+            )
+
+        if action["action"] == REPLACE:
+            resource = {**action["resource"], "id": action["id"]}
+            return client.replace(resource, raise_scim_errors=False)
+
+        return client.delete(model, action["id"], raise_scim_errors=False)
+
+    echo_ndjson_results(
+        ctx,
+        perform,
+        ((action["key"], action) for action in actions),
+        concurrency=concurrency,
+        ordered=False,
+        indexed=True,
+    )
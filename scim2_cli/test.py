@@ -3,13 +3,13 @@ import sys
 import click
 from scim2_tester import Status
 from scim2_tester import check_server
-from sphinx_click.rst_to_ansi_formatter import make_rst_to_ansi_formatter
 
-from .utils import DOC_URL
+from .discovery import require_discovery
 from .utils import Color
+from .utils import RSTCommand
 
 
-@click.command(cls=make_rst_to_ansi_formatter(DOC_URL), name="test")
+@click.command(cls=RSTCommand, name="test")
 @click.pass_context
 @click.option("-v", "--verbose", is_flag=True, help="Enables verbose mode")
 @click.option(
@@ -31,6 +31,7 @@ def test_cli(ctx, verbose, check_status_code, check_content_type):
 
          test
     """
+    require_discovery(ctx, "schemas", "resource_types", "service_provider_config")
     client = ctx.obj["client"]
     client.check_status_code = check_status_code
     client.check_content_type = check_content_type
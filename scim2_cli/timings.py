@@ -0,0 +1,151 @@
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextlib import nullcontext
+
+IMPORTED_AT = time.perf_counter()
+# key of the click context meta holding the beginning of an invocation run by the daemon
+INVOKED_AT = "scim2_cli.invoked_at"
+PHASES = (
+    "imports",
+    "discover",
+    "from_schema",
+    "command",
+    "http",
+    "validation",
+    "model_dump",
+    "output",
+)
+TEXT = "text"
+JSON = "json"
+
+# The recorder of the current invocation, if --timings is enabled.
+recorder = None
+NULL_PHASE = nullcontext()
+active_phases = contextvars.ContextVar("active_phases", default=())
+
+
+class Timings:
+    """Accumulate the time spent in each phase of an invocation, with a monotonic clock.
+
+    Phases can be nested, for instance a schema conversion during a discovery.
+    The time of a nested phase is not counted in its parent phase, so the
+    durations add up. The active phases are tracked per thread and per task.
+
+    With a :class:`~scim2_cli.trace.Tracer`, each phase is also written as a span,
+    and the phases yield the span so its arguments can be completed.
+
+    :param origin: The beginning of the invocation, the package import by default.
+    """
+
+    def __init__(self, tracer=None, origin: float = IMPORTED_AT):
+        self.tracer = tracer
+        self.origin = origin
+        self.started_at = time.perf_counter()
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(PHASES, 0)
+        self.lock = threading.Lock()
+
+    def add(self, name: str, duration: float, count: int = 0) -> None:
+        with self.lock:
+            self.durations[name] = self.durations.get(name, 0.0) + duration
+            self.counts[name] = self.counts.get(name, 0) + count
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        parents = active_phases.get()
+        if parents:
+            parent = parents[-1]
+            self.add(parent[0], start - parent[1])
+
+        frame = [name, start]
+        token = active_phases.set((*parents, frame))
+        try:
+            if self.tracer is None:
+                yield None
+            else:
+                with self.tracer.span(name) as span:
+                    yield span
+        finally:
+            end = time.perf_counter()
+            self.add(name, end - frame[1], count=1)
+            active_phases.reset(token)
+            if parents:
+                parents[-1][1] = end
+
+    def report(self) -> dict:
+        """Return the phases durations in milliseconds.
+
+        :code:`startup` is the time between the beginning of the invocation, that is the
+        import of the package unless the command is run by the daemon, and the beginning
+        of the recording, and :code:`other` is the time spent outside of any phase.
+        With concurrent requests, phases overlap and :code:`other` can be zero.
+        """
+        total = time.perf_counter() - self.origin
+        startup = self.started_at - self.origin
+        phases = {
+            name: {"calls": self.counts[name], "duration": duration * 1000}
+            for name, duration in self.durations.items()
+        }
+        other = max(0.0, total - startup - sum(self.durations.values()))
+        return {
+            "startup": startup * 1000,
+            "phases": phases,
+            "other": other * 1000,
+            "total": total * 1000,
+        }
+
+
+def phase(name: str):
+    """Measure the duration of a phase, if --timings or --trace-file is enabled.
+
+    When it is disabled, a shared no-op context manager is returned.
+    """
+    return NULL_PHASE if recorder is None else recorder.phase(name)
+
+
+def timed(name: str, function):
+    """Wrap a function so its calls are measured as a phase."""
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with phase(name):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+def start(tracer=None, origin: float = IMPORTED_AT) -> Timings:
+    global recorder
+    recorder = Timings(tracer, origin)
+    return recorder
+
+
+def stop() -> dict | None:
+    """Stop recording, close the trace file, and return the report of the recorded invocation."""
+    global recorder
+    if recorder is None:
+        return None
+
+    report = recorder.report()
+    if recorder.tracer is not None:
+        recorder.tracer.close()
+    recorder = None
+    return report
+
+
+def format_report(report: dict) -> str:
+    rows = [("startup", "", report["startup"])]
+    rows.extend(
+        (name, str(values["calls"]), values["duration"])
+        for name, values in report["phases"].items()
+    )
+    rows.extend((("other", "", report["other"]), ("total", "", report["total"])))
+    lines = [f"{'phase':<12}{'calls':>7}{'ms':>10}"]
+    lines.extend(
+        f"{name:<12}{calls:>7}{duration:>10.1f}" for name, calls, duration in rows
+    )
+    return "\n".join(lines)
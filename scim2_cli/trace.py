@@ -0,0 +1,150 @@
+import asyncio
+import contextvars
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+
+from scim2_cli import jsonlib
+from scim2_cli.timings import IMPORTED_AT
+
+PROCESS_ID = 1
+current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def current_owner() -> tuple[int, int]:
+    """Identify the thread, and the task on asynchronous runs, executing a span."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return threading.get_ident(), id(task)
+
+
+class Span:
+    """A span being measured, with the arguments written with it."""
+
+    __slots__ = ("tracer", "name", "lane", "owner", "start", "args")
+
+    def __init__(self, tracer, name: str, lane: int, owner, start: float):
+        self.tracer = tracer
+        self.name = name
+        self.lane = lane
+        self.owner = owner
+        self.start = start
+        self.args = {}
+
+    def child(self, name: str, start: float, end: float, category: str) -> None:
+        """Write a nested span that was measured by other means."""
+        self.tracer.write_span(name, category, start, end, self.lane)
+
+
+class Tracer:
+    """Write spans to a file in the Chrome trace event format.
+
+    Events are written as soon as their span ends, in the JSON array format,
+    so memory usage does not grow with the number of requests, and a trace
+    interrupted before its closing bracket can still be loaded by the viewers.
+
+    Concurrent spans are written in distinct lanes, displayed as threads. A lane
+    is held by a top-level span and its nested spans, then reused by the next
+    span, so the number of lanes shows the actual concurrency.
+
+    :param origin: The beginning of the invocation, the package import by default.
+        The trace starts with a :code:`startup` span from this moment.
+    """
+
+    def __init__(self, path: str, origin: float = IMPORTED_AT):
+        self.origin = origin
+        self.file = open(path, "w", encoding="utf-8")
+        self.lock = threading.Lock()
+        self.free_lanes: list[int] = []
+        self.lanes = 0
+        self.file.write("[\n")
+        self.write_event(
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": PROCESS_ID,
+                "args": {"name": "scim"},
+            },
+            first=True,
+        )
+        lane = self.acquire_lane()
+        self.write_span("startup", "phase", origin, time.perf_counter(), lane)
+        self.release_lane(lane)
+
+    def acquire_lane(self) -> int:
+        with self.lock:
+            if self.free_lanes:
+                return heapq.heappop(self.free_lanes)
+            lane = self.lanes
+            self.lanes += 1
+        self.write_event(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": PROCESS_ID,
+                "tid": lane,
+                "args": {"name": f"lane {lane}"},
+            }
+        )
+        return lane
+
+    def release_lane(self, lane: int) -> None:
+        with self.lock:
+            heapq.heappush(self.free_lanes, lane)
+
+    def timestamp(self, moment: float) -> float:
+        """Convert a monotonic clock value into microseconds since the beginning of the invocation."""
+        return (moment - self.origin) * 1_000_000
+
+    @contextmanager
+    def span(self, name: str, category: str = "phase"):
+        """Measure a span, nested in the current span when it runs in the same thread and task."""
+        parent = current_span.get()
+        owner = current_owner()
+        owns_lane = parent is None or parent.owner != owner
+        lane = self.acquire_lane() if owns_lane else parent.lane
+        span = Span(self, name, lane, owner, time.perf_counter())
+        token = current_span.set(span)
+        try:
+            yield span
+        finally:
+            end = time.perf_counter()
+            current_span.reset(token)
+            self.write_span(name, category, span.start, end, lane, span.args)
+            if owns_lane:
+                self.release_lane(lane)
+
+    def write_span(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        end: float,
+        lane: int,
+        args: dict | None = None,
+    ) -> None:
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": self.timestamp(start),
+            "dur": (end - start) * 1_000_000,
+            "pid": PROCESS_ID,
+            "tid": lane,
+        }
+        if args:
+            event["args"] = args
+        self.write_event(event)
+
+    def write_event(self, event: dict, first: bool = False) -> None:
+        line = jsonlib.dumps(event)
+        with self.lock:
+            self.file.write(line if first else f",\n{line}")
+
+    def close(self) -> None:
+        with self.lock:
+            self.file.write("\n]\n")
+            self.file.close()
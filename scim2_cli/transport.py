@@ -0,0 +1,117 @@
+import time
+
+from httpx import AsyncBaseTransport
+from httpx import BaseTransport
+from httpx import Request
+from httpx import Response
+
+from scim2_cli.timings import phase
+
+# steps of a request reported by the httpcore trace extension, written as nested spans
+REQUEST_STEPS = (
+    ("connect", "connect_tcp.started", "connect_tcp.complete"),
+    ("tls", "start_tls.started", "start_tls.complete"),
+    ("send", "send_request_headers.started", "send_request_body.complete"),
+    ("wait", "receive_response_headers.started", "receive_response_headers.complete"),
+    ("receive", "receive_response_body.started", "receive_response_body.complete"),
+)
+
+
+def record_event(events: dict, name: str) -> None:
+    """Record the time of a httpcore trace event, such as :code:`http11.send_request_headers.started`."""
+    now = time.perf_counter()
+    events.setdefault("first", now)
+    event = name.partition(".")[2]
+    events[event] = now
+    if event == "retry.started":
+        events["retries"] = events.get("retries", 0) + 1
+
+
+def describe_request(
+    span, request: Request, response: Response | None, events: dict
+) -> None:
+    """Write the details of a request in its span, and its steps as nested spans.
+
+    The queue wait is the time spent before the first httpcore event, mostly waiting
+    for a connection of the pool. The name resolution is part of the connection step.
+    """
+    first = events.get("first", time.perf_counter())
+    span.args.update(
+        {
+            "method": request.method,
+            "url": str(request.url),
+            "bytes_out": int(request.headers.get("Content-Length", 0)),
+            "queue_ms": (first - span.start) * 1000,
+            "retries": events.get("retries", 0),
+        }
+    )
+    if response is not None:
+        span.args["status"] = response.status_code
+        span.args["bytes_in"] = response.num_bytes_downloaded
+
+    span.child("queue", span.start, first, "http")
+    for name, started, completed in REQUEST_STEPS:
+        if started in events and completed in events:
+            span.child(name, events[started], events[completed], "http")
+            span.args[f"{name}_ms"] = (events[completed] - events[started]) * 1000
+
+
+class TimedTransport(BaseTransport):
+    """Measure the HTTP requests as the :code:`http` phase, including the response body transfer.
+
+    When the phase is traced, the request steps are recorded with the httpcore trace extension.
+    """
+
+    def __init__(self, transport: BaseTransport):
+        self.transport = transport
+
+    def handle_request(self, request: Request) -> Response:
+        with phase("http") as span:
+            if span is None:
+                response = self.transport.handle_request(request)
+                response.read()
+                return response
+
+            events = {}
+            request.extensions["trace"] = lambda name, info: record_event(events, name)
+            response = None
+            try:
+                response = self.transport.handle_request(request)
+                response.read()
+            finally:
+                describe_request(span, request, response, events)
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncTimedTransport(AsyncBaseTransport):
+    """Asynchronous version of :class:`TimedTransport`."""
+
+    def __init__(self, transport: AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: Request) -> Response:
+        with phase("http") as span:
+            if span is None:
+                response = await self.transport.handle_async_request(request)
+                await response.aread()
+                return response
+
+            events = {}
+
+            async def trace(name, info):
+                record_event(events, name)
+
+            request.extensions["trace"] = trace
+            response = None
+            try:
+                response = await self.transport.handle_async_request(request)
+                await response.aread()
+            finally:
+                describe_request(span, request, response, events)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -1,12 +1,53 @@
-import json
+import functools
+import os
 import sys
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from contextlib import contextmanager
 from enum import Enum
+from pathlib import Path
+from typing import Any
+from typing import TypeGuard
 
 import click
-from sphinx_click.rst_to_ansi_formatter import make_rst_to_ansi_formatter
+
+from scim2_cli import jsonlib
+from scim2_cli.timings import phase
 
 DOC_URL = "https://scim2-cli.readthedocs.io/"
 INDENTATION_SIZE = 4
+DEFAULT_CACHE_TTL = 3600
+DEFAULT_RESPONSE_CACHE_SIZE = 64
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 5.0
+
+
+def default_cache_dir() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return Path(cache_home) / "scim2-cli"
+
+
+# monkeypatching pydanclick until this patch is released
+# https://github.com/felix-martel/pydanclick/pull/25
+def patch_pydanclick():
+    from pydantic import BaseModel
+
+    def _is_pydantic_model(model: Any) -> TypeGuard[type[BaseModel]]:
+        """Return True if `model` is a Pydantic `BaseModel` class."""
+        try:
+            return issubclass(model, BaseModel)
+        except TypeError:
+            return False
+
+    import pydanclick.model.field_collection
+
+    pydanclick.model.field_collection._is_pydantic_model = _is_pydantic_model
 
 
 class HeaderType(click.ParamType):
@@ -33,9 +74,164 @@ class Color(str, Enum):
     bright_white = "bright_white"
 
 
-def formatted_payload(obj, indent):
-    indent = INDENTATION_SIZE if indent else False
-    return json.dumps(obj, indent=indent)
+def read_stdin(ctx: click.Context):
+    """Parse the JSON payload passed to stdin, if any.
+
+    The payload is read on the first call, and kept for the next ones.
+    """
+    if "stdin" not in ctx.obj:
+        ctx.obj["stdin"] = None
+        stdin = click.get_text_stream("stdin")
+        if not stdin.isatty():  # pragma: no cover
+            if content := stdin.read().strip():
+                try:
+                    ctx.obj["stdin"] = jsonlib.loads(content)
+                except ValueError as exc:
+                    message = f"Invalid JSON input.\n{exc}"
+                    raise click.ClickException(message) from exc
+
+    return ctx.obj["stdin"]
+
+
+def iter_ndjson(stream=None, numbered: bool = False):
+    """Lazily parse a newline delimited JSON stream, one record at a time.
+
+    :param stream: The text stream to read. Defaults to stdin.
+    :param numbered: Whether to yield :code:`(line_number, record)` pairs instead of records.
+    """
+    stream = stream or click.get_text_stream("stdin")
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+
+        try:
+            record = jsonlib.loads(line)
+        except ValueError as exc:
+            message = f"Invalid JSON input on line {line_number}.\n{exc}"
+            raise click.ClickException(message) from exc
+
+        yield (line_number, record) if numbered else record
+
+
+def dump_response(response):
+    """Convert a SCIM client response into a JSON serializable object."""
+    if hasattr(response, "model_dump"):
+        with phase("model_dump"):
+            return response.model_dump()
+    return response
+
+
+def map_concurrently(function, items, concurrency: int = 1, ordered: bool = True):
+    """Apply a function on items with a pool of worker threads, and yield the results.
+
+    The workers share the same client, and thus the same connection pool.
+    No more than twice :code:`concurrency` items are read ahead of the results,
+    so memory usage stays bounded when the input is faster than the server.
+
+    :param ordered: Whether to yield the results in the input order,
+        or as soon as they are available.
+    """
+    if concurrency <= 1:
+        yield from map(function, items)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    window = 2 * concurrency
+    pending = deque() if ordered else set()
+
+    def drain(limit):
+        while len(pending) > limit:
+            if ordered:
+                yield pending.popleft().result()
+                continue
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                yield future.result()
+
+    try:
+        for item in items:
+            future = executor.submit(function, item)
+            if ordered:
+                pending.append(future)
+            else:
+                pending.add(future)
+            yield from drain(window - 1)
+        yield from drain(0)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+@contextmanager
+def record_context(index: int):
+    """Indicate the index of the failing record in error messages."""
+    try:
+        yield
+    except click.ClickException as exc:
+        exc.message = f"Record {index}: {exc.message}"
+        raise
+
+
+def echo_ndjson_results(
+    ctx,
+    operation,
+    records,
+    concurrency: int = 1,
+    ordered: bool = True,
+    indexed: bool = False,
+) -> None:
+    """Apply an operation on each record and print the responses as newline delimited JSON.
+
+    Records are consumed progressively, so memory usage does not depend on the input size.
+
+    :param operation: A function taking a SCIM client and a record, and performing a request.
+        With :code:`--async`, the client is asynchronous and the function returns a coroutine.
+    :param indexed: Whether records are :code:`(index, record)` pairs, where the index is
+        displayed in error messages. By default, records are numbered from 1.
+    """
+    if ctx.obj.get("async"):
+        from scim2_cli.aio import echo_ndjson_results_async
+
+        echo_ndjson_results_async(
+            ctx, operation, records, concurrency, ordered, indexed
+        )
+        return
+
+    from scim2_client import SCIMClientError
+
+    client = ctx.obj["client"]
+
+    def apply(indexed_record):
+        index, record = indexed_record
+        with record_context(index):
+            try:
+                return operation(client, record)
+            except SCIMClientError as scim_exc:
+                raise exception_to_click_error(scim_exc) from scim_exc
+
+    from scim2_cli.output import get_output
+
+    indexed_records = records if indexed else enumerate(records, start=1)
+    responses = map_concurrently(apply, indexed_records, concurrency, ordered)
+    get_output(ctx, indent=False).write_all(responses)
+
+
+def concurrency_options(func):
+    """Add the :code:`--concurrency` and :code:`--unordered` options to a command."""
+    func = click.option(
+        "--unordered",
+        is_flag=True,
+        help="With --ndjson, print the responses as soon as they are available instead of in the input order.",
+    )(func)
+    func = click.option(
+        "--concurrency",
+        type=click.IntRange(min=1),
+        default=1,
+        show_default=True,
+        help="With --ndjson, the number of requests performed simultaneously.",
+    )(func)
+    return func
 
 
 def split_headers(headers: list[str]) -> dict[str, str]:
@@ -49,10 +245,32 @@ def split_headers(headers: list[str]) -> dict[str, str]:
     }
 
 
-RSTCommand: click.Group = make_rst_to_ansi_formatter(DOC_URL, group=True)
+class RSTHelpMixin:
+    """Display the reST help texts with ANSI colors.
+
+    The reST converter is only imported when the help is actually displayed.
+    """
+
+    rst_converted = False
+
+    def format_help(self, ctx, formatter):
+        from sphinx_click.rst_to_ansi_formatter.formatter import RstToAnsiConverter
+
+        if self.help is not None and not self.rst_converted:
+            self.help = RstToAnsiConverter(self.help, DOC_URL).convert()
+            self.rst_converted = True
+        super().format_help(ctx, formatter)
+
 
+class RSTCommand(RSTHelpMixin, click.Command):
+    pass
 
-class ModelCommand(RSTCommand):
+
+class RSTGroup(RSTHelpMixin, click.Group):
+    pass
+
+
+class ModelCommand(RSTGroup):
     """CLI commands that takes a model subcommand."""
 
     def __init__(self, *args, factory, **kwargs):
@@ -60,14 +278,27 @@ class ModelCommand(RSTCommand):
         self.factory = factory
 
     def list_commands(self, ctx):
+        from scim2_cli.discovery import get_resource_models
+
         ctx.ensure_object(dict)
         base = super().list_commands(ctx)
-        lazy = sorted(ctx.obj.get("resource_models", {}).keys())
+        if "client" not in ctx.obj:
+            return base
+        lazy = sorted(get_resource_models(ctx).keys())
         return base + lazy
 
     def get_command(self, ctx, cmd_name):
-        model = ctx.obj["resource_models"].get(cmd_name)
-        return self.factory(model)
+        from scim2_cli.discovery import get_resource_models
+
+        model = get_resource_models(ctx).get(cmd_name)
+        return build_model_command(self.factory, model)
+
+
+@functools.cache
+def build_model_command(factory, model) -> click.Command:
+    """Build a model subcommand, reusing the command previously built for the same factory and model."""
+    with phase("command"):
+        return factory(model)
 
 
 def is_field_acceptable(context, model, field_name) -> bool:
@@ -99,12 +330,13 @@ def is_field_acceptable(context, model, field_name) -> bool:
     return True
 
 
-def unacceptable_fields(context, model):
-    return [
+@functools.cache
+def unacceptable_fields(context, model) -> tuple[str, ...]:
+    return tuple(
         field_name
         for field_name in model.model_fields
         if not is_field_acceptable(context, model, field_name)
-    ]
+    )
 
 
 def exception_to_click_error(exception):
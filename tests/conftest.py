@@ -14,33 +14,48 @@ from scim2_models import Sort
 from scim2_models import User
 
 
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    path = tmp_path / "cache"
+    monkeypatch.setenv("SCIM_CLI_CACHE_DIR", str(path))
+    return path
+
+
 @pytest.fixture
 def runner():
     return CliRunner()
 
 
+def service_provider_config(patch_supported=False, bulk_supported=False):
+    return ServiceProviderConfig(
+        documentation_uri="https://scim.test",
+        patch=Patch(supported=patch_supported),
+        bulk=Bulk(
+            supported=bulk_supported,
+            max_operations=2 if bulk_supported else 0,
+            max_payload_size=1048576 if bulk_supported else 0,
+        ),
+        change_password=ChangePassword(supported=True),
+        filter=Filter(supported=False, max_results=0),
+        sort=Sort(supported=False),
+        etag=ETag(supported=False),
+        authentication_schemes=[
+            AuthenticationScheme(
+                name="OAuth Bearer Token",
+                description="Authentication scheme using the OAuth Bearer Token Standard",
+                spec_uri="http://www.rfc-editor.org/info/rfc6750",
+                documentation_uri="https://scim.test",
+                type="oauthbearertoken",
+                primary=True,
+            ),
+        ],
+    ).model_dump()
+
+
 @pytest.fixture
 def httpserver(httpserver):
     httpserver.expect_request("/ServiceProviderConfig").respond_with_json(
-        ServiceProviderConfig(
-            documentation_uri="https://scim.test",
-            patch=Patch(supported=False),
-            bulk=Bulk(supported=False, max_operations=0, max_payload_size=0),
-            change_password=ChangePassword(supported=True),
-            filter=Filter(supported=False, max_results=0),
-            sort=Sort(supported=False),
-            etag=ETag(supported=False),
-            authentication_schemes=[
-                AuthenticationScheme(
-                    name="OAuth Bearer Token",
-                    description="Authentication scheme using the OAuth Bearer Token Standard",
-                    spec_uri="http://www.rfc-editor.org/info/rfc6750",
-                    documentation_uri="https://scim.test",
-                    type="oauthbearertoken",
-                    primary=True,
-                ),
-            ],
-        ).model_dump(),
+        service_provider_config(),
         status=200,
         content_type="application/scim+json",
     )
@@ -94,3 +109,21 @@ def simple_user_payload(httpserver):
         }
 
     return wrapped
+
+
+@pytest.fixture
+def patch_supported(httpserver):
+    """Make the next discovery report that the server supports patch operations."""
+    httpserver.expect_oneshot_request("/ServiceProviderConfig").respond_with_json(
+        service_provider_config(patch_supported=True),
+        content_type="application/scim+json",
+    )
+
+
+@pytest.fixture
+def bulk_supported(httpserver):
+    """Make the next discovery report that the server supports bulk operations."""
+    httpserver.expect_oneshot_request("/ServiceProviderConfig").respond_with_json(
+        service_provider_config(bulk_supported=True),
+        content_type="application/scim+json",
+    )
@@ -0,0 +1,229 @@
+import asyncio
+import json
+
+import pytest
+
+from scim2_cli import cli
+from scim2_cli.aio import amap_concurrently
+
+
+def user_payload(id):
+    return {
+        "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User"],
+        "userName": id,
+    }
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+def test_amap_concurrently_ordered():
+    """Test that results are yielded in the input order, even when later items are faster."""
+
+    async def function(item):
+        await asyncio.sleep(0.05 if item == 0 else 0)
+        return item
+
+    results = asyncio.run(collect(amap_concurrently(function, range(10), 4)))
+    assert results == list(range(10))
+
+
+def test_amap_concurrently_unordered():
+    """Test that results are yielded as soon as they are available."""
+
+    async def function(item):
+        await asyncio.sleep(0.1 if item == 0 else 0)
+        return item
+
+    results = asyncio.run(
+        collect(amap_concurrently(function, range(4), 4, ordered=False))
+    )
+    assert sorted(results) == list(range(4))
+    assert results[-1] == 0
+
+
+def test_amap_concurrently_bounded():
+    """Test that no more than the concurrency coroutines run simultaneously, and that the input is not read much further than the results."""
+    running = 0
+    max_running = 0
+    consumed = []
+
+    def items():
+        for item in range(50):
+            consumed.append(item)
+            yield item
+
+    async def function(item):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0)
+        running -= 1
+        return item
+
+    async def main():
+        results = []
+        async for result in amap_concurrently(function, items(), 3):
+            assert len(consumed) <= len(results) + 7
+            results.append(result)
+        return results
+
+    assert asyncio.run(main()) == list(range(50))
+    assert max_running == 3
+
+
+def test_amap_concurrently_error():
+    """Test that errors are raised to the consumer."""
+
+    async def function(item):
+        if item == 2:
+            raise ValueError("error")
+        return item
+
+    with pytest.raises(ValueError):
+        asyncio.run(collect(amap_concurrently(function, range(10), 4)))
+
+
+def test_create_ndjson(runner, httpserver, simple_user_payload):
+    """Test that --async creations are printed in the input order."""
+    ids = [f"user{index}" for index in range(10)]
+    for id in ids:
+        httpserver.expect_request(
+            "/Users", method="POST", json=user_payload(id)
+        ).respond_with_json(
+            simple_user_payload(id),
+            status=201,
+            content_type="application/scim+json",
+        )
+
+    result = runner.invoke(
+        cli,
+        [
+            "--url",
+            httpserver.url_for("/"),
+            "--async",
+            "create",
+            "--ndjson",
+            "--concurrency",
+            "4",
+        ],
+        input="\n".join(json.dumps(user_payload(id)) for id in ids),
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert [json.loads(line)["id"] for line in result.output.splitlines()] == ids
+
+
+def test_create_ndjson_error(runner, httpserver):
+    """Test that --async errors indicate the failing record."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "--async", "create", "--ndjson"],
+        input=json.dumps({"schemas": ["urn:unknown"]}),
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 1, result.stdout
+    assert "Record 1: Cannot guess resource type from the payload" in result.stdout
+
+
+def test_delete_ndjson(runner, httpserver):
+    """Test --async deletions."""
+    for id in ("first", "second"):
+        httpserver.expect_request(f"/Users/{id}", method="DELETE").respond_with_data(
+            "", status=204, content_type="application/scim+json"
+        )
+
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "--async", "delete", "user", "--ndjson"],
+        input='"first"\n{"id": "second"}\n{}',
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 1, result.stdout
+    assert "Record 3: Missing 'id' attribute" in result.stdout
+    assert [request.path for request, _ in httpserver.log][-2:] == [
+        "/Users/first",
+        "/Users/second",
+    ]
+
+
+def test_query_all_pages(runner, httpserver, simple_user_payload):
+    """Test that --async walks through all the pages."""
+    ids = [f"user{index}" for index in range(1, 6)]
+    for start_index, count in ((1, None), (3, 2), (5, 2)):
+        query_string = {"startIndex": str(start_index)}
+        if count:
+            query_string["count"] = str(count)
+        httpserver.expect_oneshot_request(
+            "/Users", method="GET", query_string=query_string
+        ).respond_with_json(
+            {
+                "totalResults": len(ids),
+                "itemsPerPage": 2,
+                "startIndex": start_index,
+                "schemas": ["urn:ietf:params:scim:api:messages:2.0:ListResponse"],
+                "Resources": [
+                    simple_user_payload(id)
+                    for id in ids[start_index - 1 : start_index + 1]
+                ],
+            },
+            content_type="application/scim+json",
+        )
+
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "--async", "query", "user", "--all"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert [json.loads(line) for line in result.output.splitlines()] == [
+        simple_user_payload(id) for id in ids
+    ]
+    httpserver.check_assertions()
+
+
+def test_query_all_pages_error(runner, httpserver, simple_user_payload):
+    """Test that --async errors on the following pages are reported."""
+    httpserver.expect_oneshot_request(
+        "/Users", method="GET", query_string={"startIndex": "1"}
+    ).respond_with_json(
+        {
+            "totalResults": 2,
+            "itemsPerPage": 1,
+            "startIndex": 1,
+            "schemas": ["urn:ietf:params:scim:api:messages:2.0:ListResponse"],
+            "Resources": [simple_user_payload("first")],
+        },
+        content_type="application/scim+json",
+    )
+    httpserver.expect_oneshot_request(
+        "/Users", method="GET", query_string={"startIndex": "2", "count": "1"}
+    ).respond_with_data("", status=999, content_type="application/scim+json")
+
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "--async", "query", "user", "--all"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 1, result.stdout
+    assert "Unexpected response status code: 999" in result.stdout
+
+
+def test_single_shot(runner, httpserver, simple_user_payload):
+    """Test that single requests behave the same with --async."""
+    httpserver.expect_request(
+        "/Users", method="POST", json=user_payload("single")
+    ).respond_with_json(
+        simple_user_payload("single"),
+        status=201,
+        content_type="application/scim+json",
+    )
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "--async", "create"],
+        input=json.dumps(user_payload("single")),
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert json.loads(result.output) == simple_user_payload("single")
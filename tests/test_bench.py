@@ -0,0 +1,210 @@
+import itertools
+import json
+import threading
+
+import pytest
+from scim2_models import Error
+from scim2_models import User
+from werkzeug import Response
+
+from scim2_cli import cli
+from scim2_cli.bench import Benchmark
+from scim2_cli.bench import format_report
+from scim2_cli.bench import percentile
+
+
+@pytest.fixture
+def users(httpserver):
+    """Serve users stored in a dict."""
+    users = {}
+    ids = itertools.count(1)
+    lock = threading.Lock()
+
+    def json_response(payload, status=200):
+        return Response(
+            json.dumps(payload), status=status, content_type="application/scim+json"
+        )
+
+    def collection_handler(request):
+        if request.method == "POST":
+            with lock:
+                id = str(next(ids))
+                users[id] = {**request.json, "id": id, "meta": {"resourceType": "User"}}
+            return json_response(users[id], 201)
+
+        return json_response(
+            {
+                "schemas": ["urn:ietf:params:scim:api:messages:2.0:ListResponse"],
+                "totalResults": len(users),
+                "Resources": list(users.values())[:10],
+            }
+        )
+
+    def resource_handler(request):
+        id = request.path.rsplit("/", 1)[-1]
+        if id not in users:
+            return json_response(
+                {
+                    "schemas": ["urn:ietf:params:scim:api:messages:2.0:Error"],
+                    "status": "404",
+                },
+                404,
+            )
+        if request.method == "DELETE":
+            del users[id]
+            return Response(status=204, content_type="application/scim+json")
+        if request.method == "PUT":
+            users[id] = {**request.json, "id": id, "meta": {"resourceType": "User"}}
+        return json_response(users[id])
+
+    httpserver.expect_request("/Users").respond_with_handler(collection_handler)
+    for id in range(1, 1000):
+        httpserver.expect_request(f"/Users/{id}").respond_with_handler(resource_handler)
+    return users
+
+
+def test_bench(runner, httpserver, users):
+    """Test that the report covers the mix operations, and that created resources are deleted."""
+    result = runner.invoke(
+        cli,
+        [
+            "--url",
+            httpserver.url_for("/"),
+            "bench",
+            "--duration",
+            "0.3",
+            "--concurrency",
+            "2",
+            "--seed",
+            "1",
+            "--json",
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    lines = result.stdout.splitlines()
+    assert lines[0].endswith("created resources were deleted.")
+    report = json.loads("\n".join(lines[1:]))
+    assert set(report["operations"]) == {
+        "create",
+        "query",
+        "search",
+        "replace",
+        "delete",
+    }
+    assert report["total"]["count"] == sum(
+        stats["count"] for stats in report["operations"].values()
+    )
+    assert report["total"]["errors"] == 0
+    assert set(report["total"]["latency"]) == {"p50", "p90", "p99", "max"}
+    assert users == {}
+
+
+def test_bench_rate(runner, httpserver, users):
+    """Test that a fixed rate starts a fixed number of operations."""
+    result = runner.invoke(
+        cli,
+        [
+            "--url",
+            httpserver.url_for("/"),
+            "bench",
+            "user",
+            "--mix",
+            "create,query=3",
+            "--rate",
+            "20",
+            "--duration",
+            "0.5",
+            "--no-cleanup",
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert result.stdout.splitlines()[0].split() == [
+        "operation",
+        "count",
+        "errors",
+        "req/s",
+        "p50",
+        "ms",
+        "p90",
+        "ms",
+        "p99",
+        "ms",
+        "max",
+        "ms",
+    ]
+    assert result.stdout.splitlines()[-1].split()[:2] == ["total", "10"]
+    assert users
+
+
+def test_bench_errors(runner, httpserver):
+    """Test invalid mixes and resource types."""
+    args = ["--url", httpserver.url_for("/"), "bench"]
+    result = runner.invoke(cli, [*args, "--mix", "create=1,unknown=2"])
+    assert result.exit_code == 2
+    assert "Unknown operation 'unknown'." in result.stdout
+
+    result = runner.invoke(cli, [*args, "--mix", "create=x"])
+    assert result.exit_code == 2
+    assert "Invalid weight 'x' for 'create'." in result.stdout
+
+    result = runner.invoke(cli, [*args, "--mix", "create=0"])
+    assert result.exit_code == 2
+    assert "At least one operation must have a positive weight." in result.stdout
+
+    result = runner.invoke(cli, [*args, "group"])
+    assert result.exit_code == 1
+    assert "Unknown resource type 'group'." in result.stdout
+
+
+def test_percentile():
+    """Test the nearest-rank percentiles and the report table."""
+    latencies = [index / 1000 for index in range(1, 101)]
+    assert percentile(latencies, 50) == 0.05
+    assert percentile(latencies, 99) == 0.099
+    assert percentile([0.1], 90) == 0.1
+    assert percentile([1, 2, 3, 4, 5], 90) == 5
+    assert percentile(list(range(1, 151)), 99) == 149
+
+    report = {
+        "operations": {
+            "query": {"count": 0, "errors": 0, "errorRate": 0.0, "throughput": 0.0}
+        },
+        "total": {"count": 0, "errors": 0, "errorRate": 0.0, "throughput": 0.0},
+    }
+    assert format_report(report).splitlines()[1].split() == [
+        "query",
+        "0",
+        "0",
+        "(0.0%)",
+        "0.0",
+    ]
+
+
+def test_failed_delete():
+    """Test that resources that could not be deleted are still cleaned up."""
+
+    class Client:
+        response = Error(status=500)
+
+        def delete(self, resource_model, id, raise_scim_errors):
+            if isinstance(self.response, Exception):
+                raise self.response
+            return self.response
+
+    client = Client()
+    benchmark = Benchmark(client, User, {"delete": 1}, seed=0)
+    benchmark.created = {"1": "scim-bench-1"}
+
+    assert benchmark.perform("delete") == ("delete", client.response)
+    assert benchmark.created == {"1": "scim-bench-1"}
+
+    client.response = ConnectionError()
+    with pytest.raises(ConnectionError):
+        benchmark.perform("delete")
+    assert benchmark.created == {"1": "scim-bench-1"}
+
+    client.response = None
+    assert benchmark.perform("delete") == ("delete", None)
+    assert benchmark.created == {}
@@ -0,0 +1,234 @@
+import json
+
+import pytest
+from scim2_models import AuthenticationScheme
+from scim2_models import Bulk
+from scim2_models import ChangePassword
+from scim2_models import ETag
+from scim2_models import Filter
+from scim2_models import Patch
+from scim2_models import ServiceProviderConfig
+from scim2_models import Sort
+
+from scim2_cli import cli
+from scim2_cli.bulk import bulk_request_body
+from scim2_cli.bulk import iter_bulk_chunks
+
+
+@pytest.fixture
+def service_provider_config():
+    return ServiceProviderConfig(
+        documentation_uri="https://scim.test",
+        patch=Patch(supported=False),
+        bulk=Bulk(supported=True, max_operations=2, max_payload_size=1048576),
+        change_password=ChangePassword(supported=True),
+        filter=Filter(supported=False, max_results=0),
+        sort=Sort(supported=False),
+        etag=ETag(supported=False),
+        authentication_schemes=[
+            AuthenticationScheme(
+                name="OAuth Bearer Token",
+                description="Authentication scheme using the OAuth Bearer Token Standard",
+                spec_uri="http://www.rfc-editor.org/info/rfc6750",
+                documentation_uri="https://scim.test",
+                type="oauthbearertoken",
+                primary=True,
+            ),
+        ],
+    )
+
+
+@pytest.fixture
+def httpserver(httpserver, service_provider_config):
+    httpserver.expect_oneshot_request("/ServiceProviderConfig").respond_with_json(
+        service_provider_config.model_dump(),
+        status=200,
+        content_type="application/scim+json",
+    )
+    return httpserver
+
+
+def operation(bulk_id):
+    return {
+        "method": "POST",
+        "path": "/Users",
+        "bulkId": bulk_id,
+        "data": {
+            "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User"],
+            "userName": bulk_id,
+        },
+    }
+
+
+def result(bulk_id, status="201"):
+    return {
+        "method": "POST",
+        "bulkId": bulk_id,
+        "location": f"https://scim.test/Users/{bulk_id}",
+        "status": status,
+    }
+
+
+def bulk_response(*results):
+    return {
+        "schemas": ["urn:ietf:params:scim:api:messages:2.0:BulkResponse"],
+        "Operations": list(results),
+    }
+
+
+def test_chunks_max_operations():
+    """Test that chunks respect the maximum number of operations."""
+    chunks = list(iter_bulk_chunks([operation(str(i)) for i in range(5)], 2, None))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+
+def test_chunks_max_payload_size():
+    """Test that chunks respect the maximum payload size."""
+    operations = [operation(str(i)) for i in range(5)]
+    max_payload_size = len(
+        bulk_request_body(
+            [json.dumps(op, separators=(",", ":")).encode() for op in operations[:3]],
+            None,
+        )
+    )
+    chunks = list(iter_bulk_chunks(operations, None, max_payload_size))
+    assert [len(chunk) for chunk in chunks] == [3, 2]
+    assert all(
+        len(bulk_request_body(chunk, None)) <= max_payload_size for chunk in chunks
+    )
+
+
+def test_chunks_operation_too_large():
+    """Test that operations bigger than the payload size limit are reported."""
+    with pytest.raises(Exception, match="Record 1: The operation exceeds"):
+        list(iter_bulk_chunks([operation("foo")], None, 10))
+
+
+def test_chunks_invalid_operation():
+    """Test that invalid operations are reported."""
+    with pytest.raises(Exception, match="Record 1: Invalid bulk operation."):
+        list(iter_bulk_chunks([{"method": "INVALID"}], None, None))
+
+
+def test_bulk(runner, httpserver):
+    """Test that operations are sent in several bulk requests."""
+    httpserver.expect_oneshot_request(
+        "/Bulk",
+        method="POST",
+        json={
+            "schemas": ["urn:ietf:params:scim:api:messages:2.0:BulkRequest"],
+            "Operations": [operation("first"), operation("second")],
+        },
+    ).respond_with_json(
+        bulk_response(result("first"), result("second")),
+        content_type="application/scim+json",
+    )
+    httpserver.expect_oneshot_request(
+        "/Bulk",
+        method="POST",
+        json={
+            "schemas": ["urn:ietf:params:scim:api:messages:2.0:BulkRequest"],
+            "Operations": [operation("third")],
+        },
+    ).respond_with_json(
+        bulk_response(result("third")),
+        content_type="application/scim+json",
+    )
+
+    result_ = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "bulk"],
+        input="\n".join(
+            json.dumps(operation(bulk_id)) for bulk_id in ("first", "second", "third")
+        ),
+        catch_exceptions=False,
+    )
+    assert result_.exit_code == 0, result_.stdout
+    assert [json.loads(line) for line in result_.output.splitlines()] == [
+        result("first"),
+        result("second"),
+        result("third"),
+    ]
+    httpserver.check_assertions()
+
+
+def test_fail_on_errors(runner, httpserver):
+    """Test that no more requests are sent once the failOnErrors threshold is reached."""
+    httpserver.expect_oneshot_request(
+        "/Bulk",
+        method="POST",
+        json={
+            "schemas": ["urn:ietf:params:scim:api:messages:2.0:BulkRequest"],
+            "failOnErrors": 1,
+            "Operations": [operation("first"), operation("second")],
+        },
+    ).respond_with_json(
+        bulk_response(result("first", status="409")),
+        content_type="application/scim+json",
+    )
+
+    result_ = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "bulk", "--fail-on-errors", "1"],
+        input="\n".join(
+            json.dumps(operation(bulk_id)) for bulk_id in ("first", "second", "third")
+        ),
+        catch_exceptions=False,
+    )
+    assert result_.exit_code == 0, result_.stdout
+    assert [json.loads(line) for line in result_.output.splitlines()] == [
+        result("first", status="409"),
+    ]
+    httpserver.check_assertions()
+
+    result_ = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "bulk", "--fail-on-errors", "0"],
+        input=json.dumps(operation("first")),
+    )
+    assert result_.exit_code == 2
+    assert "Invalid value for '--fail-on-errors'" in result_.stdout
+
+
+def test_bulk_error(runner, httpserver):
+    """Test bulk request errors."""
+    httpserver.expect_request("/Bulk", method="POST").respond_with_json(
+        {
+            "schemas": ["urn:ietf:params:scim:api:messages:2.0:Error"],
+            "status": "413",
+            "detail": "The size of the bulk operation exceeds the maxPayloadSize.",
+        },
+        status=413,
+        content_type="application/scim+json",
+    )
+
+    result_ = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "bulk"],
+        input=json.dumps(operation("first")),
+        catch_exceptions=False,
+    )
+    assert result_.exit_code == 1, result_.stdout
+    assert "The size of the bulk operation exceeds the maxPayloadSize." in (
+        result_.stdout
+    )
+
+
+def test_bulk_unsupported(runner, httpserver, service_provider_config):
+    """Test servers without bulk support."""
+    httpserver.clear()
+    service_provider_config.bulk.supported = False
+    httpserver.expect_request("/ServiceProviderConfig").respond_with_json(
+        service_provider_config.model_dump(),
+        status=200,
+        content_type="application/scim+json",
+    )
+
+    result_ = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "bulk"],
+        input=json.dumps(operation("first")),
+        catch_exceptions=False,
+    )
+    assert result_.exit_code == 1, result_.stdout
+    assert "The server does not support bulk operations." in result_.stdout
@@ -0,0 +1,67 @@
+import json
+import os
+
+from werkzeug import Response
+
+from scim2_cli import cli
+from scim2_cli.cache import ResponseCache
+
+
+def test_response_cache(runner, httpserver, simple_user_payload, cache_dir):
+    """Test that cached resources are revalidated with their meta.version."""
+    payload = simple_user_payload("foobar")
+    version = payload["meta"]["version"]
+
+    def handler(request):
+        if request.headers.get("If-None-Match") == version:
+            return Response(status=304)
+        return Response(json.dumps(payload), content_type="application/scim+json")
+
+    httpserver.expect_request("/Users/foobar", method="GET").respond_with_handler(
+        handler
+    )
+    args = ["--url", httpserver.url_for("/"), "--response-cache", "query", "user"]
+    for _ in range(2):
+        result = runner.invoke(cli, [*args, "foobar"], catch_exceptions=False)
+        assert result.exit_code == 0, result.stdout
+        assert json.loads(result.stdout)["id"] == "foobar"
+
+    conditions = [
+        request.headers.get("If-None-Match")
+        for request, _ in httpserver.log
+        if request.path == "/Users/foobar"
+    ]
+    assert conditions == [None, version]
+    assert len(list((cache_dir / "responses").glob("*/*.json"))) == 1
+
+
+def test_response_cache_disabled(runner, httpserver, simple_user_payload, cache_dir):
+    """Test that resources are not stored on disk by default."""
+    httpserver.expect_request("/Users/foobar", method="GET").respond_with_json(
+        simple_user_payload("foobar"), content_type="application/scim+json"
+    )
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "query", "user", "foobar"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert not (cache_dir / "responses").exists()
+
+
+def test_response_cache_eviction(tmp_path):
+    """Test that the least recently used entries are removed first."""
+    cache = ResponseCache(tmp_path, "https://scim.test", {}, max_size=250)
+    entry = {"etag": "1", "headers": {}, "body": "x" * 50}
+    for index, url in enumerate(("/a", "/b")):
+        cache.set(url, entry)
+        os.utime(cache.path(url), (index, index))
+
+    assert cache.get("/a") == entry
+    cache.set("/c", entry)
+    assert cache.get("/a") == entry
+    assert cache.get("/b") is None
+    assert cache.get("/c") == entry
+
+    cache.delete("/a")
+    assert cache.get("/a") is None
@@ -1,5 +1,11 @@
 import json
 import os
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
 
 import pytest
 from scim2_models import AuthenticationScheme
@@ -14,6 +20,7 @@ from scim2_models import Schema
 from scim2_models import ServiceProviderConfig
 from scim2_models import Sort
 from scim2_models import User
+from werkzeug import Response
 
 from scim2_cli import cli
 
@@ -325,3 +332,187 @@ def test_custom_configuration_by_env(
         del os.environ["SCIM_CLI_SERVICE_PROVIDER_CONFIG"]
         del os.environ["SCIM_CLI_SCHEMAS"]
         del os.environ["SCIM_CLI_RESOURCE_TYPES"]
+
+
+def test_import_time():
+    """Test that importing the CLI entry point does not load heavy dependencies."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import scim2_cli"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # lines look like "import time: self [us] | cumulative | imported package"
+    imported = {}
+    for line in result.stderr.splitlines()[1:]:
+        _, cumulative, name = line.split("|")
+        imported[name.strip()] = int(cumulative)
+
+    for module in (
+        "scim2_tester",
+        "pydanclick",
+        "sphinx_click",
+        "pygments",
+        "scim2_models",
+        "httpx",
+    ):
+        assert module not in imported
+
+    assert imported["scim2_cli"] < 200_000
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """A minimal SCIM server answering to resource types queries and deletions."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def send(self, status, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/scim+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.send(
+            200,
+            ListResponse[ResourceType](
+                total_results=1,
+                start_index=1,
+                items_per_page=1,
+                resources=[ResourceType.from_resource(User)],
+            ).model_dump(),
+        )
+
+    def do_DELETE(self):
+        self.send(204)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def unix_server(tmp_path):
+    class Server(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+        connections = 0
+        lock = threading.Lock()
+
+    path = str(tmp_path / "scim.sock")
+    server = Server(path, StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_unix_socket(runner, unix_server):
+    """Test that requests can be sent through a Unix socket."""
+    result = runner.invoke(
+        cli,
+        [
+            "--url",
+            "http://scim.test",
+            "--unix-socket",
+            unix_server.server_address,
+            "query",
+            "resourcetype",
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert json.loads(result.stdout)["Resources"][0]["id"] == "User"
+
+
+def test_connection_reuse(runner, unix_server):
+    """Test that concurrent workers reuse their connections, unless keep-alive is disabled.
+
+    The throughputs of the transport settings can be compared with benchmarks/bench_http.py.
+    """
+    requests_count, workers = 200, 4
+    for keepalive in (workers, 0):
+        unix_server.connections = 0
+        result = runner.invoke(
+            cli,
+            [
+                "--url",
+                "http://scim.test",
+                "--unix-socket",
+                unix_server.server_address,
+                "--no-cache",
+                "--max-keepalive-connections",
+                str(keepalive),
+                "delete",
+                "user",
+                "--ndjson",
+                "--concurrency",
+                str(workers),
+            ],
+            input="\n".join(json.dumps(str(id)) for id in range(requests_count)),
+            catch_exceptions=False,
+        )
+        assert result.exit_code == 0, result.stdout
+
+        # One more request is needed to discover the resource types.
+        if keepalive:
+            assert unix_server.connections <= workers + 1
+        else:
+            assert unix_server.connections == requests_count + 1
+
+
+def test_read_timeout(runner, httpserver):
+    """Test that the read timeout can be configured."""
+
+    def handler(request):
+        time.sleep(0.5)
+        return Response("{}", content_type="application/scim+json")
+
+    httpserver.expect_oneshot_request("/ServiceProviderConfig").respond_with_handler(
+        handler
+    )
+    result = runner.invoke(
+        cli,
+        [
+            "--url",
+            httpserver.url_for("/"),
+            "--read-timeout",
+            "0.1",
+            "query",
+            "serviceproviderconfig",
+        ],
+    )
+    assert result.exit_code == 1, result.stdout
+    assert "Network error happened during request" in result.stdout
+
+
+def test_http2_missing_dependency(runner, monkeypatch):
+    """Test the error message when HTTP/2 is requested without the h2 package."""
+    monkeypatch.setitem(sys.modules, "h2", None)
+    result = runner.invoke(cli, ["--url", "http://scim.test", "--http2", "query"])
+    assert result.exit_code == 1, result.stdout
+    assert "pip install scim2-cli[http2]" in result.stdout
+
+
+def test_http2(runner, unix_server):
+    """Test that HTTP/2 can be enabled, and falls back to HTTP/1.1 on cleartext connections."""
+    result = runner.invoke(
+        cli,
+        [
+            "--url",
+            "http://scim.test",
+            "--unix-socket",
+            unix_server.server_address,
+            "--http2",
+            "query",
+            "resourcetype",
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
@@ -219,3 +219,92 @@ def test_command_validation_error(runner, httpserver, simple_user_payload):
     )
     assert result.exit_code == 1, result.stdout
     assert "Expected type User but got undefined object with no schema" in result.stdout
+
+
+def test_ndjson(runner, httpserver, simple_user_payload):
+    """Test that each NDJSON line creates a resource."""
+    payloads = []
+    for id in ("first", "second"):
+        payload = {
+            "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User"],
+            "userName": f"{id}@example.com",
+        }
+        payloads.append(payload)
+        httpserver.expect_request(
+            "/Users", method="POST", json=payload
+        ).respond_with_json(
+            simple_user_payload(id),
+            status=201,
+            content_type="application/scim+json",
+        )
+
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "create", "--ndjson"],
+        input="\n".join(json.dumps(payload) for payload in payloads) + "\n\n",
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert [json.loads(line) for line in result.output.splitlines()] == [
+        simple_user_payload("first"),
+        simple_user_payload("second"),
+    ]
+
+
+def test_ndjson_concurrency(runner, httpserver, simple_user_payload):
+    """Test that concurrent creations are printed in the input order."""
+    ids = [f"user{index}" for index in range(10)]
+    for id in ids:
+        httpserver.expect_request(
+            "/Users",
+            method="POST",
+            json={
+                "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User"],
+                "userName": id,
+            },
+        ).respond_with_json(
+            simple_user_payload(id),
+            status=201,
+            content_type="application/scim+json",
+        )
+
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "create", "--ndjson", "--concurrency", "4"],
+        input="\n".join(
+            json.dumps(
+                {
+                    "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User"],
+                    "userName": id,
+                }
+            )
+            for id in ids
+        ),
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert [json.loads(line)["id"] for line in result.output.splitlines()] == ids
+
+
+def test_ndjson_invalid_json(runner, httpserver):
+    """Test that invalid NDJSON lines are reported."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "create", "--ndjson"],
+        input="\ninvalid\n",
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 1, result.stdout
+    assert "Invalid JSON input on line 2." in result.stdout
+
+
+def test_ndjson_scimclient_error(runner, httpserver):
+    """Test that the failing record is reported."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "create", "--ndjson"],
+        input=json.dumps({"schemas": ["urn:unknown"]}),
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 1, result.stdout
+    assert "Record 1: Cannot guess resource type from the payload" in result.stdout
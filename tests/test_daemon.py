@@ -0,0 +1,254 @@
+import io
+import json
+import threading
+import time
+
+import pytest
+
+from scim2_cli import cli
+from scim2_cli import main
+from scim2_cli import timings
+from scim2_cli.daemon import DaemonServer
+from scim2_cli.daemon import forward
+
+
+@pytest.fixture
+def httpserver(httpserver, simple_user_payload):
+    httpserver.expect_request("/Users/foobar", method="GET").respond_with_json(
+        simple_user_payload("foobar"),
+        content_type="application/scim+json",
+    )
+    httpserver.expect_request("/Users", method="POST").respond_with_json(
+        simple_user_payload("created"),
+        status=201,
+        content_type="application/scim+json",
+    )
+    return httpserver
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return tmp_path / "daemon.sock"
+
+
+@pytest.fixture
+def daemon(runner, socket_path):
+    server = DaemonServer(socket_path)
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+    yield server
+    if thread.is_alive():
+        runner.invoke(cli, ["daemon", "stop", "--socket", str(socket_path)])
+    thread.join()
+
+
+def run_forwarded(socket_path, args, input=b""):
+    stdout, stderr = io.BytesIO(), io.BytesIO()
+    status = forward(args, socket_path, io.BytesIO(input), stdout, stderr)
+    return status, stdout.getvalue().decode(), stderr.getvalue().decode()
+
+
+@pytest.mark.parametrize(
+    "args,input",
+    [
+        (["query", "user", "foobar"], b""),
+        (["--format", "ndjson", "query", "user", "foobar"], b""),
+        (
+            ["create"],
+            b'{"schemas": ["urn:ietf:params:scim:schemas:core:2.0:User"], "userName": "bjensen"}',
+        ),
+        (["query", "unknown"], b""),
+        (["query", "--help"], b""),
+        (["--no-cache", "test"], b""),
+    ],
+)
+def test_output_matches(runner, httpserver, daemon, socket_path, args, input):
+    """Test that the daemon outputs are the same than the outputs of the CLI."""
+    args = ["--url", httpserver.url_for("/"), *args]
+    expected = runner.invoke(
+        cli, args, input=input, prog_name="scim", catch_exceptions=False
+    )
+
+    status, stdout, stderr = run_forwarded(socket_path, args, input)
+    assert status == expected.exit_code
+    assert stdout + stderr == expected.stdout
+
+
+def test_system_exit(httpserver, daemon, socket_path):
+    """Test that commands exiting with sys.exit do not stop the daemon."""
+    args = ["--url", httpserver.url_for("/"), "--no-cache"]
+    status, stdout, _ = run_forwarded(socket_path, [*args, "test"])
+    assert status == 1
+    assert "check_service_provider_config_endpoint" in stdout
+
+    status, _, _ = run_forwarded(socket_path, [*args, "query", "user", "foobar"])
+    assert status == 0
+    assert daemon.running
+
+
+def test_warm_client(httpserver, daemon, socket_path):
+    """Test that the discovery and the connections are reused by the next invocations."""
+    args = ["--url", httpserver.url_for("/"), "--no-cache", "query", "user", "foobar"]
+    for _ in range(3):
+        status, stdout, _ = run_forwarded(socket_path, args)
+        assert status == 0
+        assert '"id": "foobar"' in stdout
+
+    paths = [request.path for request, _ in httpserver.log]
+    assert paths.count("/Schemas") == 1
+    assert paths.count("/Users/foobar") == 3
+    assert len(daemon.profiles) == 1
+
+    args = ["--url", httpserver.url_for("/"), "--no-cache", "--read-timeout", "1"]
+    run_forwarded(socket_path, [*args, "query", "user", "foobar"])
+    assert len(daemon.profiles) == 2
+
+
+def test_warm_client_expiry(httpserver, daemon, socket_path):
+    """Test that the warmed discovery expires after the TTL, or with --refresh-discovery."""
+    args = ["--url", httpserver.url_for("/"), "--no-cache"]
+    query = ["query", "user", "foobar"]
+    for extra in ([], [], ["--refresh-discovery"], []):
+        status, _, _ = run_forwarded(socket_path, [*args, *extra, *query])
+        assert status == 0
+
+    paths = [request.path for request, _ in httpserver.log]
+    assert paths.count("/Schemas") == 2
+    assert len(daemon.profiles) == 1
+
+    for _ in range(2):
+        status, _, _ = run_forwarded(socket_path, [*args, "--cache-ttl", "0", *query])
+        assert status == 0
+    paths = [request.path for request, _ in httpserver.log]
+    assert paths.count("/Schemas") == 4
+
+
+def test_timings(httpserver, daemon, socket_path, monkeypatch):
+    """Test that the timings of a forwarded command do not include the daemon uptime."""
+    monkeypatch.setattr(timings, "IMPORTED_AT", time.perf_counter() - 3600)
+    status, _, stderr = run_forwarded(
+        socket_path,
+        [
+            "--url",
+            httpserver.url_for("/"),
+            "--timings",
+            "--timings-format",
+            "json",
+            "query",
+            "user",
+            "foobar",
+        ],
+    )
+    assert status == 0
+    report = json.loads(stderr.splitlines()[-1])
+    assert report["startup"] < 1000 * 60
+    assert report["total"] < 1000 * 60
+
+
+def test_trace_file(httpserver, daemon, socket_path, monkeypatch, tmp_path):
+    """Test that the traces of a forwarded command start when the daemon receives it."""
+    monkeypatch.setattr(timings, "IMPORTED_AT", time.perf_counter() - 3600)
+    trace_file = tmp_path / "trace.json"
+    status, _, _ = run_forwarded(
+        socket_path,
+        [
+            "--url",
+            httpserver.url_for("/"),
+            "--trace-file",
+            str(trace_file),
+            "query",
+            "user",
+            "foobar",
+        ],
+    )
+    assert status == 0
+    spans = [
+        event for event in json.loads(trace_file.read_text()) if event["ph"] == "X"
+    ]
+    startup = next(span for span in spans if span["name"] == "startup")
+    assert startup["ts"] == 0
+    assert startup["dur"] < 60 * 1_000_000
+    assert all(0 <= span["ts"] < 60 * 1_000_000 for span in spans)
+
+
+def test_environment(httpserver, daemon, socket_path, monkeypatch, tmp_path):
+    """Test that the environment variables and the working directory are forwarded."""
+    monkeypatch.setenv("SCIM_CLI_URL", httpserver.url_for("/"))
+    monkeypatch.chdir(tmp_path)
+    status, stdout, _ = run_forwarded(
+        socket_path, ["--output", "user.json", "query", "user", "foobar"]
+    )
+    assert status == 0
+    assert stdout == ""
+    assert '"id": "foobar"' in (tmp_path / "user.json").read_text()
+
+    monkeypatch.delenv("SCIM_CLI_URL")
+    status, _, stderr = run_forwarded(socket_path, ["query", "user", "foobar"])
+    assert status == 1
+    assert "No SCIM server URL defined." in stderr
+
+
+def test_local_commands(daemon, socket_path):
+    """Test that interactive and daemon commands are not forwarded."""
+    assert forward(["shell"], socket_path) is None
+    assert forward(["daemon", "stop"], socket_path) is None
+
+
+def test_no_daemon(runner, socket_path):
+    """Test that commands are run locally when no daemon is running."""
+    assert forward(["query"], socket_path) is None
+
+    socket_path.touch()
+    assert forward(["query"], socket_path) is None
+
+    result = runner.invoke(cli, ["daemon", "stop", "--socket", str(socket_path)])
+    assert result.exit_code == 1
+    assert "No daemon is running" in result.stdout
+
+
+def test_already_running(runner, daemon, socket_path):
+    """Test that a single daemon can listen on a socket."""
+    result = runner.invoke(cli, ["daemon", "start", "--socket", str(socket_path)])
+    assert result.exit_code == 1
+    assert "A daemon is already running" in result.stdout
+
+
+def test_idle_timeout(runner, socket_path):
+    """Test that the daemon stops after some time without any command."""
+    result = runner.invoke(
+        cli,
+        [
+            "daemon",
+            "start",
+            "--socket",
+            str(socket_path),
+            "--idle-timeout",
+            "0.1",
+            "--foreground",
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    assert "Daemon listening" in result.stdout
+    assert not socket_path.exists()
+
+
+def test_main(httpserver, daemon, socket_path, monkeypatch, capsysbinary):
+    """Test that the entry point forwards the commands to the daemon."""
+    monkeypatch.setenv("SCIM_CLI_DAEMON_SOCKET", str(socket_path))
+    monkeypatch.setattr(
+        "sys.argv",
+        ["scim", "--url", httpserver.url_for("/"), "query", "user", "foobar"],
+    )
+    monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BytesIO()))
+    with pytest.raises(SystemExit) as excinfo:
+        main()
+    assert excinfo.value.code == 0
+    assert b'"id": "foobar"' in capsysbinary.readouterr().out
+    assert daemon.profiles
+
+    monkeypatch.setenv("SCIM_CLI_DAEMON_SOCKET", str(socket_path) + ".missing")
+    with pytest.raises(SystemExit) as excinfo:
+        main()
+    assert excinfo.value.code == 0
+    assert b'"id": "foobar"' in capsysbinary.readouterr().out
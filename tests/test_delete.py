@@ -1,5 +1,8 @@
 import json
 
+import pytest
+from werkzeug import Response
+
 from scim2_cli import cli
 
 
@@ -104,3 +107,213 @@ def test_not_found(runner, httpserver):
         "detail": "Resource 2819c223-7f76-453a-919d-413861904646 not found",
         "status": "404",
     }
+
+
+def test_ndjson(runner, httpserver):
+    """Test that each NDJSON line deletes a resource."""
+    for id in ("first", "second"):
+        httpserver.expect_oneshot_request(
+            f"/Users/{id}", method="DELETE"
+        ).respond_with_data("", status=204, content_type="application/scim+json")
+
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "delete", "user", "--ndjson"],
+        input='"first"\n{"id": "second", "userName": "second@example.com"}\n',
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert result.output == ""
+    httpserver.check_assertions()
+    assert not httpserver.oneshot_handlers
+
+
+def test_ndjson_missing_id(runner, httpserver):
+    """Test NDJSON records without ids."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "delete", "user", "--ndjson"],
+        input='{"userName": "foo"}\n',
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 1, result.stdout
+    assert "Record 1: Missing 'id' attribute" in result.stdout
+
+
+def test_missing_id(runner, httpserver):
+    """Test that an id is needed without --ndjson."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "delete", "user"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 2, result.stdout
+    assert "Missing argument 'ID'." in result.stdout
+
+
+@pytest.fixture
+def filtered_users(httpserver):
+    """Serve three users matching a filter, two per page, and accept their deletion."""
+    ids = ["first", "second", "third"]
+
+    def handler(request):
+        start = int(request.args.get("startIndex", 1))
+        resources = [{"id": id} for id in ids[start - 1 : start + 1]]
+        return Response(
+            json.dumps(
+                {
+                    "schemas": ["urn:ietf:params:scim:api:messages:2.0:ListResponse"],
+                    "totalResults": len(ids),
+                    "startIndex": start,
+                    "itemsPerPage": len(resources),
+                    "Resources": resources,
+                }
+            ),
+            content_type="application/scim+json",
+        )
+
+    httpserver.expect_request("/Users", method="GET").respond_with_handler(handler)
+    for id in ids:
+        httpserver.expect_request(f"/Users/{id}", method="DELETE").respond_with_data(
+            "", status=204, content_type="application/scim+json"
+        )
+    return ids
+
+
+def deleted(httpserver):
+    return [request.path for request, _ in httpserver.log if request.method == "DELETE"]
+
+
+def test_filter(runner, httpserver, filtered_users):
+    """Test that all the resources matching a filter are deleted."""
+    args = ["--url", httpserver.url_for("/"), "delete", "user"]
+    result = runner.invoke(
+        cli,
+        [*args, "--filter", 'userName sw "test"', "--dry-run"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert result.stdout == "3 resources would be deleted.\n"
+    assert deleted(httpserver) == []
+    assert [request.path for request, _ in httpserver.log].count("/Users") == 1
+
+    result = runner.invoke(
+        cli,
+        [*args, "--filter", 'userName sw "test"', "--concurrency", "2"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert sorted(deleted(httpserver)) == [
+        "/Users/first",
+        "/Users/second",
+        "/Users/third",
+    ]
+    filters = [
+        request.args.get("filter")
+        for request, _ in httpserver.log
+        if request.path == "/Users" and request.method == "GET"
+    ]
+    assert set(filters) == {'userName sw "test"'}
+
+
+def test_max(runner, httpserver, filtered_users):
+    """Test that nothing is deleted when more resources than --max would be."""
+    args = ["--url", httpserver.url_for("/"), "delete", "user"]
+    for dry_run in ([], ["--dry-run"]):
+        result = runner.invoke(
+            cli, [*args, "--filter", 'userName sw "test"', "--max", "2", *dry_run]
+        )
+        assert result.exit_code == 1
+        assert "More than 2 resources would be deleted." in result.stdout
+    # the remaining pages are not requested once totalResults exceeds --max
+    assert [
+        request.args.get("startIndex")
+        for request, _ in httpserver.log
+        if request.path == "/Users"
+    ] == ["1", "1"]
+
+    result = runner.invoke(
+        cli, [*args, "--ndjson", "--max", "1"], input='"first"\n"second"\n'
+    )
+    assert result.exit_code == 1
+    assert "More than 1 resources would be deleted." in result.stdout
+    assert deleted(httpserver) == []
+
+    result = runner.invoke(
+        cli,
+        [*args, "--ndjson", "--max", "2", "--dry-run"],
+        input='"first"\n"second"\n',
+        catch_exceptions=False,
+    )
+    assert result.stdout == "2 resources would be deleted.\n"
+
+
+def test_filter_bulk(runner, httpserver, bulk_supported, filtered_users):
+    """Test that the resources are deleted with bulk requests when the server supports them."""
+    operations = []
+
+    def handler(request):
+        operations.extend(request.json["Operations"])
+        return Response(
+            json.dumps(
+                {
+                    "schemas": ["urn:ietf:params:scim:api:messages:2.0:BulkResponse"],
+                    "Operations": [
+                        {"method": "DELETE", "status": "204"}
+                        for _ in request.json["Operations"]
+                    ],
+                }
+            ),
+            content_type="application/scim+json",
+        )
+
+    httpserver.expect_request("/Bulk", method="POST").respond_with_handler(handler)
+    result = runner.invoke(
+        cli,
+        [
+            "--url",
+            httpserver.url_for("/"),
+            "delete",
+            "user",
+            "--filter",
+            'userName sw "test"',
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert [operation["path"] for operation in operations] == [
+        "/Users/first",
+        "/Users/second",
+        "/Users/third",
+    ]
+    assert len(result.stdout.splitlines()) == 3
+
+    operations.clear()
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "delete", "user", "--ndjson", "--bulk"],
+        input='"first"\n{"id": "second"}\n',
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert [operation["path"] for operation in operations] == [
+        "/Users/first",
+        "/Users/second",
+    ]
+    assert deleted(httpserver) == []
+
+
+def test_filter_usage(runner, httpserver):
+    """Test the incompatible arguments of --filter."""
+    args = ["--url", httpserver.url_for("/"), "delete", "user"]
+    result = runner.invoke(cli, [*args, "--filter", "x", "--ndjson"])
+    assert result.exit_code == 2
+    assert "--ndjson and --filter cannot be used together." in result.stdout
+
+    result = runner.invoke(cli, [*args, "1234", "--filter", "x"])
+    assert result.exit_code == 2
+    assert "--ndjson and --filter cannot be used with an ID." in result.stdout
+
+    result = runner.invoke(cli, [*args, "--filter", "x", "--bulk"])
+    assert result.exit_code == 1
+    assert "The server does not support bulk operations." in result.stdout
@@ -0,0 +1,320 @@
+import json
+import time
+
+import pytest
+from httpx import Client
+from scim2_client.engines.httpx import SyncSCIMClient
+from scim2_models import ListResponse
+from scim2_models import ResourceType
+from scim2_models import Schema
+from scim2_models import User
+
+from scim2_cli import cli
+from scim2_cli.discovery import RESOURCE_MODELS_CACHE
+from scim2_cli.discovery import SCHEMA_MODELS_CACHE
+from scim2_cli.discovery import DiscoveryCache
+from scim2_cli.discovery import build_resource_models
+from scim2_cli.discovery import discover
+from scim2_cli.discovery import model_from_schema
+
+
+@pytest.fixture
+def httpserver(httpserver, simple_user_payload):
+    httpserver.expect_request("/Users/foobar", method="GET").respond_with_json(
+        simple_user_payload("foobar"),
+        status=200,
+        content_type="application/scim+json",
+    )
+    return httpserver
+
+
+def discovery_requests(httpserver):
+    return [
+        request.path
+        for request, _ in httpserver.log
+        if request.path in ("/Schemas", "/ResourceTypes", "/ServiceProviderConfig")
+    ]
+
+
+def test_cache_hit(runner, httpserver):
+    """Test that the discovery payloads are reused in the following runs."""
+    for _ in range(2):
+        result = runner.invoke(
+            cli,
+            ["--url", httpserver.url_for("/"), "query", "user", "foobar"],
+            catch_exceptions=False,
+        )
+        assert result.exit_code == 0, result.stdout
+
+    assert sorted(discovery_requests(httpserver)) == ["/ResourceTypes", "/Schemas"]
+
+
+def test_no_cache(runner, httpserver, cache_dir):
+    """Test that --no-cache always performs the discovery."""
+    for _ in range(2):
+        result = runner.invoke(
+            cli,
+            ["--url", httpserver.url_for("/"), "--no-cache", "query", "user", "foobar"],
+            catch_exceptions=False,
+        )
+        assert result.exit_code == 0, result.stdout
+
+    assert len(discovery_requests(httpserver)) == 4
+    assert not cache_dir.exists()
+
+
+def test_cache_key_headers(runner, httpserver):
+    """Test that different headers use different cache entries."""
+    for header in ("Authorization: Bearer foo", "Authorization: Bearer bar"):
+        result = runner.invoke(
+            cli,
+            [
+                "--url",
+                httpserver.url_for("/"),
+                "--header",
+                header,
+                "query",
+                "user",
+                "foobar",
+            ],
+            catch_exceptions=False,
+        )
+        assert result.exit_code == 0, result.stdout
+
+    assert len(discovery_requests(httpserver)) == 4
+
+
+def test_cache_does_not_store_headers(runner, httpserver, cache_dir):
+    """Test that the header values are not written on the disk."""
+    result = runner.invoke(
+        cli,
+        [
+            "--url",
+            httpserver.url_for("/"),
+            "--header",
+            "Authorization: Bearer secret-token",
+            "query",
+            "user",
+            "foobar",
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    (cache_file,) = (cache_dir / "discovery").iterdir()
+    assert "secret-token" not in cache_file.read_text()
+
+
+def test_refresh_discovery(runner, httpserver):
+    """Test that --refresh-discovery ignores fresh cache entries."""
+    for args in ([], ["--refresh-discovery"]):
+        result = runner.invoke(
+            cli,
+            ["--url", httpserver.url_for("/"), *args, "query", "user", "foobar"],
+            catch_exceptions=False,
+        )
+        assert result.exit_code == 0, result.stdout
+
+    assert len(discovery_requests(httpserver)) == 4
+
+
+def test_etag_revalidation(httpserver, tmp_path):
+    """Test that stale entries are revalidated with If-None-Match."""
+    payload = ListResponse[Schema](
+        total_results=1,
+        start_index=1,
+        items_per_page=1,
+        resources=[User.to_schema()],
+    ).model_dump()
+    httpserver.clear()
+    httpserver.expect_request("/ResourceTypes", method="GET").respond_with_json(
+        ListResponse[ResourceType](
+            total_results=1,
+            start_index=1,
+            items_per_page=1,
+            resources=[ResourceType.from_resource(User)],
+        ).model_dump(),
+        content_type="application/scim+json",
+    )
+    httpserver.expect_oneshot_request("/Schemas", method="GET").respond_with_json(
+        payload, content_type="application/scim+json", headers={"ETag": '"v1"'}
+    )
+    httpserver.expect_oneshot_request(
+        "/Schemas", method="GET", headers={"If-None-Match": '"v1"'}
+    ).respond_with_data("", status=304)
+
+    url = httpserver.url_for("/")
+    cache = DiscoveryCache(tmp_path, url, {}, ttl=0)
+    client = SyncSCIMClient(Client(base_url=url))
+    discover(client, cache=cache, service_provider_config=False)
+    discover(client, cache=cache, resource_types=False, service_provider_config=False)
+
+    assert [model.__name__ for model in client.resource_models] == ["User"]
+    httpserver.check_assertions()
+
+
+def test_cache_ttl(tmp_path):
+    """Test the cache entries freshness."""
+    cache = DiscoveryCache(tmp_path, "https://scim.test", {}, ttl=60)
+    assert cache.is_fresh({"fetched_at": time.time()})
+    assert not cache.is_fresh({"fetched_at": time.time() - 120})
+
+
+def test_corrupted_cache(tmp_path):
+    """Test that unreadable cache files are ignored."""
+    cache = DiscoveryCache(tmp_path, "https://scim.test", {}, ttl=60)
+    cache.path.parent.mkdir(parents=True)
+    cache.path.write_text("invalid")
+    assert DiscoveryCache(tmp_path, "https://scim.test", {}, ttl=60).entries == {}
+
+
+def test_configuration_files_precedence(runner, httpserver, tmp_path):
+    """Test that explicit configuration files are used instead of the cache."""
+    schemas_path = tmp_path / "schemas.json"
+    with open(schemas_path, "w") as fd:
+        json.dump([User.to_schema().model_dump()], fd)
+
+    result = runner.invoke(
+        cli,
+        [
+            "--url",
+            httpserver.url_for("/"),
+            "--schemas",
+            schemas_path,
+            "query",
+            "user",
+            "foobar",
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert "/Schemas" not in discovery_requests(httpserver)
+
+
+def test_lazy_discovery_query_root(runner, httpserver):
+    """Test that querying the server root does not perform discovery."""
+    httpserver.expect_request("/", method="GET").respond_with_json(
+        {
+            "totalResults": 0,
+            "schemas": ["urn:ietf:params:scim:api:messages:2.0:ListResponse"],
+        },
+        content_type="application/scim+json",
+    )
+    result = runner.invoke(
+        cli, ["--url", httpserver.url_for("/"), "query"], catch_exceptions=False
+    )
+    assert result.exit_code == 0, result.stdout
+    assert discovery_requests(httpserver) == []
+
+
+def test_lazy_discovery_query_config(runner, httpserver):
+    """Test that querying configuration objects does not perform discovery."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "query", "serviceproviderconfig"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert discovery_requests(httpserver) == ["/ServiceProviderConfig"]
+
+
+def test_lazy_discovery_delete(runner, httpserver):
+    """Test that deletion only discovers the resource types."""
+    httpserver.expect_request("/Users/foobar", method="DELETE").respond_with_data(
+        "", status=204, content_type="application/scim+json"
+    )
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "delete", "user", "foobar"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert discovery_requests(httpserver) == ["/ResourceTypes"]
+
+
+def test_lazy_discovery_delete_with_schemas(runner, httpserver, tmp_path):
+    """Test that deletion uses the models when the schemas are already known."""
+    schemas_path = tmp_path / "schemas.json"
+    with open(schemas_path, "w") as fd:
+        json.dump([User.to_schema().model_dump()], fd)
+
+    httpserver.expect_request("/Users/foobar", method="DELETE").respond_with_data(
+        "", status=204, content_type="application/scim+json"
+    )
+    result = runner.invoke(
+        cli,
+        [
+            "--url",
+            httpserver.url_for("/"),
+            "--schemas",
+            schemas_path,
+            "delete",
+            "user",
+            "foobar",
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert discovery_requests(httpserver) == ["/ResourceTypes"]
+
+
+def test_discovery_error(runner, httpserver):
+    """Test that discovery errors are displayed when a command needs discovery."""
+    httpserver.clear()
+    httpserver.expect_request("/ResourceTypes").respond_with_data(
+        "", status=999, content_type="application/scim+json"
+    )
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "delete", "user", "foobar"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 1, result.stdout
+    assert (
+        "Error while fetching /ResourceTypes: Unexpected response status code: 999"
+        in result.stdout
+    )
+
+
+def test_concurrent_discovery_error(runner, httpserver):
+    """Test that the failing endpoint is reported when discovery runs concurrently."""
+    httpserver.clear()
+    httpserver.expect_request("/ResourceTypes").respond_with_json(
+        ListResponse[ResourceType](
+            total_results=1,
+            start_index=1,
+            items_per_page=1,
+            resources=[ResourceType.from_resource(User)],
+        ).model_dump(),
+        content_type="application/scim+json",
+    )
+    httpserver.expect_request("/Schemas").respond_with_data(
+        "invalid", content_type="application/scim+json"
+    )
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "search"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 1, result.stdout
+    assert "Error while fetching /Schemas:" in result.stdout
+
+
+def test_resource_models_cache():
+    """Test that identical schemas reuse the already built models."""
+    RESOURCE_MODELS_CACHE.clear()
+    client = SyncSCIMClient(None)
+    resource_types = [ResourceType.from_resource(User)]
+
+    models = build_resource_models(client, resource_types, [User.to_schema()])
+    assert build_resource_models(client, resource_types, [User.to_schema()]) is models
+
+
+def test_model_from_schema_cache():
+    """Test that identical schemas build a single model."""
+    SCHEMA_MODELS_CACHE.clear()
+    model = model_from_schema(User.to_schema())
+    assert model_from_schema(User.to_schema()) is model
+
+    schema = User.to_schema()
+    schema.description = "Modified description"
+    assert model_from_schema(schema) is not model
@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import json
+
+import pytest
+from werkzeug import Response
+
+from scim2_cli import cli
+
+
+@pytest.fixture
+def users_requests(httpserver, simple_user_payload):
+    """Serve 25 users, with pages capped to 10 resources."""
+    requests = []
+
+    def handler(request):
+        start_index = int(request.args.get("startIndex", 1))
+        count = min(int(request.args.get("count", 10)), 10)
+        requests.append((start_index, request.args.get("count")))
+        stop = min(start_index + count, 26)
+        payload = {
+            "schemas": ["urn:ietf:params:scim:api:messages:2.0:ListResponse"],
+            "totalResults": 25,
+            "startIndex": start_index,
+            "itemsPerPage": stop - start_index,
+            "Resources": [
+                simple_user_payload(f"user-{index:02d}")
+                for index in range(start_index, stop)
+            ],
+        }
+        return Response(json.dumps(payload), content_type="application/scim+json")
+
+    httpserver.expect_request("/Users", method="GET").respond_with_handler(handler)
+    return requests
+
+
+def read_lines(path):
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt") as fd:
+        return [json.loads(line) for line in fd]
+
+
+def test_export(runner, httpserver, users_requests, tmp_path):
+    """Test that all the resources are exported, and described in the manifest."""
+    directory = tmp_path / "backup"
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "export", str(directory), "--count", "50"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+
+    users = read_lines(directory / "user.ndjson")
+    assert [user["id"] for user in users] == [
+        f"user-{index:02d}" for index in range(1, 26)
+    ]
+    assert sorted(users_requests) == [(1, "50"), (11, "10"), (21, "10")]
+
+    manifest = json.loads((directory / "manifest.json").read_text())
+    assert json.loads(result.stdout) == manifest
+    assert manifest["url"] == httpserver.url_for("/")
+    content = (directory / "user.ndjson").read_bytes()
+    assert manifest["resources"] == [
+        {
+            "resourceType": "user",
+            "file": "user.ndjson",
+            "count": 25,
+            "size": len(content),
+            "sha256": hashlib.sha256(content).hexdigest(),
+        }
+    ]
+    assert sorted(path.name for path in directory.iterdir()) == [
+        "manifest.json",
+        "user.ndjson",
+    ]
+
+
+@pytest.mark.parametrize("async_runtime", [False, True])
+def test_export_gzip(runner, httpserver, users_requests, tmp_path, async_runtime):
+    """Test compressed exports."""
+    args = ["--url", httpserver.url_for("/")]
+    if async_runtime:
+        args.append("--async")
+    result = runner.invoke(
+        cli,
+        [*args, "export", str(tmp_path), "--gzip", "--concurrency", "2"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+
+    path = tmp_path / "user.ndjson.gz"
+    assert len(read_lines(path)) == 25
+    entry = json.loads(result.stdout)["resources"][0]
+    assert entry["file"] == "user.ndjson.gz"
+    assert entry["sha256"] == hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def test_export_attributes(runner, httpserver, users_requests, tmp_path):
+    """Test that the attributes projections are sent to the server."""
+    result = runner.invoke(
+        cli,
+        [
+            "--url",
+            httpserver.url_for("/"),
+            "export",
+            str(tmp_path),
+            "--resource-type",
+            "user",
+            "--attribute",
+            "userName",
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    requests = [request for request, _ in httpserver.log if request.path == "/Users"]
+    assert {request.args["attributes"] for request in requests} == {"userName"}
+
+
+def test_export_unknown_resource_type(runner, httpserver, tmp_path):
+    """Test that unknown resource types are rejected before anything is written."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "export", str(tmp_path / "backup")]
+        + ["--resource-type", "invalid"],
+    )
+    assert result.exit_code == 1
+    assert "Unknown resource type 'invalid'" in result.stdout
+    assert not (tmp_path / "backup").exists()
+
+
+def test_export_error(runner, httpserver, tmp_path):
+    """Test that incomplete files are removed when a request fails."""
+    httpserver.expect_request("/Users", method="GET").respond_with_data(
+        "error", status=500
+    )
+    directory = tmp_path / "backup"
+    result = runner.invoke(
+        cli, ["--url", httpserver.url_for("/"), "export", str(directory)]
+    )
+    assert result.exit_code == 1
+    assert list(directory.iterdir()) == []
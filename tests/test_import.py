@@ -0,0 +1,293 @@
+import gzip
+import json
+
+import pytest
+from scim2_models import AuthenticationScheme
+from scim2_models import Bulk
+from scim2_models import ChangePassword
+from scim2_models import ETag
+from scim2_models import Filter
+from scim2_models import Group
+from scim2_models import ListResponse
+from scim2_models import Patch
+from scim2_models import ResourceType
+from scim2_models import Schema
+from scim2_models import ServiceProviderConfig
+from scim2_models import Sort
+from scim2_models import User
+from werkzeug import Response
+
+from scim2_cli import cli
+
+USERS = [
+    {
+        "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User"],
+        "id": f"old-{name}",
+        "userName": name,
+        "meta": {"resourceType": "User", "location": f"https://old.test/Users/{name}"},
+    }
+    for name in ("alice", "bob")
+]
+GROUPS = [
+    {
+        "schemas": ["urn:ietf:params:scim:schemas:core:2.0:Group"],
+        "id": "old-admins",
+        "displayName": "admins",
+        "members": [
+            {"value": "old-alice", "$ref": "https://old.test/Users/old-alice"},
+            {"value": "old-bob", "$ref": "https://old.test/Users/old-bob"},
+        ],
+    }
+]
+
+
+def json_response(payload, status=200):
+    return Response(
+        json.dumps(payload), status=status, content_type="application/scim+json"
+    )
+
+
+@pytest.fixture
+def bulk_supported():
+    return False
+
+
+@pytest.fixture
+def unavailable():
+    """Names of the resources for which the server fails."""
+    return set()
+
+
+@pytest.fixture
+def created(httpserver, bulk_supported, unavailable):
+    """Serve users and groups, and record the created resources."""
+    created = []
+    httpserver.clear_all_handlers()
+    httpserver.expect_request("/ServiceProviderConfig").respond_with_json(
+        ServiceProviderConfig(
+            documentation_uri="https://scim.test",
+            patch=Patch(supported=False),
+            bulk=Bulk(
+                supported=bulk_supported, max_operations=2, max_payload_size=1048576
+            ),
+            change_password=ChangePassword(supported=True),
+            filter=Filter(supported=False, max_results=0),
+            sort=Sort(supported=False),
+            etag=ETag(supported=False),
+            authentication_schemes=[
+                AuthenticationScheme(
+                    name="OAuth Bearer Token",
+                    description="Authentication scheme using the OAuth Bearer Token Standard",
+                    spec_uri="http://www.rfc-editor.org/info/rfc6750",
+                    documentation_uri="https://scim.test",
+                    type="oauthbearertoken",
+                    primary=True,
+                ),
+            ],
+        ).model_dump(),
+        content_type="application/scim+json",
+    )
+    httpserver.expect_request("/ResourceTypes").respond_with_json(
+        ListResponse[ResourceType](
+            total_results=2,
+            resources=[
+                ResourceType.from_resource(User),
+                ResourceType.from_resource(Group),
+            ],
+        ).model_dump(),
+        content_type="application/scim+json",
+    )
+    httpserver.expect_request("/Schemas").respond_with_json(
+        ListResponse[Schema](
+            total_results=2, resources=[User.to_schema(), Group.to_schema()]
+        ).model_dump(),
+        content_type="application/scim+json",
+    )
+
+    def create(payload, endpoint):
+        name = payload.get("userName") or payload.get("displayName")
+        resource = {
+            **payload,
+            "id": f"new-{name}",
+            "meta": {
+                "resourceType": "User" if endpoint == "/Users" else "Group",
+                "location": httpserver.url_for(f"{endpoint}/new-{name}"),
+            },
+        }
+        created.append((endpoint, payload))
+        return resource
+
+    def handler(request):
+        if request.json.get("userName") in unavailable:
+            return Response("Unavailable", status=503)
+        return json_response(create(request.json, request.path), 201)
+
+    def bulk_handler(request):
+        results = []
+        for operation in request.json["Operations"]:
+            resource = create(operation["data"], operation["path"])
+            results.append(
+                {
+                    "method": "POST",
+                    "bulkId": operation["bulkId"],
+                    "location": resource["meta"]["location"],
+                    "status": "201",
+                }
+            )
+        return json_response(
+            {
+                "schemas": ["urn:ietf:params:scim:api:messages:2.0:BulkResponse"],
+                "Operations": results,
+            }
+        )
+
+    httpserver.expect_request("/Users", method="POST").respond_with_handler(handler)
+    httpserver.expect_request("/Groups", method="POST").respond_with_handler(handler)
+    httpserver.expect_request("/Bulk", method="POST").respond_with_handler(bulk_handler)
+    return created
+
+
+@pytest.fixture
+def backup(tmp_path):
+    """Write an export directory, where groups are listed before users."""
+    directory = tmp_path / "backup"
+    directory.mkdir()
+    for name, resources in (("group", GROUPS), ("user", USERS)):
+        (directory / f"{name}.ndjson").write_text(
+            "".join(json.dumps(resource) + "\n" for resource in resources)
+        )
+    manifest = {
+        "resources": [
+            {"resourceType": "group", "file": "group.ndjson"},
+            {"resourceType": "user", "file": "user.ndjson"},
+        ]
+    }
+    (directory / "manifest.json").write_text(json.dumps(manifest))
+    return directory
+
+
+def test_import(runner, httpserver, created, backup):
+    """Test that users are created first, and that group members are remapped."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "import", str(backup)],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert [json.loads(line)["id"] for line in result.stdout.splitlines()] == [
+        "new-alice",
+        "new-bob",
+        "new-admins",
+    ]
+
+    assert [endpoint for endpoint, _ in created] == ["/Users", "/Users", "/Groups"]
+    assert "id" not in created[0][1]
+    assert "meta" not in created[0][1]
+    assert created[2][1]["members"] == [{"value": "new-alice"}, {"value": "new-bob"}]
+    assert (backup / "import-journal.sqlite3").exists()
+
+
+def test_resume(runner, httpserver, created, unavailable, backup):
+    """Test that an interrupted import resumes where it stopped."""
+    unavailable.add("bob")
+    args = ["--url", httpserver.url_for("/"), "import", str(backup)]
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 1
+    assert "user.ndjson: Record 2:" in result.stdout
+    assert [payload["userName"] for _, payload in created] == ["alice"]
+
+    unavailable.clear()
+    result = runner.invoke(cli, args, catch_exceptions=False)
+    assert result.exit_code == 0, result.stdout
+    assert "user.ndjson: 1 resources were already imported." in result.stdout
+    assert [
+        payload.get("userName", payload.get("displayName")) for _, payload in created
+    ] == ["alice", "bob", "admins"]
+    assert created[2][1]["members"] == [{"value": "new-alice"}, {"value": "new-bob"}]
+
+    result = runner.invoke(cli, args, catch_exceptions=False)
+    assert result.exit_code == 0, result.stdout
+    assert len(created) == 3
+
+
+@pytest.mark.parametrize("bulk_supported", [True])
+def test_import_bulk(runner, httpserver, created, backup):
+    """Test that bulk requests are used when the server supports them."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "import", str(backup)],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    bulk_requests = [
+        request for request, _ in httpserver.log if request.path == "/Bulk"
+    ]
+    assert len(bulk_requests) == 2
+    assert [json.loads(line)["status"] for line in result.stdout.splitlines()] == [
+        "201"
+    ] * 3
+    assert created[2][1]["members"] == [{"value": "new-alice"}, {"value": "new-bob"}]
+
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "import", str(backup), "--no-bulk"],
+        catch_exceptions=False,
+    )
+    assert len(created) == 3
+
+
+def test_import_bulk_unsupported(runner, httpserver, created, backup):
+    """Test that --bulk needs the server to support bulk requests."""
+    result = runner.invoke(
+        cli, ["--url", httpserver.url_for("/"), "import", str(backup), "--bulk"]
+    )
+    assert result.exit_code == 1
+    assert "The server does not support bulk operations." in result.stdout
+
+
+@pytest.mark.parametrize("async_runtime", [False, True])
+def test_import_gzip(runner, httpserver, created, tmp_path, async_runtime):
+    """Test compressed sources, concurrency and explicit journal paths."""
+    path = tmp_path / "users.ndjson.gz"
+    with gzip.open(path, "wt") as fd:
+        fd.writelines(json.dumps(user) + "\n\n" for user in USERS)
+
+    args = ["--url", httpserver.url_for("/")]
+    if async_runtime:
+        args.append("--async")
+    journal = tmp_path / "journal"
+    result = runner.invoke(
+        cli,
+        [*args, "import", str(path), "--journal", str(journal), "--concurrency", "2"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert sorted(json.loads(line)["id"] for line in result.stdout.splitlines()) == [
+        "new-alice",
+        "new-bob",
+    ]
+    assert journal.exists()
+
+
+def test_import_same_file_names(runner, httpserver, created, tmp_path):
+    """Test that files with the same name in different directories are both imported."""
+    for directory, user in (("a", USERS[0]), ("b", USERS[1])):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "user.ndjson").write_text(json.dumps(user) + "\n")
+
+    result = runner.invoke(
+        cli,
+        [
+            "--url",
+            httpserver.url_for("/"),
+            "import",
+            str(tmp_path / "a" / "user.ndjson"),
+            str(tmp_path / "b" / "user.ndjson"),
+            "--journal",
+            str(tmp_path / "journal"),
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert "already imported" not in result.stdout
+    assert [payload["userName"] for _, payload in created] == ["alice", "bob"]
@@ -0,0 +1,112 @@
+import pytest
+
+from scim2_cli import jsonlib
+
+
+@pytest.fixture(params=jsonlib.available_backends())
+def backend(request):
+    previous = jsonlib.BACKEND
+    jsonlib.use_backend(request.param)
+    yield request.param
+    jsonlib.use_backend(previous)
+
+
+def list_response(count):
+    return {
+        "schemas": ["urn:ietf:params:scim:api:messages:2.0:ListResponse"],
+        "totalResults": count,
+        "startIndex": 1,
+        "itemsPerPage": count,
+        "Resources": [
+            {
+                "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User"],
+                "id": f"user-{index}",
+                "userName": f"user-{index}@example.com",
+                "displayName": f"Jöhn Dœ {index}",
+                "active": index % 2 == 0,
+                "emails": [
+                    {"value": f"user-{index}@example.com", "primary": True},
+                    {"value": f"user-{index}@example.org", "primary": False},
+                ],
+                "meta": {
+                    "resourceType": "User",
+                    "created": "2010-01-23T04:56:22Z",
+                    "lastModified": "2011-05-13T04:42:34Z",
+                    "version": 'W\\/"3694e05e9dff590"',
+                    "location": f"https://scim.test/Users/user-{index}",
+                },
+            }
+            for index in range(count)
+        ],
+    }
+
+
+def test_compact_output_identical(backend):
+    """Test that compact outputs without floats are byte-identical to the standard library ones."""
+    payload = list_response(10)
+    payload["unicode"] = '日本語   "quoted" \\ \n'
+    payload["big"] = [2**70 + 1, 2**64, -(2**63) - 1]
+    assert jsonlib.dumps(payload) == jsonlib.stdlib_backend()[1](payload)
+    assert jsonlib.loads(jsonlib.dumps(payload)) == payload
+
+
+def test_large_integers(backend):
+    """Test that integers larger than 64 bits are decoded exactly."""
+    document = '{"big": 1180591620717411303424, "negative": -9223372036854775809}'
+    for data in (document, document.encode()):
+        assert jsonlib.loads(data) == {
+            "big": 1180591620717411303424,
+            "negative": -9223372036854775809,
+        }
+
+
+def test_floats(backend):
+    """Test that floats are decoded identically, although their notation may differ."""
+    values = [1e16, 1e-7, 0.1, 1.5, -2.5e-300]
+    assert jsonlib.loads(jsonlib.dumps(values)) == values
+    assert jsonlib.loads(jsonlib.stdlib_backend()[1](values)) == values
+    assert jsonlib.dumps([float("nan")]) == (
+        "[NaN]" if backend == jsonlib.STDLIB else "[null]"
+    )
+
+
+def test_indented_output(backend):
+    """Test that indented outputs are the same whatever the backend."""
+    assert (
+        jsonlib.dumps({"foo": ["bar"]}, indent=4)
+        == '{\n    "foo": [\n        "bar"\n    ]\n}'
+    )
+
+
+def test_invalid_json(backend):
+    """Test that decoding errors are raised as ValueError."""
+    with pytest.raises(ValueError):
+        jsonlib.loads("invalid")
+
+
+def test_unavailable_backend():
+    """Test that unknown backends are reported."""
+    with pytest.raises(
+        ValueError, match="The JSON backend 'unknown' is not available."
+    ):
+        jsonlib.use_backend("unknown")
+
+
+def test_backends_consistency():
+    """Test that all the available backends encode large list responses identically.
+
+    Their durations can be compared with benchmarks/bench_jsonlib.py.
+    """
+    payload = list_response(5000)
+    previous = jsonlib.BACKEND
+    encodings = set()
+    try:
+        for name in jsonlib.available_backends():
+            jsonlib.use_backend(name)
+            encoded = jsonlib.dumps(payload)
+            assert jsonlib.loads(encoded) == payload
+            encodings.add(encoded)
+    finally:
+        jsonlib.use_backend(previous)
+
+    assert len(encodings) == 1
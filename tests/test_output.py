@@ -0,0 +1,149 @@
+import io
+import json
+
+import pytest
+from scim2_models import ListResponse
+from scim2_models import User
+
+from scim2_cli import cli
+from scim2_cli import jsonlib
+from scim2_cli.output import JSON
+from scim2_cli.output import NDJSON
+from scim2_cli.output import OutputWriter
+
+
+def list_response(count):
+    return ListResponse[User](
+        total_results=count,
+        start_index=1,
+        items_per_page=count,
+        resources=[
+            User(id=str(index), user_name=f"user{index}@example.com")
+            for index in range(count)
+        ],
+    )
+
+
+def write(response, **kwargs):
+    stream = io.StringIO()
+    OutputWriter(stream, **kwargs).write(response)
+    return stream.getvalue()
+
+
+@pytest.mark.parametrize("indent", [True, False])
+@pytest.mark.parametrize("count", [0, 1, 3])
+def test_list_response_identical(indent, count):
+    """Test that streamed list responses are identical to the whole response serialization."""
+    response = list_response(count)
+    expected = jsonlib.dumps(response.model_dump(), indent=4 if indent else None)
+    assert write(response, indent=indent) == expected + "\n"
+    assert write(response.model_dump(), indent=indent) == expected + "\n"
+
+
+def test_list_response_ndjson():
+    """Test that list responses resources are written one per line."""
+    response = list_response(3)
+    assert write(response, format=NDJSON) == "".join(
+        jsonlib.dumps(resource.model_dump()) + "\n" for resource in response.resources
+    )
+
+
+def test_single_resource_ndjson():
+    """Test that single resources are written on a single line."""
+    user = User(id="1", user_name="bjensen")
+    assert write(user, format=NDJSON) == jsonlib.dumps(user.model_dump()) + "\n"
+
+
+@pytest.mark.parametrize("indent", [True, False])
+@pytest.mark.parametrize("count", [0, 1, 3])
+def test_collection_json(indent, count):
+    """Test that collections are written as JSON arrays."""
+    items = [{"id": str(index)} for index in range(count)]
+    stream = io.StringIO()
+    OutputWriter(stream, format=JSON, indent=indent).write_all(iter(items))
+    assert (
+        stream.getvalue() == jsonlib.dumps(items, indent=4 if indent else None) + "\n"
+    )
+
+
+def test_incremental_output():
+    """Test that resources are written before the next ones are produced."""
+    stream = io.StringIO()
+
+    def items():
+        for index in range(3):
+            assert stream.getvalue().count("\n") == index
+            yield {"id": str(index)}
+
+    OutputWriter(stream).write_all(items())
+    assert [json.loads(line) for line in stream.getvalue().splitlines()] == [
+        {"id": "0"},
+        {"id": "1"},
+        {"id": "2"},
+    ]
+
+
+def test_output_file(runner, httpserver, simple_user_payload, tmp_path):
+    """Test that --output writes the result in a file."""
+    httpserver.expect_request("/Users/foobar", method="GET").respond_with_json(
+        simple_user_payload("foobar"), content_type="application/scim+json"
+    )
+    path = tmp_path / "output.json"
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "--output", path, "query", "user", "foobar"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert result.stdout == ""
+    assert json.loads(path.read_text()) == simple_user_payload("foobar")
+
+
+def test_format_ndjson(runner, httpserver, simple_user_payload):
+    """Test that --format ndjson writes list responses resources one per line."""
+    httpserver.expect_request("/Users", method="GET").respond_with_json(
+        {
+            "schemas": ["urn:ietf:params:scim:api:messages:2.0:ListResponse"],
+            "totalResults": 2,
+            "Resources": [simple_user_payload("first"), simple_user_payload("second")],
+        },
+        content_type="application/scim+json",
+    )
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "--format", "ndjson", "query", "user"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert [json.loads(line) for line in result.stdout.splitlines()] == [
+        simple_user_payload("first"),
+        simple_user_payload("second"),
+    ]
+
+
+def test_format_json_collection(runner, httpserver, simple_user_payload):
+    """Test that --format json writes batch results as a JSON array."""
+    payloads = []
+    for id in ("first", "second"):
+        payload = {
+            "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User"],
+            "userName": id,
+        }
+        payloads.append(payload)
+        httpserver.expect_request(
+            "/Users", method="POST", json=payload
+        ).respond_with_json(
+            simple_user_payload(id), status=201, content_type="application/scim+json"
+        )
+
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "--format", "json", "create", "--ndjson"],
+        input="\n".join(json.dumps(payload) for payload in payloads),
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert json.loads(result.stdout) == [
+        simple_user_payload("first"),
+        simple_user_payload("second"),
+    ]
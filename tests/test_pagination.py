@@ -0,0 +1,58 @@
+from scim2_cli.pagination import iter_all_resources
+
+
+def make_fetch(total_results, page_size, requests=None):
+    """Build a fetch function for a server capping its pages to page_size."""
+
+    def fetch(start_index, count):
+        if requests is not None:
+            requests.append((start_index, count))
+        stop = min(start_index + min(count or page_size, page_size), total_results + 1)
+        return {
+            "totalResults": total_results,
+            "startIndex": start_index,
+            "Resources": list(range(start_index, stop)),
+        }
+
+    return fetch
+
+
+def test_all_resources():
+    """Test that all the resources are yielded in order."""
+    requests = []
+    fetch = make_fetch(10, 3, requests)
+    assert list(iter_all_resources(fetch, count=3)) == list(range(1, 11))
+    assert requests == [(1, 3), (4, 3), (7, 3), (10, 3)]
+
+
+def test_all_resources_capped_page_size():
+    """Test that the pages size is adapted when the server caps the count."""
+    requests = []
+    fetch = make_fetch(5, 2, requests)
+    assert list(iter_all_resources(fetch, count=100)) == list(range(1, 6))
+    assert requests == [(1, 100), (3, 2), (5, 2)]
+
+
+def test_all_resources_start_index():
+    """Test that the resources before the start index are skipped."""
+    fetch = make_fetch(10, 3)
+    assert list(iter_all_resources(fetch, start_index=5)) == list(range(5, 11))
+
+
+def test_all_resources_short_pages():
+    """Test that missing resources of shorter pages are fetched again."""
+    inner = make_fetch(10, 4)
+
+    def fetch(start_index, count):
+        page = inner(start_index, count)
+        if start_index == 5:
+            page["Resources"] = page["Resources"][:1]
+        return page
+
+    assert list(iter_all_resources(fetch, prefetch=3)) == list(range(1, 11))
+
+
+def test_all_resources_empty():
+    """Test empty results."""
+    fetch = make_fetch(0, 3)
+    assert list(iter_all_resources(fetch)) == []
@@ -0,0 +1,156 @@
+import json
+
+from scim2_cli import cli
+from scim2_cli.patch import diff_operations
+
+ENTERPRISE_USER_SCHEMA = "urn:ietf:params:scim:schemas:extension:enterprise:2.0:User"
+
+
+def patch_requests(httpserver):
+    return [request.json for request, _ in httpserver.log if request.method == "PATCH"]
+
+
+def test_patch(runner, httpserver, patch_supported, simple_user_payload):
+    """Test that explicit operations are sent in a PatchOp payload."""
+    httpserver.expect_request("/Users/foobar", method="PATCH").respond_with_json(
+        simple_user_payload("foobar"), content_type="application/scim+json"
+    )
+    result = runner.invoke(
+        cli,
+        [
+            "--url",
+            httpserver.url_for("/"),
+            "patch",
+            "user",
+            "foobar",
+            "--add",
+            "emails",
+            '[{"value": "foo@example.org"}]',
+            "--replace",
+            "title",
+            "Engineer",
+            "--remove",
+            "nickName",
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert json.loads(result.stdout)["id"] == "foobar"
+    assert patch_requests(httpserver) == [
+        {
+            "schemas": ["urn:ietf:params:scim:api:messages:2.0:PatchOp"],
+            "Operations": [
+                {
+                    "op": "add",
+                    "path": "emails",
+                    "value": [{"value": "foo@example.org"}],
+                },
+                {"op": "replace", "path": "title", "value": "Engineer"},
+                {"op": "remove", "path": "nickName"},
+            ],
+        }
+    ]
+
+
+def test_patch_desired_resource(
+    runner, httpserver, patch_supported, simple_user_payload
+):
+    """Test that the operations are computed from the current and the desired resources."""
+    current = {
+        **simple_user_payload("foobar"),
+        "title": "Engineer",
+        "emails": [{"value": "a@example.org"}, {"value": "b@example.org"}],
+    }
+    httpserver.expect_request("/Users/foobar", method="GET").respond_with_json(
+        current, content_type="application/scim+json"
+    )
+    desired = {
+        "schemas": current["schemas"],
+        "userName": current["userName"],
+        "emails": [{"value": "b@example.org"}, {"value": "c@example.org"}],
+    }
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "patch", "user", "foobar", "--dry-run"],
+        input=json.dumps(desired),
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert json.loads(result.stdout)["Operations"] == [
+        {"op": "remove", "path": 'emails[value eq "a@example.org"]'},
+        {"op": "add", "path": "emails", "value": [{"value": "c@example.org"}]},
+        {"op": "remove", "path": "title"},
+    ]
+    assert patch_requests(httpserver) == []
+
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "patch", "user", "foobar"],
+        input=json.dumps({**desired, "emails": current["emails"], "title": "Engineer"}),
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert json.loads(result.stdout)["id"] == "foobar"
+    assert patch_requests(httpserver) == []
+
+
+def test_patch_unsupported(runner, httpserver):
+    """Test that the server must support patch operations."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "patch", "user", "foobar", "--remove", "x"],
+    )
+    assert result.exit_code == 1
+    assert "The server does not support patch operations." in result.stdout
+
+
+def test_patch_errors(runner, httpserver, patch_supported):
+    """Test unknown resource types and missing operations."""
+    args = ["--url", httpserver.url_for("/"), "patch"]
+    result = runner.invoke(cli, [*args, "unknown", "foobar", "--remove", "x"])
+    assert result.exit_code == 1
+    assert "Unknown resource type 'unknown'. Available values are: user" in (
+        result.stdout
+    )
+
+    result = runner.invoke(cli, [*args, "user", "foobar"])
+    assert result.exit_code == 1
+    assert "Usage: " in result.stdout
+
+
+def test_diff_operations():
+    """Test the operations of complex, multi-valued and extension attributes."""
+    current = {
+        "name": {"givenName": "Alice", "familyName": "Smith"},
+        "emails": [{"value": "a@example.org"}, {"value": "b@example.org"}],
+        "phoneNumbers": [
+            {"value": "555", "type": "work"},
+            {"value": "555", "type": "home"},
+        ],
+        "entitlements": ["a", "b"],
+        ENTERPRISE_USER_SCHEMA: {"employeeNumber": "1", "department": "R&D"},
+    }
+    desired = {
+        "name": {"givenName": "Alice", "familyName": "Liddell"},
+        "emails": [{"value": "b@example.org"}, {"value": "a@example.org"}],
+        "phoneNumbers": [{"value": "555", "type": "work"}],
+        "entitlements": ["a"],
+        ENTERPRISE_USER_SCHEMA: {"employeeNumber": "2"},
+    }
+    assert diff_operations(current, desired) == [
+        {"op": "replace", "path": "name.familyName", "value": "Liddell"},
+        {"op": "remove", "path": 'phoneNumbers[value eq "555"]'},
+        {
+            "op": "add",
+            "path": "phoneNumbers",
+            "value": [{"value": "555", "type": "work"}],
+        },
+        {"op": "replace", "path": "entitlements", "value": ["a"]},
+        {
+            "op": "replace",
+            "path": f"{ENTERPRISE_USER_SCHEMA}:employeeNumber",
+            "value": "2",
+        },
+        {"op": "remove", "path": f"{ENTERPRISE_USER_SCHEMA}:department"},
+    ]
+    assert diff_operations(current, current) == []
@@ -269,3 +269,76 @@ def test_validation_error(runner, httpserver, simple_user_payload):
     )
     assert result.exit_code == 1, result.stdout
     assert "Expected type User but got undefined object with no schema" in result.stdout
+
+
+def test_all_pages(runner, httpserver, simple_user_payload):
+    """Test that --all walks through the pages, even when the server caps the page size."""
+    ids = [f"user{index}" for index in range(1, 6)]
+    for start_index, count in ((1, 10), (3, 2), (5, 2)):
+        httpserver.expect_oneshot_request(
+            "/Users",
+            method="GET",
+            query_string={"startIndex": str(start_index), "count": str(count)},
+        ).respond_with_json(
+            {
+                "totalResults": len(ids),
+                "itemsPerPage": 2,
+                "startIndex": start_index,
+                "schemas": ["urn:ietf:params:scim:api:messages:2.0:ListResponse"],
+                "Resources": [
+                    simple_user_payload(id)
+                    for id in ids[start_index - 1 : start_index + 1]
+                ],
+            },
+            content_type="application/scim+json",
+        )
+
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "query", "user", "--all", "--count", "10"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert [json.loads(line) for line in result.output.splitlines()] == [
+        simple_user_payload(id) for id in ids
+    ]
+    httpserver.check_assertions()
+
+
+def test_all_pages_with_id(runner, httpserver):
+    """Test that --all cannot be used to query a single resource."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "query", "user", "one-by-id", "--all"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 2, result.stdout
+    assert "--all cannot be used with an ID." in result.stdout
+
+
+def test_all_pages_error(runner, httpserver, simple_user_payload):
+    """Test that errors on the following pages are reported."""
+    httpserver.expect_oneshot_request(
+        "/Users", method="GET", query_string={"startIndex": "1"}
+    ).respond_with_json(
+        {
+            "totalResults": 2,
+            "itemsPerPage": 1,
+            "startIndex": 1,
+            "schemas": ["urn:ietf:params:scim:api:messages:2.0:ListResponse"],
+            "Resources": [simple_user_payload("first")],
+        },
+        content_type="application/scim+json",
+    )
+    httpserver.expect_oneshot_request(
+        "/Users", method="GET", query_string={"startIndex": "2", "count": "1"}
+    ).respond_with_data("", status=999, content_type="application/scim+json")
+
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "query", "user", "--all"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 1, result.stdout
+    assert json.loads(result.stdout.splitlines()[0]) == simple_user_payload("first")
+    assert "Unexpected response status code: 999" in result.stdout
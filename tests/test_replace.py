@@ -302,3 +302,32 @@ def test_command_validation_error(runner, httpserver, simple_user_payload):
     )
     assert result.exit_code == 1, result.stdout
     assert "Expected type User but got undefined object with no schema" in result.stdout
+
+
+def test_ndjson(runner, httpserver, simple_user_payload):
+    """Test that each NDJSON line replaces a resource."""
+    payloads = []
+    for id in ("first", "second"):
+        payload = {
+            "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User"],
+            "id": id,
+            "userName": f"{id}@example.com",
+        }
+        payloads.append(payload)
+        httpserver.expect_request(f"/Users/{id}", method="PUT").respond_with_json(
+            simple_user_payload(id),
+            status=200,
+            content_type="application/scim+json",
+        )
+
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "replace", "--ndjson"],
+        input="\n".join(json.dumps(payload) for payload in payloads),
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert [json.loads(line) for line in result.output.splitlines()] == [
+        simple_user_payload("first"),
+        simple_user_payload("second"),
+    ]
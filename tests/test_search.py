@@ -106,3 +106,33 @@ def test_scimclient_error(runner, httpserver, simple_user_payload):
     )
     assert result.exit_code == 1, result.stdout
     assert "Unexpected response status code: 666" in result.stdout
+
+
+def test_all_pages(runner, httpserver, simple_user_payload):
+    """Test that --all walks through the pages, with the stdin payload."""
+    ids = [f"user{index}" for index in range(1, 4)]
+    for start_index, id in enumerate(ids, start=1):
+        httpserver.expect_oneshot_request(
+            "/.search", method="POST", json={"count": 1, "startIndex": start_index}
+        ).respond_with_json(
+            {
+                "schemas": ["urn:ietf:params:scim:api:messages:2.0:ListResponse"],
+                "totalResults": len(ids),
+                "itemsPerPage": 1,
+                "startIndex": start_index,
+                "Resources": [simple_user_payload(id)],
+            },
+            content_type="application/scim+json",
+        )
+
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "search", "--all", "--prefetch", "2"],
+        input=json.dumps({"count": 1}),
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert [json.loads(line) for line in result.output.splitlines()] == [
+        simple_user_payload(id) for id in ids
+    ]
+    httpserver.check_assertions()
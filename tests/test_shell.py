@@ -0,0 +1,94 @@
+import click
+import pytest
+
+from scim2_cli import cli
+from scim2_cli.shell import completions
+from scim2_cli.shell import shell_cli
+
+
+@pytest.fixture
+def httpserver(httpserver, simple_user_payload):
+    httpserver.expect_request("/Users/foobar", method="GET").respond_with_json(
+        simple_user_payload("foobar"),
+        content_type="application/scim+json",
+    )
+    return httpserver
+
+
+def discovery_requests(httpserver):
+    return [
+        request.path
+        for request, _ in httpserver.log
+        if request.path in ("/Schemas", "/ResourceTypes", "/ServiceProviderConfig")
+    ]
+
+
+def test_shell(runner, httpserver):
+    """Test that the discovery is performed once for all the shell commands."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "--no-cache", "shell"],
+        input="query user foobar\n\nquery user foobar\nexit\n",
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert result.stdout.count('"id": "foobar"') == 2
+    assert sorted(discovery_requests(httpserver)) == ["/ResourceTypes", "/Schemas"]
+    assert result.stdout.count(" ms)") == 2
+
+
+def test_shell_errors(runner, httpserver):
+    """Test that errors are displayed without leaving the shell."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "shell", "--no-latency"],
+        input='query unknown\nquery "\nshell\ninvalid\nquery --help\n',
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert "Unknown resource type 'unknown" in result.stdout
+    assert "No closing quotation" in result.stdout
+    assert "The shell is already running." in result.stdout
+    assert "No such command 'invalid'" in result.stdout
+    assert "Usage: " in result.stdout
+    assert " ms)" not in result.stdout
+
+
+def test_completions(runner, httpserver):
+    """Test the completion of commands, resource types and options."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "query", "user", "foobar"],
+        catch_exceptions=False,
+    )
+
+    @click.command()
+    @click.pass_context
+    def check(ctx):
+        commands = [name for name in cli.list_commands(ctx) if name != "shell-check"]
+        assert completions(ctx, [], "") == sorted([*commands, "exit", "quit"])
+        assert "shell-check" not in completions(ctx, [], "")
+        assert completions(ctx, [], "qu") == ["query", "quit"]
+        assert completions(ctx, ["query"], "") == []
+
+        ctx.invoke(
+            cli.get_command(ctx.parent, "query"), resource_type="user", id="foobar"
+        )
+        assert completions(ctx, ["query"], "u") == ["user"]
+        assert completions(ctx, ["query", "user"], "") == []
+        assert completions(ctx, ["create"], "") == ["user"]
+        assert "--user-name" in completions(ctx, ["create", "user"], "--user")
+        assert completions(ctx, ["delete"], "") == ["user"]
+        assert completions(ctx, ["query", "--count", "10"], "--ind") == ["--indent"]
+
+    cli.add_command(check, "shell-check")
+    try:
+        result = runner.invoke(
+            cli,
+            ["--url", httpserver.url_for("/"), "shell-check"],
+            catch_exceptions=False,
+        )
+    finally:
+        cli.commands.pop("shell-check")
+    assert result.exit_code == 0, result.stdout
+    assert shell_cli.name == "shell"
@@ -0,0 +1,294 @@
+import json
+
+import pytest
+from scim2_models import Group
+from scim2_models import ListResponse
+from scim2_models import ResourceType
+from scim2_models import Schema
+from scim2_models import User
+from werkzeug import Response
+
+from scim2_cli import cli
+
+USER_SCHEMA = "urn:ietf:params:scim:schemas:core:2.0:User"
+
+
+def user(name, **attributes):
+    return {"schemas": [USER_SCHEMA], "userName": name, **attributes}
+
+
+def json_response(payload, status=200):
+    return Response(
+        json.dumps(payload), status=status, content_type="application/scim+json"
+    )
+
+
+@pytest.fixture
+def users(httpserver):
+    """Serve users stored in a dict, and record the modifying requests."""
+    users = {
+        "alice": user("alice", displayName="Alice", title="Engineer"),
+        "bob": user("Bob", displayName="Bob"),
+        "charlie": user("charlie"),
+    }
+    for id, resource in users.items():
+        resource["id"] = id
+        resource["meta"] = {"resourceType": "User"}
+
+    def list_handler(request):
+        start = int(request.args.get("startIndex", 1))
+        count = min(int(request.args.get("count", 2)), 2)
+        resources = list(users.values())[start - 1 : start - 1 + count]
+        return json_response(
+            {
+                "schemas": ["urn:ietf:params:scim:api:messages:2.0:ListResponse"],
+                "totalResults": len(users),
+                "startIndex": start,
+                "itemsPerPage": len(resources),
+                "Resources": resources,
+            }
+        )
+
+    def create_handler(request):
+        resource = {**request.json, "id": "new", "meta": {"resourceType": "User"}}
+        users["new"] = resource
+        return json_response(resource, 201)
+
+    def resource_handler(request):
+        id = request.path.rsplit("/", 1)[-1]
+        if request.method == "DELETE":
+            del users[id]
+            return Response(status=204, content_type="application/scim+json")
+        if request.method == "PUT":
+            users[id] = {**request.json, "id": id, "meta": {"resourceType": "User"}}
+            users[id].pop("password", None)
+        return json_response(users[id])
+
+    httpserver.expect_request("/Users", method="GET").respond_with_handler(list_handler)
+    httpserver.expect_request("/Users", method="POST").respond_with_handler(
+        create_handler
+    )
+    for id in list(users):
+        httpserver.expect_request(f"/Users/{id}").respond_with_handler(resource_handler)
+    return users
+
+
+@pytest.fixture
+def desired(tmp_path):
+    """Write a desired state where alice changes, Bob is unchanged, charlie is missing and dave is new."""
+    directory = tmp_path / "desired"
+    directory.mkdir()
+    (directory / "alice.json").write_text(
+        json.dumps(user("alice", displayName="Alice Liddell", password="secret"))
+    )
+    (directory / "others.ndjson").write_text(
+        json.dumps(user("Bob", displayName="Bob"))
+        + "\n"
+        + json.dumps(user("dave", displayName="Dave"))
+        + "\n"
+    )
+    # files of a git checkout that are not part of the desired state
+    (directory / "README.md").write_text("# Identities\n")
+    (directory / ".git").mkdir()
+    (directory / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+    (directory / ".git" / "config.json").write_text("{}")
+    return directory
+
+
+def requests(httpserver):
+    return [
+        (request.method, request.path)
+        for request, _ in httpserver.log
+        if request.method != "GET"
+    ]
+
+
+def test_sync_dry_run(runner, httpserver, patch_supported, users, desired):
+    """Test that the plan only contains the needed actions, and that nothing is modified."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "sync", str(desired), "--dry-run"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    actions = [json.loads(line) for line in result.stdout.splitlines()]
+    assert actions == [
+        {
+            "action": "patch",
+            "resourceType": "user",
+            "key": "userName=alice",
+            "id": "alice",
+            "Operations": [
+                {"op": "replace", "path": "displayName", "value": "Alice Liddell"},
+                {"op": "remove", "path": "title"},
+            ],
+        },
+        {
+            "action": "create",
+            "resourceType": "user",
+            "key": "userName=dave",
+            "resource": user("dave", displayName="Dave"),
+        },
+    ]
+    assert requests(httpserver) == []
+
+    result = runner.invoke(
+        cli,
+        [
+            "--url",
+            httpserver.url_for("/"),
+            "sync",
+            str(desired),
+            "--dry-run",
+            "--delete",
+        ],
+        catch_exceptions=False,
+    )
+    assert json.loads(result.stdout.splitlines()[-1]) == {
+        "action": "delete",
+        "resourceType": "user",
+        "key": "userName=charlie",
+        "id": "charlie",
+    }
+
+
+@pytest.mark.parametrize("async_runtime", [False, True])
+def test_sync(runner, httpserver, patch_supported, users, desired, async_runtime):
+    """Test that the server resources match the desired state after a sync."""
+    args = ["--url", httpserver.url_for("/")]
+    if async_runtime:
+        args.append("--async")
+    result = runner.invoke(
+        cli,
+        [*args, "sync", str(desired), "--delete", "--concurrency", "2"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert sorted(requests(httpserver)) == [
+        ("DELETE", "/Users/charlie"),
+        ("PATCH", "/Users/alice"),
+        ("POST", "/Users"),
+    ]
+    assert users["new"]["userName"] == "dave"
+    assert "charlie" not in users
+
+
+def test_sync_secondary_key(runner, httpserver, users, tmp_path):
+    """Test that a desired resource matches a server resource by a less preferred key."""
+    path = tmp_path / "users.ndjson"
+    path.write_text(
+        json.dumps(user("charlie", externalId="c-1"))
+        + "\n"
+        + json.dumps(user("alice", externalId="a-1", displayName="Alice"))
+        + "\n"
+    )
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "sync", str(path), "--dry-run", "--delete"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    actions = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [(action["action"], action.get("id")) for action in actions] == [
+        ("replace", "charlie"),
+        ("replace", "alice"),
+        ("delete", "bob"),
+    ]
+    assert actions[0]["key"] == "externalId=c-1"
+
+
+def test_sync_replace(runner, httpserver, users, desired):
+    """Test that resources are replaced when the server does not support patch."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "sync", str(desired)],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert sorted(requests(httpserver)) == [("POST", "/Users"), ("PUT", "/Users/alice")]
+    assert users["alice"]["displayName"] == "Alice Liddell"
+    assert "title" not in users["alice"]
+    assert "charlie" in users
+
+
+def test_sync_invalid_desired_state(runner, httpserver, users, tmp_path):
+    """Test that unidentifiable, duplicate or ambiguous desired resources are reported."""
+    path = tmp_path / "users.ndjson"
+    path.write_text(json.dumps({"schemas": [USER_SCHEMA], "title": "Engineer"}) + "\n")
+    result = runner.invoke(cli, ["--url", httpserver.url_for("/"), "sync", str(path)])
+    assert result.exit_code == 1
+    assert f"{path}:1: The resource has none of the" in result.stdout
+
+    path.write_text(json.dumps(user("alice")) + "\n" + json.dumps(user("Alice")) + "\n")
+    result = runner.invoke(cli, ["--url", httpserver.url_for("/"), "sync", str(path)])
+    assert result.exit_code == 1
+    assert f"{path}:2: Duplicate resource userName=alice." in result.stdout
+
+    path.write_text(
+        json.dumps(user("alice"))
+        + "\n"
+        + json.dumps(user("other", displayName="Alice"))
+        + "\n"
+    )
+    result = runner.invoke(cli, ["--url", httpserver.url_for("/"), "sync", str(path)])
+    assert result.exit_code == 1
+    assert "Several desired resources match the user resource alice." in result.stdout
+
+    path.write_text(json.dumps({"schemas": ["urn:unknown"], "userName": "x"}) + "\n")
+    result = runner.invoke(cli, ["--url", httpserver.url_for("/"), "sync", str(path)])
+    assert result.exit_code == 1
+    assert "Cannot guess resource type from the payload." in result.stdout
+    assert requests(httpserver) == []
+
+
+def test_sync_ambiguous_later_resource_type(runner, httpserver, tmp_path):
+    """Test that an ambiguous resource type is reported before the other types are modified."""
+    # the one-shot discovery responses take precedence over the default ones, that only know users
+    httpserver.expect_oneshot_request("/ResourceTypes").respond_with_json(
+        ListResponse[ResourceType](
+            total_results=2,
+            resources=[
+                ResourceType.from_resource(User),
+                ResourceType.from_resource(Group),
+            ],
+        ).model_dump(),
+        content_type="application/scim+json",
+    )
+    httpserver.expect_oneshot_request("/Schemas").respond_with_json(
+        ListResponse[Schema](
+            total_results=2, resources=[User.to_schema(), Group.to_schema()]
+        ).model_dump(),
+        content_type="application/scim+json",
+    )
+    group = {
+        "schemas": [Group.model_fields["schemas"].default[0]],
+        "id": "admins",
+        "externalId": "g-1",
+        "displayName": "Admins",
+        "meta": {"resourceType": "Group"},
+    }
+    for endpoint, resources in (("/Users", []), ("/Groups", [group])):
+        httpserver.expect_request(endpoint, method="GET").respond_with_json(
+            {
+                "schemas": ["urn:ietf:params:scim:api:messages:2.0:ListResponse"],
+                "totalResults": len(resources),
+                "Resources": resources,
+            },
+            content_type="application/scim+json",
+        )
+
+    path = tmp_path / "desired.ndjson"
+    path.write_text(
+        json.dumps(user("dave"))
+        + "\n"
+        + json.dumps({"schemas": group["schemas"], "displayName": "Admins"})
+        + "\n"
+        + json.dumps(
+            {"schemas": group["schemas"], "externalId": "g-1", "displayName": "Ops"}
+        )
+        + "\n"
+    )
+    result = runner.invoke(cli, ["--url", httpserver.url_for("/"), "sync", str(path)])
+    assert result.exit_code == 1
+    assert "Several desired resources match the group resource admins." in result.stdout
+    assert requests(httpserver) == []
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from scim2_cli import cli
+from scim2_cli import discovery
+from scim2_cli import timings
+
+
+@pytest.fixture
+def httpserver(httpserver, simple_user_payload):
+    httpserver.expect_request("/Users/foobar", method="GET").respond_with_json(
+        simple_user_payload("foobar"),
+        content_type="application/scim+json",
+    )
+    return httpserver
+
+
+@pytest.mark.parametrize("async_runtime", [False, True])
+def test_timings(runner, httpserver, async_runtime, monkeypatch):
+    """Test that the phases of an invocation are reported as JSON on stderr."""
+    monkeypatch.setattr(discovery, "RESOURCE_MODELS_CACHE", {})
+    args = ["--url", httpserver.url_for("/"), "--timings", "--timings-format", "json"]
+    if async_runtime:
+        args.append("--async")
+    result = runner.invoke(
+        cli, [*args, "query", "user", "foobar"], catch_exceptions=False
+    )
+    assert result.exit_code == 0, result.stdout
+    report = json.loads(result.stdout.splitlines()[-1])
+    assert list(report["phases"]) == list(timings.PHASES)
+    phases = report["phases"]
+    assert phases["imports"]["calls"] >= 2
+    assert phases["discover"]["calls"] == 1
+    assert phases["from_schema"]["calls"] == 1
+    assert phases["http"]["calls"] == 3
+    assert phases["validation"]["calls"] >= 1
+    assert phases["output"]["calls"] == 1
+    assert report["total"] >= sum(phase["duration"] for phase in phases.values())
+    assert timings.recorder is None
+
+
+def test_timings_table(runner, httpserver):
+    """Test the timings table, and that errors are measured too."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "--timings", "query", "user", "unknown"],
+    )
+    assert result.exit_code == 1
+    assert "Error:" in result.stdout
+    lines = result.stdout.splitlines()
+    start = lines.index(next(line for line in lines if line.startswith("phase")))
+    assert [
+        line.split()[0] for line in lines[start : start + len(timings.PHASES) + 4]
+    ] == [
+        "phase",
+        "startup",
+        *timings.PHASES,
+        "other",
+        "total",
+    ]
+
+
+def test_timings_disabled(runner, httpserver):
+    """Test that nothing is recorded without --timings."""
+    result = runner.invoke(
+        cli,
+        ["--url", httpserver.url_for("/"), "query", "user", "foobar"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert "phase" not in result.stdout
+    assert timings.phase("http") is timings.NULL_PHASE
+
+
+def test_nested_phases():
+    """Test that the time of nested phases is not counted in their parents."""
+    recorder = timings.start()
+    try:
+        with timings.phase("discover"):
+            with timings.phase("from_schema"):
+                pass
+            with timings.phase("from_schema"):
+                pass
+    finally:
+        report = timings.stop()
+
+    assert recorder.counts["discover"] == 1
+    assert recorder.counts["from_schema"] == 2
+    phases = report["phases"]
+    assert (
+        phases["discover"]["duration"] + phases["from_schema"]["duration"]
+        <= (report["total"])
+    )
+    assert timings.stop() is None
@@ -0,0 +1,113 @@
+import json
+import threading
+
+import pytest
+
+from scim2_cli import cli
+from scim2_cli import timings
+from scim2_cli.trace import Tracer
+
+
+@pytest.fixture
+def httpserver(httpserver, simple_user_payload):
+    httpserver.expect_request("/Users/foobar", method="GET").respond_with_json(
+        simple_user_payload("foobar"),
+        content_type="application/scim+json",
+    )
+    return httpserver
+
+
+@pytest.mark.parametrize("async_runtime", [False, True])
+def test_trace_file(runner, httpserver, tmp_path, async_runtime):
+    """Test that phases and HTTP requests are written as Chrome trace events."""
+    trace_file = tmp_path / "trace.json"
+    args = ["--url", httpserver.url_for("/"), "--trace-file", str(trace_file)]
+    if async_runtime:
+        args.append("--async")
+    result = runner.invoke(
+        cli, [*args, "query", "user", "foobar"], catch_exceptions=False
+    )
+    assert result.exit_code == 0, result.stdout
+    assert "phase" not in result.stdout
+    assert timings.recorder is None
+
+    events = json.loads(trace_file.read_text())
+    spans = [event for event in events if event["ph"] == "X"]
+    names = {span["name"] for span in spans}
+    assert {"startup", "discover", "http", "queue", "send", "wait"} <= names
+    assert "connect" in names
+
+    requests = [span for span in spans if span["name"] == "http"]
+    query = requests[-1]["args"]
+    assert query["url"].startswith(httpserver.url_for("/Users/foobar"))
+    assert query["method"] == "GET"
+    assert query["status"] == 200
+    assert query["bytes_in"] > 0
+    assert query["bytes_out"] == 0
+    assert query["retries"] == 0
+    assert query["queue_ms"] >= 0
+    assert query["wait_ms"] >= 0
+
+    assert all(span["dur"] >= 0 for span in spans)
+    assert {"process_name", "thread_name"} <= {
+        event["name"] for event in events if event["ph"] == "M"
+    }
+
+
+def test_trace_file_with_timings(runner, httpserver, tmp_path):
+    """Test that the trace file and the timings report can be used together."""
+    trace_file = tmp_path / "trace.json"
+    result = runner.invoke(
+        cli,
+        [
+            "--url",
+            httpserver.url_for("/"),
+            "--timings",
+            "--trace-file",
+            str(trace_file),
+            "query",
+            "user",
+            "foobar",
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.stdout
+    assert "total" in result.stdout
+    assert json.loads(trace_file.read_text())
+
+
+def test_concurrent_spans(tmp_path):
+    """Test that concurrent spans are written in distinct lanes, reused afterwards."""
+    trace_file = tmp_path / "trace.json"
+    timings.start(Tracer(str(trace_file)))
+    barrier = threading.Barrier(2)
+
+    def request():
+        with timings.phase("http"):
+            barrier.wait()
+
+    try:
+        with timings.phase("command"):
+            threads = [threading.Thread(target=request) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            with timings.phase("output"):
+                pass
+    finally:
+        timings.stop()
+
+    lanes = {
+        event["name"]: event["tid"]
+        for event in json.loads(trace_file.read_text())
+        if event["ph"] == "X" and event["name"] != "http"
+    }
+    http_lanes = [
+        event["tid"]
+        for event in json.loads(trace_file.read_text())
+        if event["name"] == "http"
+    ]
+    assert lanes["output"] == lanes["command"]
+    assert sorted(http_lanes) == [1, 2]
+    assert lanes["command"] == 0
@@ -1,8 +1,19 @@
+import threading
+import time
+
+import click
+import pytest
+from scim2_client.engines.httpx import SyncSCIMClient
 from scim2_models import Context
+from scim2_models import EnterpriseUser
 from scim2_models import GroupMember
 from scim2_models import User
 
+from scim2_cli.create import create_cli
+from scim2_cli.utils import build_model_command
 from scim2_cli.utils import is_field_acceptable
+from scim2_cli.utils import map_concurrently
+from scim2_cli.utils import unacceptable_fields
 
 
 def test_is_field_acceptable():
@@ -19,3 +30,84 @@ def test_is_field_acceptable():
     assert not is_field_acceptable(
         Context.RESOURCE_REPLACEMENT_REQUEST, GroupMember, "type"
     )
+
+
+def test_unacceptable_fields_cache():
+    fields = unacceptable_fields(Context.RESOURCE_CREATION_REQUEST, User)
+    assert "id" in fields
+    assert unacceptable_fields(Context.RESOURCE_CREATION_REQUEST, User) is fields
+    assert unacceptable_fields(Context.RESOURCE_QUERY_REQUEST, User) is not fields
+
+
+def test_model_command_cache():
+    """Test that model subcommands are built once."""
+    build_model_command.cache_clear()
+    model = User[EnterpriseUser]
+    ctx = click.Context(create_cli)
+    ctx.obj = {
+        "client": SyncSCIMClient(None, resource_models=[model]),
+        "discovery": {"pending": set()},
+    }
+
+    command = create_cli.get_command(ctx, "user")
+    assert create_cli.get_command(ctx, "user") is command
+
+
+def test_map_concurrently_ordered():
+    """Test that results are yielded in the input order, even when later items are faster."""
+
+    def function(item):
+        time.sleep(0.05 if item == 0 else 0)
+        return item
+
+    assert list(map_concurrently(function, range(10), concurrency=4)) == list(range(10))
+
+
+def test_map_concurrently_unordered():
+    """Test that results are yielded as soon as they are available."""
+
+    def function(item):
+        time.sleep(0.1 if item == 0 else 0)
+        return item
+
+    results = list(map_concurrently(function, range(4), concurrency=4, ordered=False))
+    assert sorted(results) == list(range(4))
+    assert results[-1] == 0
+
+
+def test_map_concurrently_parallelism():
+    """Test that items are processed simultaneously."""
+    barrier = threading.Barrier(4, timeout=5)
+
+    def function(item):
+        barrier.wait()
+        return item
+
+    assert list(map_concurrently(function, range(4), concurrency=4)) == list(range(4))
+
+
+def test_map_concurrently_backpressure():
+    """Test that the input is not read much further than the results."""
+    consumed = []
+
+    def items():
+        for item in range(100):
+            consumed.append(item)
+            yield item
+
+    results = map_concurrently(lambda item: item, items(), concurrency=2)
+    assert next(results) == 0
+    assert len(consumed) <= 4
+    results.close()
+
+
+def test_map_concurrently_error():
+    """Test that errors are raised in the caller thread."""
+
+    def function(item):
+        if item == 2:
+            raise click.ClickException("error")
+        return item
+
+    with pytest.raises(click.ClickException):
+        list(map_concurrently(function, range(10), concurrency=4))